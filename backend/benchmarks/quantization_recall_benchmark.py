@@ -0,0 +1,101 @@
+"""
+Measures what int8 embedding storage costs in retrieval quality and what it saves in size.
+
+    python benchmarks/quantization_recall_benchmark.py [--chunks 2000] [--dim 768] [--queries 200] [--k 5]
+
+Builds clustered, unit-length synthetic embeddings (real chunk embeddings of one
+meeting are close to each other, which is the hard case for quantization), then
+compares top-k retrieval on the float32 matrix with top-k on the int8 matrix
+(modules/utility/quantization.py). Reports recall@k, score error, per-vector
+payload size and scoring time.
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+import orjson
+
+# Run from anywhere: make the backend package importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from modules.utility import quantization
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def synthetic_embeddings(chunks: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = normalize(rng.standard_normal((clusters, dim)))
+    assignment = rng.integers(0, clusters, chunks)
+    return normalize(centers[assignment] + 0.35 * rng.standard_normal((chunks, dim)) / np.sqrt(dim) * 4).astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    top = np.argpartition(-scores, k)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    matrix = synthetic_embeddings(args.chunks, args.dim, args.clusters, rng)
+    queries = normalize(matrix[rng.integers(0, args.chunks, args.queries)] + 0.05 * rng.standard_normal((args.queries, args.dim)))
+    queries = queries.astype(np.float32)
+
+    # Round-trip through the stored encoding, exactly as the index loads it
+    encoded = [quantization.encode(row) for row in matrix]
+    quantized, scales = quantization.decode_many(encoded)
+
+    hits, score_errors = 0, []
+    for query in queries:
+        exact = matrix @ query
+        approx = quantization.scores(quantized, scales, query)
+        hits += len(set(top_k(exact, args.k)) & set(top_k(approx, args.k)))
+        score_errors.append(np.abs(exact - approx).max())
+
+    print(f"{args.chunks} chunks x {args.dim} dims, {args.queries} queries\n")
+    print(f"recall@{args.k:<34} {hits / (args.queries * args.k):8.3f}")
+    print(f"{'max |score error| (mean over queries)':<42} {np.mean(score_errors):8.5f}\n")
+
+    json_bytes = np.mean([len(orjson.dumps(row.tolist())) for row in matrix[:100]])
+    sizes = {
+        "float32 as JSON text (pgvector column)": json_bytes,
+        "float32 raw": args.dim * 4,
+        "float16 raw": args.dim * 2,
+        "int8 + scale, base64 (embedding_q8)": np.mean([len(value) for value in encoded]),
+        "int8 + scale raw (in memory / on disk)": args.dim + 4,
+    }
+    for name, size in sizes.items():
+        print(f"{name:<42} {size:8.0f} B/vector  ({json_bytes / size:4.1f}x vs JSON)")
+
+    print()
+    query = queries[0]
+    float_seconds = timed(lambda: matrix @ query, args.repeat)
+    int8_seconds = timed(lambda: quantization.scores(quantized, scales, query), args.repeat)
+    print(f"{'score all chunks, float32':<42} {float_seconds * 1000:8.3f} ms")
+    print(f"{'score all chunks, int8 * scale':<42} {int8_seconds * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
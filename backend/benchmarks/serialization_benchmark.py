@@ -0,0 +1,106 @@
+"""
+Compares JSON encoding paths and on-the-wire sizes for a large meeting transcript.
+
+    python benchmarks/serialization_benchmark.py [--segments 10000] [--repeat 5]
+
+Encodes a synthetic transcript of N segments with FastAPI's default path
+(pydantic validation + jsonable_encoder + json.dumps) and with orjson on the
+plain dict, then reports gzip and brotli (if installed) sizes of the result.
+"""
+
+import sys
+import gzip
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+import orjson
+
+# Run from anywhere: make the backend package importable
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+WORDS = ("we", "should", "ship", "the", "release", "after", "review", "budget", "timeline",
+         "customer", "feedback", "action", "item", "follow", "up", "next", "week", "agreed")
+
+
+def synthetic_meeting(segments: int) -> dict:
+    rng = random.Random(42)
+    transcript = []
+    for i in range(segments):
+        seconds = i * 4
+        transcript.append({
+            "speaker": f"Speaker {rng.randint(1, 6)}",
+            "timestamp": f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}",
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 30))),
+        })
+    return {
+        "id": "00000000-0000-0000-0000-000000000000",
+        "title": "Quarterly planning",
+        "date": "2026-10-17",
+        "duration": segments * 4,
+        "participants": [{"email": f"user{i}@example.com", "name": f"User {i}", "role": "Participant"} for i in range(6)],
+        "recordingUrl": "https://example.com/recording.mp3",
+        "createdAt": "2026-10-17T10:00:00+00:00",
+        "status": "completed",
+        "transcript": transcript,
+        "transcriptCount": segments,
+        "summary": "Synthetic meeting used for serialization benchmarks.",
+        "actionItems": [],
+    }
+
+
+def timed(fn, repeat: int) -> tuple[float, bytes]:
+    best, result = float("inf"), b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--segments", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    meeting = synthetic_meeting(args.segments)
+    encoders = {"orjson (plain dict)": lambda: orjson.dumps(meeting)}
+
+    try:
+        from fastapi.encoders import jsonable_encoder
+        from modules.utility.pydantic_model import MeetingDetail
+
+        def default_path():
+            model = MeetingDetail(**meeting)
+            return json.dumps(jsonable_encoder(model), ensure_ascii=False, allow_nan=False,
+                              separators=(",", ":")).encode()
+        encoders = {"pydantic + jsonable_encoder + json": default_path, **encoders}
+    except ImportError:
+        encoders = {"json (plain dict)": lambda: json.dumps(meeting, separators=(",", ":")).encode(), **encoders}
+
+    print(f"Transcript of {args.segments} segments, best of {args.repeat}\n")
+    body = b""
+    for name, encode in encoders.items():
+        seconds, body = timed(encode, args.repeat)
+        print(f"{name:<40} {seconds * 1000:8.1f} ms  {len(body) / 1024:8.0f} KiB")
+
+    print()
+    seconds, compressed = timed(lambda: gzip.compress(body, compresslevel=6), args.repeat)
+    print(f"{'gzip level 6':<40} {seconds * 1000:8.1f} ms  {len(compressed) / 1024:8.0f} KiB  ({len(compressed) / len(body):.0%})")
+    if brotli is not None:
+        seconds, compressed = timed(lambda: brotli.compress(body, quality=5), args.repeat)
+        print(f"{'brotli quality 5':<40} {seconds * 1000:8.1f} ms  {len(compressed) / 1024:8.0f} KiB  ({len(compressed) / len(body):.0%})")
+    else:
+        print("brotli not installed; skipped")
+
+
+if __name__ == "__main__":
+    main()
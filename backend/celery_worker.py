@@ -1,14 +1,25 @@
 import os
 import requests
 import asyncio
-import tempfile
-from celery import Celery
+from celery import Celery, chain
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import google.api_core.exceptions
-from modules.utility.transcript_generator import analyze_audio_with_gemini_tools
+from modules.utility.transcript_generator import (
+    analyze_audio_in_segments, start_upload, request_analysis, extract_function_args, save_analysis, MODEL_NAME
+)
+from modules.utility.utility import get_file_state
 import mimetypes
-from modules.utility.upload_file_to_gemini import ApiKeyException
+from modules.utility.upload_file_to_gemini import ApiKeyException, ModelOverloadedException
+from celery.exceptions import Retry, Ignore
+from modules.utility import dedupe
+from modules.utility.recording_source import RecordingSource
+from modules.utility import gemini_file_cache
+from modules.utility import audio_segmenter
+from modules.utility.key_pool import key_pool, key_fingerprint
+from modules.utility.rate_limiter import RateLimitExceeded, RATE_LIMIT_MAX_WAIT_SECONDS, estimate_audio_tokens
+import random
+from modules.utility.progress import ProgressReporter, get_socket_emitter
 load_dotenv()
 
 # --- Configuration ---
@@ -27,16 +38,66 @@ celery_app.conf.update(
     task_track_started=True,
 )
 
-GEMINI_API_KEYS = os.getenv("GEMINI_API_KEYS", "").split(',')
+# --- Pipeline stage routing ---
+# Each stage of the meeting pipeline can be sent to its own queue, so the I/O-bound
+# waiting stages can run on a cheap high-concurrency pool and the transfer-heavy ones
+# on a few processes. Everything defaults to the standard 'celery' queue. Example:
+#   CELERY_QUEUE_WAIT=meetings.io CELERY_QUEUE_ANALYZE=meetings.io CELERY_QUEUE_PERSIST=meetings.io CELERY_QUEUE_NOTIFY=meetings.io
+#   celery -A celery_worker worker -Q meetings.io -P gevent -c 200
+#   celery -A celery_worker worker -Q celery -P prefork -c 4
+PIPELINE_QUEUES = {
+    "process_meeting_task": os.getenv("CELERY_QUEUE_FETCH", "celery"),
+    "upload_to_gemini_task": os.getenv("CELERY_QUEUE_UPLOAD", "celery"),
+    "wait_for_gemini_file_task": os.getenv("CELERY_QUEUE_WAIT", "celery"),
+    "analyze_meeting_task": os.getenv("CELERY_QUEUE_ANALYZE", "celery"),
+    "analyze_segments_task": os.getenv("CELERY_QUEUE_SEGMENTS", "celery"),
+    "persist_analysis_task": os.getenv("CELERY_QUEUE_PERSIST", "celery"),
+    "notify_meeting_task": os.getenv("CELERY_QUEUE_NOTIFY", "celery"),
+    "check_parked_duplicate_task": os.getenv("CELERY_QUEUE_NOTIFY", "celery"),
+}
+celery_app.conf.task_routes = {name: {"queue": queue} for name, queue in PIPELINE_QUEUES.items()}
+
+# Polling of the Gemini file state is done with rescheduled retries, not sleeps
+FILE_POLL_INTERVAL_SECONDS = int(os.getenv("FILE_POLL_INTERVAL_SECONDS", 5))
+FILE_POLL_MAX_ATTEMPTS = int(os.getenv("FILE_POLL_MAX_ATTEMPTS", 60))
+
+# Backoff for Gemini 503s: rescheduled retries instead of sleeping inside the worker
+OVERLOAD_BACKOFF_BASE_SECONDS = int(os.getenv("OVERLOAD_BACKOFF_BASE_SECONDS", 30))
+OVERLOAD_BACKOFF_MAX_SECONDS = int(os.getenv("OVERLOAD_BACKOFF_MAX_SECONDS", 15 * 60))
+OVERLOAD_MAX_ATTEMPTS = int(os.getenv("OVERLOAD_MAX_ATTEMPTS", 8))
+
+# How often a meeting may go back to the upload stage because its Gemini file was
+# rejected or lost. Moving to another key after a 429 is bounded by the pool size instead.
+MAX_UPLOAD_RESTARTS = int(os.getenv("MAX_UPLOAD_RESTARTS", 3))
+
+# How often a parked duplicate upload checks that the meeting it waits on is still alive
+DEDUPE_WATCHDOG_INTERVAL_SECONDS = int(os.getenv("DEDUPE_WATCHDOG_INTERVAL_SECONDS", 10 * 60))
+
+
+def overload_backoff(attempt: int) -> float:
+    """Exponential backoff with equal jitter: half of the window fixed, half random."""
+    window = min(OVERLOAD_BACKOFF_MAX_SECONDS, OVERLOAD_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return window / 2 + random.uniform(0, window / 2)
 
 
 # --- Helper function for notifications ---
 def notify_frontend(userId, meetingId, status):
-    """Makes an internal API call to the FastAPI server to trigger a WebSocket event."""
+    """
+    Emits 'meeting_processing_complete' to the user's room straight through the Redis
+    message queue. Falls back to the API's /internal/notify endpoint if that fails.
+    """
+    emitter = get_socket_emitter()
+    if emitter is not None:
+        try:
+            emitter.emit('meeting_processing_complete', {'meetingId': meetingId, 'status': status}, room=userId)
+            print(f"✅ Notification published for meeting {meetingId} with status '{status}'.")
+            return
+        except Exception as e:
+            print(f"⚠️ Could not publish notification for meeting {meetingId} through Redis: {e}. Falling back to HTTP.")
+
     try:
         api_url = os.getenv("API_BASE_URL") # e.g., https://audio-chat-ai.onrender.com
         internal_key = os.getenv("INTERNAL_API_KEY")
-        print(f'Internal_API:{internal_key}')
         if not api_url or not internal_key:
             print("🔴 ERROR: API_BASE_URL or INTERNAL_API_KEY not set. Cannot send notification.")
             return
@@ -54,18 +115,159 @@ def notify_frontend(userId, meetingId, status):
 
 
 
+_supabase: Client | None = None
+
+
+def get_supabase() -> Client:
+    """Returns a Supabase client shared by all stages running in this worker process."""
+    global _supabase
+    if _supabase is None:
+        _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+
+def job_cache_id(job: dict) -> str:
+    """
+    Uploaded Gemini files and finished segment transcripts are cached under this id, so
+    retries can skip work already done. It is the content hash and shared across users on
+    purpose: both are derived only from the recording bytes the uploader already has, so
+    reusing them saves Gemini cost without exposing another user's meeting.
+    """
+    return job.get("content_hash") or job.get("meeting_id")
+
+
+def fail_meeting(supabase: Client, job: dict, error):
+    """Marks a meeting as failed for good and hands waiting duplicates their own run."""
+    meeting_id = job.get("meeting_id")
+    user_id = job.get("user_id")
+    content_hash = job.get("content_hash")
+
+    print(f"🔴 All retries failed for meeting {meeting_id}. Marking as failed. Final error: {error}")
+    supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id).execute()
+    ProgressReporter(meeting_id, user_id).update("failed", force=True)
+    notify_frontend(user_id, meeting_id, "failed")
+
+    # Waiting duplicates can't reuse a failed analysis, so give them their own run
+    if content_hash:
+        for waiter in dedupe.release(user_id, content_hash):
+            if dedupe.claim_or_wait(content_hash, waiter):
+                process_meeting_task.delay(waiter)
+            else:
+                watch_parked_duplicate(waiter)
+
+
+def watch_parked_duplicate(job: dict):
+    """Schedules the check that rescues a parked duplicate if its leader dies."""
+    check_parked_duplicate_task.apply_async(args=[job], countdown=DEDUPE_WATCHDOG_INTERVAL_SECONDS)
+
+
+def stage_deferrals(task, job: dict) -> int:
+    """How often this stage was rescheduled without it being an error (see defer_stage)."""
+    return job.get("deferrals", {}).get(task.name, 0)
+
+
+def defer_stage(task, job: dict, countdown: float, **updates):
+    """
+    Reschedules the current stage without spending its regular retry budget.
+    Celery still counts the reschedule in request.retries, so it is also recorded in
+    job["deferrals"] and handle_stage_error adds it back to the stage's max_retries.
+    """
+    deferrals = {**job.get("deferrals", {}), task.name: stage_deferrals(task, job) + 1}
+    return task.retry(
+        args=[{**job, **updates, "deferrals": deferrals}],
+        countdown=countdown,
+        max_retries=task.request.retries + 1,
+    )
+
+
+def handle_stage_error(task, job: dict, error: Exception):
+    """
+    Shared retry policy for every pipeline stage. Gemini overloads are rescheduled with
+    jittered exponential backoff; anything else gets the regular retries. Once those run
+    out the meeting is failed and the rest of the chain is skipped.
+    """
+    meeting_id = job.get("meeting_id")
+
+    if isinstance(error, ModelOverloadedException):
+        # Gemini is browning out. Free this worker slot and come back later. The retry
+        # re-runs only this stage with the job it received (file URI, key, attempt count),
+        # and the uploaded file and any finished segments are cached for it.
+        attempt = job.get("overload_attempts", 0)
+        if attempt >= OVERLOAD_MAX_ATTEMPTS:
+            fail_meeting(get_supabase(), job, error)
+            raise Ignore()
+
+        countdown = overload_backoff(attempt)
+        print(f"🚦 Gemini overloaded at stage '{task.name}' for meeting {meeting_id}. "
+              f"Rescheduling in {countdown:.0f}s (attempt {attempt + 1}/{OVERLOAD_MAX_ATTEMPTS}).")
+        raise defer_stage(task, job, countdown, overload_attempts=attempt + 1)
+
+    print(f"❌ Stage '{task.name}' failed for meeting {meeting_id}: {error}. Retrying if possible...")
+    try:
+        # request.retries includes the deferrals, so they are added to the budget
+        task.retry(exc=error, countdown=60, max_retries=task.max_retries + stage_deferrals(task, job))
+    except Retry:
+        raise
+    except Exception as retry_exc:
+        # This block runs only after all retries have been exhausted.
+        fail_meeting(get_supabase(), job, retry_exc)
+        raise Ignore()
+
+
+def build_pipeline(job: dict, start_stage: str = "upload", end_stage: str | None = None):
+    """
+    Builds the Celery chain for a meeting, from `start_stage` through `end_stage`
+    (the last stage when None). Each stage receives the job dict returned by the previous one.
+    """
+    if job.get("segmented"):
+        stages = [analyze_segments_task, persist_analysis_task, notify_meeting_task]
+        names = ["segments", "persist", "notify"]
+    else:
+        stages = [upload_to_gemini_task, wait_for_gemini_file_task, analyze_meeting_task,
+                  persist_analysis_task, notify_meeting_task]
+        names = ["upload", "wait", "analyze", "persist", "notify"]
+
+    end = names.index(end_stage) + 1 if end_stage in names else len(stages)
+    stages = stages[names.index(start_stage):end] if start_stage in names else stages[:end]
+    return chain(stages[0].s(job), *[stage.s() for stage in stages[1:]])
+
+
+def restart_from_upload(task, job: dict, current_stage: str, exclude_key: str | None = None):
+    """
+    Drops the current Gemini file from the job and replaces the current stage with
+    upload -> ... -> `current_stage`. Celery appends the rest of the running chain
+    (self.request.chain) to the replacement, so later stages must not be included here.
+    After MAX_UPLOAD_RESTARTS restarts that aren't a move to another key, the meeting is failed.
+    """
+    job = {k: v for k, v in job.items() if k not in ("file_uri", "mime_type", "key_fingerprint", "file_state")}
+    if exclude_key:
+        job["excluded_keys"] = job.get("excluded_keys", []) + [exclude_key]
+    else:
+        restarts = job.get("restarts", 0)
+        if restarts >= MAX_UPLOAD_RESTARTS:
+            fail_meeting(get_supabase(), job, Exception(
+                f"Gemini file was rejected or lost {restarts + 1} times at stage '{current_stage}'."
+            ))
+            raise Ignore()
+        job["restarts"] = restarts + 1
+    raise task.replace(build_pipeline(job, "upload", current_stage))
+
+
+# ========================================================================
+# PIPELINE STAGES
+# ========================================================================
+
 @celery_app.task(name='process_meeting_task', bind=True, max_retries=3)
 def process_meeting_task(self, job: dict):
     """
-    Downloads a file from a URL, processes it with Gemini, and cleans up.
-    Includes automatic retries for download or processing errors.
+    Entry point and 'fetch' stage: validates the job, decides between whole-file and
+    segmented analysis, and replaces itself with the matching chain of stages.
     """
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    supabase = get_supabase()
     
     meeting_id = job.get("meeting_id")
     user_id = job.get("user_id")
     recording_url = job.get("recording_url")
-    recording_content_type = job.get("recording_content_type")
 
     # Guard clause: Fail immediately if no URL is provided.
     if not recording_url:
@@ -74,81 +276,246 @@ def process_meeting_task(self, job: dict):
         notify_frontend(user_id, meeting_id, "failed")
         return
 
-    # Securely create a temporary file that will be cleaned up automatically.
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".tmp") as temp_f:
-        temp_file_path = temp_f.name
-
     try:
         print(f"⚙️ Celery worker picked up job for meeting: {meeting_id}")
-        print(f"⬇️ Downloading from: {recording_url}")
+        supabase.table("meetings").update({"status": "processing"}).eq("id", meeting_id).execute()
 
-        # --- Download Logic ---
-        # Use streaming to handle large files without consuming all available memory.
-        with requests.get(recording_url, stream=True, timeout=300) as r:
-            # Raise an error for bad responses (404, 500, etc.)
-            r.raise_for_status() 
-            with open(temp_file_path, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        
-        print(f"✅ Download complete. File saved to: {temp_file_path}")
+        dedupe.renew(job.get("user_id"), job.get("content_hash"), meeting_id)
+        ProgressReporter(meeting_id, user_id).update("preparing", force=True)
 
-        # --- AI Processing Logic ---
-        with open(temp_file_path, 'rb') as f:
-            recording_contents = f.read()
+        # Long recordings are split into windows analyzed in parallel across the key pool
+        duration = audio_segmenter.probe_duration(recording_url) if audio_segmenter.is_available() else None
+        job = {**job, "duration": duration, "segmented": audio_segmenter.should_segment(duration)}
+    except Exception as e:
+        handle_stage_error(self, job, e)
 
+    raise self.replace(build_pipeline(job))
 
-        # recording_content_type,_ = mimetypes.guess_file_type(temp_file_path)
-        supabase.table("meetings").update({"status": "processing"}).eq("id", meeting_id).execute()
 
-        analysis_successful = False
+@celery_app.task(name='upload_to_gemini_task', bind=True, max_retries=3)
+def upload_to_gemini_task(self, job: dict):
+    """Streams the recording into the Gemini File API, or reuses a cached upload."""
+    meeting_id = job.get("meeting_id")
+    cache_id = job_cache_id(job)
+    excluded = set(job.get("excluded_keys", []))
+    recording_source = None
+    progress = ProgressReporter(meeting_id, job.get("user_id"))
+
+    try:
+        dedupe.renew(job.get("user_id"), job.get("content_hash"), meeting_id)
+
+        cached = gemini_file_cache.lookup(cache_id)
+        if cached and cached["key_fingerprint"] not in excluded and key_pool.resolve(cached["key_fingerprint"]):
+            print(f"♻️ Reusing Gemini file {cached['file_uri']} for meeting {meeting_id}")
+            progress.update("uploading", 100, force=True, reused=True)
+            return {**job, "file_uri": cached["file_uri"], "mime_type": cached["mime_type"],
+                    "key_fingerprint": cached["key_fingerprint"], "file_state": cached.get("state")}
+
+        # The recording is piped from storage straight into the Gemini upload,
+        # so the worker never holds the file in memory.
+        recording_source = RecordingSource.from_url(job["recording_url"], progress=progress.transfer)
         last_error = None
 
-        for key in GEMINI_API_KEYS:
+        # Keys in cooldown are skipped at once. The file is owned by the key that uploads it,
+        # so prefer a key with rate-limit room for the analysis that follows.
+        for key in key_pool.candidates(exclude=excluded, model=MODEL_NAME, tokens=estimate_audio_tokens(job.get("duration"))):
+            fingerprint = key_fingerprint(key)
             try:
-                print(f"🤖 Attempting analysis for meeting {meeting_id}... with Key:{key[-4:]}")
-                asyncio.run(analyze_audio_with_gemini_tools(
-                    supabase=supabase,
-                    meeting_id=meeting_id,
-                    audio_content=recording_contents,
-                    content_type=recording_content_type, 
-                    api_key=key
-                ))
-                analysis_successful = True
-                print(f"✅ Analysis successful for meeting {meeting_id}!")
-                break
+                print(f"⬆️ Uploading recording for meeting {meeting_id}... with Key:{key[-4:]}")
+                with key_pool.lease(key):
+                    file_uri, mime_type = start_upload(meeting_id, recording_source, job.get("recording_content_type"), key, cache_id)
+                return {**job, "file_uri": file_uri, "mime_type": mime_type,
+                        "key_fingerprint": fingerprint, "file_state": "PROCESSING"}
             except (google.api_core.exceptions.PermissionDenied,
                     google.api_core.exceptions.ResourceExhausted,
                     ApiKeyException,
                     requests.exceptions.HTTPError) as e:
-                
                 print(f"API key failed. Trying next key. Reason: {type(e).__name__}")
                 last_error = e
                 continue
-        
-        if not analysis_successful:
-            raise Exception(f"All Gemini API keys failed. Last error: {last_error}")
 
-        # If we reach here, the job is done. Notify the frontend.
-        notify_frontend(user_id, meeting_id, "completed")
-        return {"status": "completed", "meetingId": meeting_id, "userId": user_id}
+        raise Exception(f"All Gemini API keys failed. Last error: {last_error}")
 
+    except (Retry, Ignore):
+        raise
     except Exception as e:
-        print(f"❌ Job failed for meeting {meeting_id}: {e}. Retrying if possible...")
-        
-        # This will automatically retry the task (including the download)
-        # after a delay. It will try up to `max_retries` (3) times.
-        try:
-            self.retry(exc=e, countdown=60)
-        except Exception as retry_exc:
-            # This block runs only after all retries have been exhausted.
-            print(f"🔴 All retries failed for meeting {meeting_id}. Marking as failed. Final error: {retry_exc}")
-            supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id).execute()
-            notify_frontend(user_id, meeting_id, "failed")
-            
+        handle_stage_error(self, job, e)
+
     finally:
-        # This block always runs, ensuring the temporary file is deleted
-        # whether the task succeeded, failed, or was retried.
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
-            print(f"🧹 Cleaned up temporary file: {temp_file_path}")
+        # Deletes the spooled temporary file, if the source had to create one
+        if recording_source is not None:
+            recording_source.cleanup()
+
+
+@celery_app.task(name='wait_for_gemini_file_task', bind=True, max_retries=FILE_POLL_MAX_ATTEMPTS)
+def wait_for_gemini_file_task(self, job: dict):
+    """
+    Checks the Gemini file state once. While it is still PROCESSING the task reschedules
+    itself instead of sleeping, so it holds no worker slot between polls.
+    """
+    meeting_id = job.get("meeting_id")
+    cache_id = job_cache_id(job)
+
+    try:
+        if job.get("file_state") == "ACTIVE":
+            return job
+
+        dedupe.renew(job.get("user_id"), job.get("content_hash"), meeting_id)
+        key = key_pool.resolve(job.get("key_fingerprint"))
+        if key is None:
+            restart_from_upload(self, job, "wait")
+
+        state = get_file_state(job["file_uri"], key)
+        print(f"Current file state: {state}")
+        ProgressReporter(meeting_id, job.get("user_id")).update("waiting_for_file", force=True, fileState=state, poll=self.request.retries + 1)
+
+        if state == "ACTIVE":
+            gemini_file_cache.mark_active(cache_id)
+            return {**job, "file_state": "ACTIVE"}
+
+        if state in ("FAILED", "EXPIRED", "MISSING"):
+            print(f"File processing failed or expired: {state}. Uploading again...")
+            gemini_file_cache.invalidate(cache_id)
+            restart_from_upload(self, job, "wait")
+
+        raise self.retry(countdown=FILE_POLL_INTERVAL_SECONDS)
+
+    except (Retry, Ignore):
+        raise
+    except Exception as e:
+        handle_stage_error(self, job, e)
+
+
+@celery_app.task(name='analyze_meeting_task', bind=True, max_retries=3)
+def analyze_meeting_task(self, job: dict):
+    """Runs generateContent against the ACTIVE Gemini file."""
+    meeting_id = job.get("meeting_id")
+    cache_id = job_cache_id(job)
+
+    try:
+        dedupe.renew(job.get("user_id"), job.get("content_hash"), meeting_id)
+        key = key_pool.resolve(job.get("key_fingerprint"))
+        if key is None:
+            restart_from_upload(self, job, "analyze")
+
+        print(f"🤖 Attempting analysis for meeting {meeting_id}... with Key:{key[-4:]}")
+        ProgressReporter(meeting_id, job.get("user_id")).update("analyzing", force=True)
+        try:
+            with key_pool.lease(key):
+                response = request_analysis(job["file_uri"], job["mime_type"], key, audio_seconds=job.get("duration"))
+        except RateLimitExceeded:
+            # The key's budget is used up for now; come back when it has refilled
+            # instead of holding the worker. This doesn't count against max_retries.
+            print(f"⏳ Key:{key[-4:]} has no rate-limit headroom. Rescheduling analysis for meeting {meeting_id}.")
+            raise defer_stage(self, job, RATE_LIMIT_MAX_WAIT_SECONDS)
+        except requests.exceptions.HTTPError as e:
+            status_code = e.response.status_code
+            if status_code in (403, 404):
+                # The file was deleted or is no longer accessible; upload it once more
+                print(f"⚠️ Gemini file {job['file_uri']} is no longer available. Re-uploading...")
+                gemini_file_cache.invalidate(cache_id)
+                restart_from_upload(self, job, "analyze")
+            if status_code == 429 and len(set(job.get("excluded_keys", [])) | {job["key_fingerprint"]}) < len(key_pool):
+                # Quota is per key and the file is owned by this key, so move to another one
+                print(f"API key quota exhausted. Re-uploading with the next key...")
+                restart_from_upload(self, job, "analyze", exclude_key=job["key_fingerprint"])
+            raise
+
+        print(f"✅ Analysis successful for meeting {meeting_id}!")
+        return {**job, "analysis": extract_function_args(response)}
+
+    except (Retry, Ignore):
+        raise
+    except Exception as e:
+        handle_stage_error(self, job, e)
+
+
+@celery_app.task(name='analyze_segments_task', bind=True, max_retries=3)
+def analyze_segments_task(self, job: dict):
+    """Segmented analysis for long recordings; replaces the upload, wait and analyze stages."""
+    meeting_id = job.get("meeting_id")
+
+    try:
+        dedupe.renew(job.get("user_id"), job.get("content_hash"), meeting_id)
+        analysis = asyncio.run(analyze_audio_in_segments(
+            meeting_id=meeting_id,
+            recording_url=job["recording_url"],
+            duration=job["duration"],
+            cache_id=job_cache_id(job),
+            progress=ProgressReporter(meeting_id, job.get("user_id"))
+        ))
+        print(f"✅ Analysis successful for meeting {meeting_id}!")
+        return {**job, "analysis": analysis}
+
+    except (Retry, Ignore):
+        raise
+    except Exception as e:
+        handle_stage_error(self, job, e)
+
+
+@celery_app.task(name='persist_analysis_task', bind=True, max_retries=3)
+def persist_analysis_task(self, job: dict):
+    """Stores the analysis, and clones it into duplicate uploads waiting on this recording."""
+    supabase = get_supabase()
+    meeting_id = job.get("meeting_id")
+    content_hash = job.get("content_hash")
+
+    try:
+        dedupe.renew(job.get("user_id"), content_hash, meeting_id)
+        ProgressReporter(meeting_id, job.get("user_id")).update("persisting", force=True)
+        save_analysis(supabase, meeting_id, job["analysis"])
+
+        # Serve any duplicate uploads of the same recording that were waiting on this one
+        cloned = []
+        if content_hash:
+            for waiter in dedupe.release(job.get("user_id"), content_hash):
+                dedupe.clone_meeting_details(supabase, meeting_id, waiter["meeting_id"])
+                cloned.append({"user_id": waiter["user_id"], "meeting_id": waiter["meeting_id"]})
+
+        # The analysis is in the database now; keep it out of the remaining messages
+        return {**{k: v for k, v in job.items() if k != "analysis"}, "cloned": cloned}
+
+    except (Retry, Ignore):
+        raise
+    except Exception as e:
+        handle_stage_error(self, job, e)
+
+
+@celery_app.task(name='notify_meeting_task', bind=True, max_retries=3)
+def notify_meeting_task(self, job: dict):
+    """Tells the frontend that the meeting (and any cloned duplicates) are ready."""
+    meeting_id = job.get("meeting_id")
+    user_id = job.get("user_id")
+
+    ProgressReporter(meeting_id, user_id).update("completed", 100, force=True)
+    notify_frontend(user_id, meeting_id, "completed")
+    for duplicate in job.get("cloned", []):
+        notify_frontend(duplicate["user_id"], duplicate["meeting_id"], "completed")
+
+    return {"status": "completed", "meetingId": meeting_id, "userId": user_id}
+
+
+@celery_app.task(name='check_parked_duplicate_task')
+def check_parked_duplicate_task(job: dict):
+    """
+    Watchdog for an upload parked behind another meeting with the same recording.
+    Normally the leader clones its result into the parked meeting (or hands it its
+    own run when it fails). If the leader's lease has expired without either, the
+    parked meeting takes over and is analyzed itself. Checks repeat only while the
+    meeting is still 'uploaded' and parked behind another leader.
+    """
+    meeting_id = job.get("meeting_id")
+    response = get_supabase().table("meetings").select("status").eq("id", meeting_id).execute()
+    if not response.data or response.data[0].get("status") != "uploaded":
+        return  # Served, started on its own, or deleted
+
+    leader, claimed = dedupe.take_over_if_orphaned(job["user_id"], job["content_hash"], meeting_id)
+    if claimed:
+        print(f"🛟 Leader for meeting {meeting_id}'s recording is gone. Analyzing it on its own.")
+        process_meeting_task.delay(job)
+        return
+    if leader == meeting_id:
+        # No longer parked: it leads its own run (e.g. handed over by a failed leader),
+        # and a second claim later on would start that run twice
+        return
+    watch_parked_duplicate(job)
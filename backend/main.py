@@ -3,13 +3,12 @@ import os
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Annotated
-from modules.utility.transcript_generator import analyze_audio_with_gemini_tools
 import google.generativeai as genai
 
 import bcrypt
 import postgrest.exceptions
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, status, Form, File, UploadFile, Request
+from fastapi import Depends, FastAPI, HTTPException, status, Form, File, UploadFile, Request, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from pydantic import BaseModel, EmailStr
@@ -18,13 +17,30 @@ import json
 from gotrue.errors import AuthApiError # Add this import
 from fastapi import BackgroundTasks # Add this import
 from modules.utility.generate_embedding import create_and_store_embeddings_manually
-from modules.utility.ai_response import get_rag_response
+from modules.utility.ai_response import get_rag_response, stream_rag_response
 from fastapi.middleware.cors import CORSMiddleware 
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 from pydantic import BaseModel
 from typing import List, Optional
 from modules.utility.utility import enrich_participants
 import time
 from modules.utility.socket_manager import sio, socket_app
+from modules.utility.storage_stream import UploadStream, UploadRejectedException, stream_to_storage
+from modules.utility.upload_sessions import UploadSessionStore, UploadSessionError
+from modules.utility import dedupe
+from modules.utility import db
+from modules.utility.http_cache import weak_etag, etag_matches, not_modified, json_response
+from modules.utility.compression import CompressionMiddleware
+from modules.utility.transcript_index import load_transcript, load_transcript_head, parse_bound, window
+from modules.utility.vector_index import vector_index
+from modules.utility.pagination import encode_cursor, after_cursor, InvalidCursorError, get_cached_count, set_cached_count, invalidate_count
+from modules.utility.metrics import metrics
+from modules.utility.auth import resolve_user, get_profile, cache_profile, profile_cache_hit_ratio
+from modules.utility.progress import latest_progress
+from modules.utility.embedding_cache import query_embedding_cache_hit_ratio
+from modules.utility import answer_cache
+from modules.utility import single_flight
 import socketio
 import google.api_core.exceptions
 from modules.utility.pydantic_model import *
@@ -37,11 +53,12 @@ from contextlib import asynccontextmanager
 # from pydub import AudioSegment
 import io
 import tempfile
-from celery_worker import celery_app, process_meeting_task
+from celery_worker import celery_app, process_meeting_task, watch_parked_duplicate
 
 
 TEMP_DIR = pathlib.Path("./temp_recordings").resolve()
 TEMP_DIR.mkdir(exist_ok=True)
+upload_sessions = UploadSessionStore(TEMP_DIR)
 
 INTERNAL_API_KEY = os.getenv("INTERNAL_API_KEY")
 
@@ -67,6 +84,13 @@ app.add_middleware(
     allow_headers=["*"], # Allows all headers
 )
 
+# Compress complete JSON/text bodies above the threshold; streams and Socket.IO pass through
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE_BYTES", 1024)),
+    exclude_paths=("/socket.io",),
+)
+
 
 # Supabase Client
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -99,6 +123,55 @@ ALLOWED_MIME_TYPES = ["audio/mpeg", "audio/wav", "audio/x-wav", "audio/mp4", "vi
 # BACKGROUND TASK FUNCTION
 # ========================================================================
 
+async def queue_meeting_for_processing(meeting_id: str, user_id: str, content_type: str, file_path: str, content_hash: str | None = None) -> str:
+    """
+    Marks a meeting as 'uploaded' once its recording is in storage and hands it
+    off to the Celery worker for analysis. If the user already has an analyzed meeting
+    with the same recording hash, its details are cloned instead and no job is queued;
+    if one is still being analyzed, this meeting waits on it.
+    Returns the resulting meeting status.
+    """
+    recording_url = supabase.storage.from_("recordings").get_public_url(file_path)
+
+    # Update the meeting record with the URL, content hash and 'uploaded' status
+    await db.execute(supabase.table("meetings").update({
+        "recording_url": recording_url,
+        "content_hash": content_hash,
+        "status": "uploaded",
+    }).eq("id", meeting_id))
+
+    if content_hash:
+        source_meeting_id = await db.run(dedupe.find_completed_meeting, supabase, user_id, content_hash, exclude_meeting_id=meeting_id)
+        if source_meeting_id and await db.run(dedupe.clone_meeting_details, supabase, source_meeting_id, meeting_id):
+            await sio.emit(
+                'meeting_processing_complete',
+                {'meetingId': meeting_id, 'status': 'completed'},
+                room=user_id
+            )
+            return "completed"
+
+    print(f"✅ File uploaded successfully. Queuing job for analysis.")
+
+    job_data = {
+        "meeting_id": meeting_id,
+        "user_id": user_id,
+        "recording_content_type": content_type,
+        "recording_url": recording_url,
+        "content_hash": content_hash,
+    }
+
+    try:
+        if content_hash and not dedupe.claim_or_wait(content_hash, job_data):
+            # Another upload of the same recording is being analyzed; the worker
+            # will clone its result into this meeting when it finishes.
+            watch_parked_duplicate(job_data)
+            return "uploaded"
+        process_meeting_task.delay(job_data)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to Put the File in the Background Process: {e}")
+
+    return "uploaded"
+
 
 
 # --- JWT Helper Function ---
@@ -130,7 +203,7 @@ def create_refresh_token(data: dict):
 # --- User Verification Dependency ---
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     """
-    Validates the Supabase JWT and returns the user.
+    Validates the Supabase JWT and returns the user's profile.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -138,27 +211,20 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        # Use the Supabase client to verify the token and get user data
-        user_response = supabase.auth.get_user(token)
-        user = user_response.user
-        
-        if not user:
-            raise credentials_exception
-        
-        # Now, fetch the user's profile from your 'profiles' table
-        profile_response = supabase.table("profiles").select("*").eq("id", user.id).execute()
-        
-        if not profile_response.data:
+        # Verify the token locally; the profile comes from the cache when possible
+        user_id, email = await resolve_user(supabase, token)
+        profile = await get_profile(supabase, user_id)
+
+        if not profile:
             # This is a fallback, in case the profile wasn't created
             # You can return the auth user data directly
-            return {"id": user.id, "email": user.email}
+            return {"id": user_id, "email": email}
 
         # Combine auth data and profile data for a complete user object
-        full_user_profile = profile_response.data[0]
-        full_user_profile['email'] = user.email # Add email from auth user
-        return full_user_profile
+        profile['email'] = email # Add email from the token
+        return profile
 
-    except (AuthApiError, Exception):
+    except (AuthApiError, JWTError, Exception):
         raise credentials_exception
 
 # --- API Endpoints ---
@@ -173,7 +239,7 @@ async def register_user(
     try:
         # Sign up the user and pass names as metadata
         # The database trigger will use this metadata to create the profile
-        auth_response = supabase.auth.sign_up({
+        auth_response = await db.run(supabase.auth.sign_up, {
             "email": email,
             "password": password,
             "options": {
@@ -207,7 +273,7 @@ async def login_for_access_token(
     try:
         # Use Supabase's built-in sign-in method
         # This handles password verification and returns a session with tokens
-        auth_response = supabase.auth.sign_in_with_password({
+        auth_response = await db.run(supabase.auth.sign_in_with_password, {
             "email": form_data.username,
             "password": form_data.password,
         })
@@ -221,11 +287,12 @@ async def login_for_access_token(
         
         # Step 2: Fetch the user's profile from your 'profiles' table
         user_id = session.user.id
-        profile_response = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
+        profile_response = await db.execute(supabase.table("profiles").select("*").eq("id", user_id).single())
         
         if not profile_response.data:
             # This can happen if the profile wasn't created, handle gracefully
             raise HTTPException(status_code=404, detail="User authenticated but profile not found.")
+        cache_profile(user_id, profile_response.data)
         
         # Step 3: Combine tokens and profile into a single response
         return {
@@ -285,19 +352,75 @@ async def health_check():
 # ========================================================================
 
 # In main.py
-@app.get("/meetings", response_model=PaginatedMeetingsResponse)
-async def get_all_meetings(current_user: Annotated[dict, Depends(get_current_user)],page: int = 1,limit: int = 20):
+# Columns each endpoint actually renders; the transcript and other heavy JSON stay in the database
+MEETING_LIST_COLUMNS = "id, title, status, meeting_date, created_at, updated_at, participants, meeting_details(summary)"
+MEETING_DETAIL_COLUMNS = (
+    "id, title, status, meeting_date, duration, participants, host, recording_url, created_at, updated_at, "
+    "meeting_details(summary, actionable_items, transcript_count)"
+)
+# The detail view carries this many transcript segments; the rest is paged from /transcript
+TRANSCRIPT_HEAD_SEGMENTS = int(os.getenv("TRANSCRIPT_HEAD_SEGMENTS", 100))
+
+
+def embedded_one(row: dict, relation: str) -> dict:
+    """PostgREST returns a to-one embed as an object or a one-element list depending on the relationship."""
+    embedded = row.pop(relation, None) or {}
+    if isinstance(embedded, list):
+        embedded = embedded[0] if embedded else {}
+    return embedded
 
+
+# The heavy read routes return plain dicts serialized by orjson (json_response),
+# skipping jsonable_encoder and response_model validation; the models document the shape.
+@app.get("/meetings", response_model=PaginatedMeetingsResponse, response_class=ORJSONResponse)
+async def get_all_meetings(
+    request: Request,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    page: int = 1,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    include_total: bool = False,
+):
+    """
+    Lists the user's meetings, newest first. Pass the returned `next_cursor` as
+    `cursor` to get the next page in constant time. The `page` parameter is still
+    honoured when no cursor is given. The total is cached per user and is only
+    included in cursor mode when `include_total` is set. Responds 304 when the
+    page is unchanged since the ETag in If-None-Match.
+    """
     user_id = current_user.get("id")
     offset = (page - 1) * limit
 
     try:
-        response = supabase.table("meetings").select("*", count='exact').eq("user_id", user_id).order("created_at", desc=True).range(offset, offset + limit - 1).execute()
-        
-        total_meetings = response.count
+        # One extra row tells us whether there is a next page, without counting
+        query = supabase.table("meetings").select(MEETING_LIST_COLUMNS).eq("user_id", user_id).order("created_at", desc=True).order("id", desc=True)
+        if cursor:
+            query = after_cursor(query, cursor).limit(limit + 1)
+        else:
+            query = query.range(offset, offset + limit)
+        meetings_response = await db.execute(query)
+
+        rows = meetings_response.data or []
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None
+
+        total_meetings = None
+        if include_total or not cursor:
+            total_meetings = get_cached_count(user_id)
+            if total_meetings is None:
+                count_response = await db.execute(supabase.table("meetings").select("id", count='exact', head=True).eq("user_id", user_id))
+                total_meetings = count_response.count or 0
+                set_cached_count(user_id, total_meetings)
+
+        # The page is identified by the versions of its rows (plus the total and paging)
+        etag = weak_etag(user_id, cursor, page, limit, total_meetings, *(f"{m['id']}@{m.get('updated_at')}" for m in rows))
+        if etag_matches(request.headers.get("If-None-Match"), etag):
+            return not_modified(etag)
+
         processed_meetings = []
 
-        for meeting in response.data or []:
+        for meeting in rows:
             # Determine the display status
             proc_status = meeting.get("status")
             derived_status = "processing"
@@ -307,55 +430,77 @@ async def get_all_meetings(current_user: Annotated[dict, Depends(get_current_use
                 derived_status = 'completed'
 
             # Build a new, clean dictionary for each meeting
-            processed_meetings.append(
-                MeetingInList(
-                    id=meeting.get("id"),
-                    title=meeting.get("title", "Untitled Meeting"),
-                    status=derived_status,
-                    date=meeting.get("meeting_date"),
-                    createdAt=meeting.get("created_at"),
-                    participants=meeting.get("participants", []),
-                    summary=meeting.get("summary", None)
-                )
-            )
-
-        return {
+            processed_meetings.append({
+                "id": meeting.get("id"),
+                "title": meeting.get("title") or "Untitled Meeting",
+                "status": derived_status,
+                "date": meeting.get("meeting_date"),
+                "createdAt": meeting.get("created_at"),
+                "participants": meeting.get("participants") or [],
+                "summary": embedded_one(meeting, "meeting_details").get("summary"),
+            })
+
+        return json_response({
             "meetings": processed_meetings,
             "total": total_meetings,
-            "page": page,
-            "limit": limit}
-    
+            "page": None if cursor else page,
+            "limit": limit,
+            "next_cursor": next_cursor}, etag)
+
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch meetings: {e}")
 
 
 
-@app.get("/meetings/{meeting_id}", response_model=MeetingDetail)
+@app.get("/meetings/{meeting_id}", response_model=MeetingDetail, response_class=ORJSONResponse)
 async def get_meeting_details(
     meeting_id: uuid.UUID,
+    request: Request,
     current_user: Annotated[dict, Depends(get_current_user)],
 ):
     """
     Fetches the complete details for a single meeting, ensuring the user owns it.
+    With a matching If-None-Match it answers 304 after a single-row version check,
+    before the details are loaded or the participants enriched.
     """
     user_id = current_user.get("id")
     str_meeting_id = str(meeting_id)
+    if_none_match = request.headers.get("If-None-Match")
 
     try:
+        if if_none_match:
+            version_response = await db.execute(supabase.table("meetings").select("id, updated_at").eq("id", str_meeting_id).eq("user_id", user_id))
+            if version_response.data:
+                etag = weak_etag(str_meeting_id, version_response.data[0].get("updated_at"))
+                if etag_matches(if_none_match, etag):
+                    return not_modified(etag)
+
         # Fetch the meeting and its related details in one call
-        response = supabase.table("meetings").select("*, meeting_details(*)").eq("id", str_meeting_id).eq("user_id", user_id).execute()
+        meeting_response = await db.execute(supabase.table("meetings").select(MEETING_DETAIL_COLUMNS).eq("id", str_meeting_id).eq("user_id", user_id))
 
-        if not response.data:
+        if not meeting_response.data:
             raise HTTPException(status_code=404, detail="Meeting not found or you do not have permission.")
 
-        meeting_data = response.data[0]
-        details = meeting_data.pop('meeting_details', {}) or {}
+        meeting_data = meeting_response.data[0]
+        details = embedded_one(meeting_data, "meeting_details")
+        transcript, transcript_count = None, None
+        if details:
+            version = meeting_data.get("updated_at")
+            transcript_count = details.get("transcript_count")
+            if transcript_count is None:
+                # Saved before the count was stored: index the whole transcript once
+                full_transcript, _ = await load_transcript(supabase, str_meeting_id, version)
+                transcript, transcript_count = full_transcript[:TRANSCRIPT_HEAD_SEGMENTS], len(full_transcript)
+            else:
+                transcript = await load_transcript_head(supabase, str_meeting_id, version, TRANSCRIPT_HEAD_SEGMENTS)
         host = meeting_data.get("host", "Unknown Host")
         participant_emails = meeting_data.get("participants", [{"email": "", "name": "","role": ""}])
         # 2. Call the helper function to get the enriched list
         enriched_participants = await enrich_participants(supabase, host, participant_emails)
         # Derive the single status field
-        proc_status = meeting_data.get("processing_status")
+        proc_status = meeting_data.get("status")
         derived_status = "processing"
         if proc_status == 'failed':
             derived_status = 'failed'
@@ -364,7 +509,7 @@ async def get_meeting_details(
 
 
         # Construct the final response to match the frontend 'Meeting' interface
-        return {
+        return json_response({
             "id": meeting_data.get("id"),
             "title": meeting_data.get("title"),
             "date": meeting_data.get("meeting_date"),
@@ -373,15 +518,88 @@ async def get_meeting_details(
             "recordingUrl": meeting_data.get("recording_url"),
             "createdAt": meeting_data.get("created_at"),
             "status": derived_status,
-            "transcript": details.get("transcript"),
+            "transcript": transcript,
+            "transcriptCount": transcript_count,
             "summary": details.get("summary"),
             "actionItems": details.get("actionable_items"),
-        }
+        }, weak_etag(str_meeting_id, meeting_data.get("updated_at")))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch meeting details: {e}")
 
 
 
+@app.get("/meetings/{meeting_id}/transcript", response_model=TranscriptPage, response_class=ORJSONResponse)
+async def get_meeting_transcript(
+    meeting_id: uuid.UUID,
+    request: Request,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Pages through a meeting's transcript. `from`/`to` (HH:MM:SS) restrict it to the
+    segments starting in that window; `offset`/`limit` page within the window.
+    """
+    user_id = current_user.get("id")
+    str_meeting_id = str(meeting_id)
+
+    try:
+        start, end = parse_bound(from_), parse_bound(to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version_response = await db.execute(supabase.table("meetings").select("id, updated_at").eq("id", str_meeting_id).eq("user_id", user_id))
+    if not version_response.data:
+        raise HTTPException(status_code=404, detail="Meeting not found or you do not have permission.")
+    version = version_response.data[0].get("updated_at")
+
+    etag = weak_etag(str_meeting_id, version, "transcript", offset, limit, from_, to)
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return not_modified(etag)
+
+    transcript, index = await load_transcript(supabase, str_meeting_id, version)
+    lo, hi = window(index, start, end)
+    first = min(lo + offset, hi)
+    last = min(first + limit, hi)
+
+    return json_response({
+        "meetingId": str_meeting_id,
+        "segments": transcript[first:last],
+        "offset": offset,
+        "limit": limit,
+        "total": hi - lo,
+        "nextOffset": offset + (last - first) if last < hi else None,
+    }, etag)
+
+
+@app.get("/meetings/{meeting_id}/progress")
+async def get_meeting_progress(
+    meeting_id: uuid.UUID,
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """
+    Returns the latest processing progress event of a meeting, for clients that connect
+    after the job started. Live updates arrive as 'meeting_progress' socket events.
+    """
+    user_id = current_user.get("id")
+    str_meeting_id = str(meeting_id)
+
+    progress = latest_progress(str_meeting_id)
+    if progress and progress.get("userId") == user_id:
+        return {k: v for k, v in progress.items() if k != "userId"}
+
+    # Nothing reported (yet, or any more): fall back to the stored status
+    response = await db.execute(supabase.table("meetings").select("id, status").eq("id", str_meeting_id).eq("user_id", user_id))
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Meeting not found or you do not have permission.")
+    return {"meetingId": str_meeting_id, "seq": 0, "stage": response.data[0].get("status"), "percent": None}
+
+
+
 # This is your updated, robust, non-blocking endpoint
 @app.post("/meetings/process")
 async def process_meeting(
@@ -399,6 +617,13 @@ async def process_meeting(
     if not user_id:
         raise HTTPException(status_code=403, detail="User ID not found")
 
+    # --- 0. Reject unsupported or oversized uploads before touching the database ---
+    if recording.content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {recording.content_type}")
+
+    if recording.size is not None and recording.size > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the maximum allowed size of {MAX_FILE_SIZE_MB} MB.")
+
     # --- 1. Generate IDs and prepare initial data ---
     meeting_id = str(uuid.uuid4())
     file_extension = pathlib.Path(recording.filename).suffix
@@ -426,60 +651,49 @@ async def process_meeting(
     }
     
     try:
-        insert_response = supabase.table("meetings").insert(initial_meeting_data).execute()
+        insert_response = await db.execute(supabase.table("meetings").insert(initial_meeting_data))
+        invalidate_count(user_id)
         created_meeting = insert_response.data[0]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to create initial meeting record: {e}")
 
-    # --- 3. Attempt to upload the file to Supabase Storage ---
+    # --- 3. Stream the file to Supabase Storage chunk by chunk ---
     file_path = f"{user_id}/{meeting_id}{file_extension}"
-    contents = await recording.read()
+    upload_stream = UploadStream(recording, max_bytes=MAX_FILE_SIZE_BYTES)
 
     try:
         print(f"Attempting to upload file to: {file_path}")
-        supabase.storage.from_("recordings").upload(
-            path=file_path,
-            file=contents,
-            file_options={"content-type": recording.content_type}
-        )
+        try:
+            await stream_to_storage("recordings", file_path, upload_stream, recording.content_type)
+        except UploadRejectedException as e:
+            # The upload was never valid, so drop the placeholder row instead of leaving a failed meeting behind
+            print(f"🚫 Upload rejected for meeting {meeting_id}: {e.detail}")
+            await db.execute(supabase.table("meetings").delete().eq("id", meeting_id))
+            invalidate_count(user_id)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        print(f"📦 Streamed {upload_stream.bytes_received} bytes to storage.")
         
         # --- 4a. On SUCCESSFUL upload ---
-        recording_url = supabase.storage.from_("recordings").get_public_url(file_path)
-        
-        # Update the meeting record with the URL and 'uploaded' status
-        supabase.table("meetings").update({
-            "recording_url": recording_url,
-            "status": "uploaded",
-        }).eq("id", meeting_id).execute()
-        
-        print(f"✅ File uploaded successfully. Queuing job for analysis.")
-
-        # Add the job to your multiprocessing queue for the worker to process
-        # Assuming 'meeting_queue' is stored in app.state from a startup event
-        job_data = {
-            "meeting_id": meeting_id,
-            "user_id": user_id,
-            "recording_content_type": recording.content_type,
-            "recording_url": recording_url,
-        }
-
-        try:
-
-            # request.app.state.task_queue.put(job_data)
-            process_meeting_task.delay(job_data)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to Put the File in the Background Process: {e}")
+        meeting_status = await queue_meeting_for_processing(
+            meeting_id, user_id, recording.content_type, file_path, content_hash=upload_stream.content_hash
+        )
 
         # Return the created meeting object to the frontend
-        created_meeting['status'] = 'uploaded' # Ensure the returned object is up to date
+        created_meeting['status'] = meeting_status # Ensure the returned object is up to date
         return {"meeting": created_meeting}
 
+    except HTTPException as e:
+        if e.status_code in (400, 413, 415):
+            raise
+        await db.execute(supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id))
+        raise
+
     except Exception as e:
         # --- 4b. On FAILED upload ---
         print(f"❌ Failed to upload file to storage: {e}")
         # Update the meeting record with 'failed' status
-        supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id).execute()
+        await db.execute(supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id))
         # Return a erver error to the frontend
         raise HTTPException(status_code=500, detail=f"File upload failed: {e}")
 
@@ -487,40 +701,274 @@ async def process_meeting(
 
 
 
+# ========================================================================
+# RESUMABLE (CHUNKED) UPLOADS
+# ========================================================================
+
+@app.post("/meetings/uploads", response_model=UploadSessionStatus)
+async def create_upload_session(
+    current_user: Annotated[dict, Depends(get_current_user)],
+    file_name: str = Form(...),
+    content_type: str = Form(...),
+    total_size: int = Form(...),
+    title: str = Form(...),
+    date: str = Form(...),
+    participants: str = Form("[]"),
+):
+    """
+    Starts a resumable upload. Creates the meeting row with status 'uploading'
+    and a staging directory for the chunks. Clients then PUT numbered chunks,
+    query the session to find what is missing, and finally call /complete.
+    """
+    user_id = current_user.get("id")
+
+    if not user_id:
+        raise HTTPException(status_code=403, detail="User ID not found")
+
+    if content_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {content_type}")
+
+    if total_size <= 0 or total_size > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail=f"File size must be between 1 byte and {MAX_FILE_SIZE_MB} MB.")
+
+    participants_list = []
+    if participants:
+        try:
+            participants_list = json.loads(participants)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid format for participants JSON.")
+
+    meeting_id = str(uuid.uuid4())
+    try:
+        await db.execute(supabase.table("meetings").insert({
+            "id": meeting_id,
+            "user_id": user_id,
+            "title": title,
+            "meeting_date": date,
+            "participants": participants_list,
+            "status": "uploading",
+            "host": current_user.get("email", "Unknown Host"),
+        }))
+        invalidate_count(user_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create initial meeting record: {e}")
+
+    session = upload_sessions.create(
+        user_id=user_id,
+        meeting_id=meeting_id,
+        file_name=file_name,
+        content_type=content_type,
+        total_size=total_size,
+    )
+    print(f"📤 Upload session {session['upload_id']} created for meeting {meeting_id} ({session['total_chunks']} chunks).")
+    return upload_sessions.status(session)
+
+
+@app.put("/meetings/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    request: Request,
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """
+    Receives one chunk as the raw request body. Chunks may arrive in any order and
+    in parallel; re-sending a chunk overwrites the earlier copy.
+    """
+    try:
+        session = upload_sessions.get(upload_id, current_user.get("id"))
+        received = await upload_sessions.write_chunk(session, index, request.stream())
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return {"uploadId": upload_id, "index": index, "size": received}
+
+
+@app.get("/meetings/uploads/{upload_id}", response_model=UploadSessionStatus)
+async def get_upload_session(
+    upload_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """Reports which chunks have been received and the contiguous received offset."""
+    try:
+        session = upload_sessions.get(upload_id, current_user.get("id"))
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return upload_sessions.status(session)
+
+
+@app.post("/meetings/uploads/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """
+    Finalizes a session once every chunk is present: streams the staged chunks to
+    Supabase Storage in order and queues the meeting for analysis. The session is
+    claimed first, so a concurrent /complete for it gets 409 instead of a second run.
+    """
+    user_id = current_user.get("id")
+    try:
+        session = upload_sessions.claim_for_completion(upload_id, user_id)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    progress = upload_sessions.status(session)
+    if not progress["complete"]:
+        upload_sessions.release_completion(upload_id)
+        raise HTTPException(status_code=409, detail=f"Upload is incomplete. Missing chunks: {progress['missingChunks']}")
+
+    meeting_id = session["meeting_id"]
+    file_extension = pathlib.Path(session["file_name"]).suffix
+    file_path = f"{user_id}/{meeting_id}{file_extension}"
+    reader = upload_sessions.open_reader(session)
+    upload_stream = UploadStream(reader, max_bytes=MAX_FILE_SIZE_BYTES)
+
+    try:
+        await stream_to_storage("recordings", file_path, upload_stream, session["content_type"])
+        meeting_status = await queue_meeting_for_processing(
+            meeting_id, user_id, session["content_type"], file_path, content_hash=upload_stream.content_hash
+        )
+    except UploadRejectedException as e:
+        await db.execute(supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id))
+        upload_sessions.delete(upload_id)
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except HTTPException:
+        await db.execute(supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id))
+        upload_sessions.release_completion(upload_id)
+        raise
+    except Exception as e:
+        # Keep the staged chunks so the client can retry /complete
+        print(f"❌ Failed to finalize upload {upload_id}: {e}")
+        upload_sessions.release_completion(upload_id)
+        raise HTTPException(status_code=500, detail=f"File upload failed: {e}")
+    finally:
+        reader.close()
+
+    upload_sessions.delete(upload_id)
+    print(f"✅ Upload session {upload_id} finalized for meeting {meeting_id}.")
+    return {"meeting": {"id": meeting_id, "status": meeting_status}}
+
+
+@app.delete("/meetings/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(
+    upload_id: str,
+    current_user: Annotated[dict, Depends(get_current_user)],
+):
+    """Aborts a session, discarding its staged chunks and the placeholder meeting."""
+    user_id = current_user.get("id")
+    try:
+        session = upload_sessions.get(upload_id, user_id)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    upload_sessions.delete(upload_id)
+    await db.execute(supabase.table("meetings").delete().eq("id", session["meeting_id"]).eq("user_id", user_id))
+    invalidate_count(user_id)
+    return
+
+
+
+async def embeddings_created(meeting_id: str) -> bool:
+    response = await db.execute(supabase.table("meetings").select("embedding_created").eq("id", meeting_id))
+    return bool(response.data and response.data[0].get("embedding_created"))
+
+
+async def ensure_embeddings(meeting_id: str) -> bool:
+    """
+    Creates the meeting's chunk embeddings if needed. Returns False when there is no transcript yet.
+    Concurrent first messages (two tabs, a double click, other replicas) share one build.
+    """
+    if await embeddings_created(meeting_id):
+        print("Embeddings are already created. Proceeding to get RAG response...")
+        return True
+    return await single_flight.run(f"embeddings:{meeting_id}", lambda: create_embeddings(meeting_id))
+
+
+async def create_embeddings(meeting_id: str) -> bool:
+    # Another caller may have finished the build while we waited for the lock
+    if await embeddings_created(meeting_id):
+        return True
+
+    print("Embeddings have not been created yet. Proceeding with creation...")
+    transcript_response = await db.execute(supabase.table("meeting_details").select("transcript").eq("id", meeting_id))
+    if not transcript_response.data:
+        print("No transcript found for this meeting.")
+        return False
+
+    transcript_list = transcript_response.data[0].get("transcript")
+    transcript = "\n".join([f"[{item.get('timestamp')}] : {item.get('speaker')} --> {item.get('text')}" for item in transcript_list])
+    await create_and_store_embeddings_manually(supabase, meeting_id, transcript)
+    return True
+
+
 @app.post("/meetings/chat")
 async def chat_with_gemini(
     current_user: Annotated[dict, Depends(get_current_user)],
     message: str = Form(...),
-    meeting_id: str = Form(...)   
+    meeting_id: str = Form(...),
+    use_cache: bool = Form(True)
 ):
     """
     Chat endpoint to interact with the Gemini model.
+    Send use_cache=false to skip the answer cache and always generate a fresh answer.
     """
+    if not await ensure_embeddings(meeting_id):
+        return {"response": f"No transcript available for meeting {meeting_id}"}
+
+    resp = await get_rag_response(supabase, meeting_id, message, use_cache=use_cache)
+    return {"response": resp}
 
-    # 1. Execute the query to get the data
-    is_embedding_created = supabase.table("meetings").select("*").eq("id", meeting_id).execute()
-    print(f"Embedding check response: {is_embedding_created}")
-    # 2. Check if data exists AND if the 'embedding_created' field is explicitly True
-    if is_embedding_created.data and is_embedding_created.data[0].get("embedding_created"):
-        print("Embeddings are already created. Proceeding to get RAG response...")
-        resp = await get_rag_response(supabase, meeting_id, message)
-        return {"response": resp}
-        
-    else:
-        print("Embeddings have not been created yet. Proceeding with creation...")
-        # Add your logic here to create the embeddings
 
-        transcript_response = supabase.table("meeting_details").select("transcript").eq("id", meeting_id).execute()
-        if not transcript_response.data:
-            print("No transcript found for this meeting.")
-            return {"response": f"No transcript available for meeting {meeting_id}"}
+def sse_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
 
-        transcript_list = transcript_response.data[0].get("transcript")
-        transcript = "\n".join([f"[{item.get('timestamp')}] : {item.get('speaker')} --> {item.get('text')}" for item in transcript_list])
-        await create_and_store_embeddings_manually(supabase, meeting_id, transcript)
 
-        resp = await get_rag_response(supabase, meeting_id, message)
-        return {"response": resp}
+@app.post("/meetings/chat/stream")
+async def stream_chat_with_gemini(
+    request: Request,
+    current_user: Annotated[dict, Depends(get_current_user)],
+    message: str = Form(...),
+    meeting_id: str = Form(...),
+    use_cache: bool = Form(True)
+):
+    """
+    Streaming variant of /meetings/chat as Server-Sent Events:
+    `token` events ({"text": ...}) while the answer is generated, then one `done`
+    event ({"response": full answer}) or an `error` event. Disconnecting stops the
+    generation; only completed answers are saved to the chat history.
+    """
+    async def events():
+        try:
+            if not await ensure_embeddings(meeting_id):
+                text = f"No transcript available for meeting {meeting_id}"
+                yield sse_event("token", {"text": text})
+                yield sse_event("done", {"response": text})
+                return
+
+            parts = []
+            stream = stream_rag_response(supabase, meeting_id, message, use_cache=use_cache)
+            try:
+                async for text in stream:
+                    if await request.is_disconnected():
+                        print(f"🔌 Chat stream for meeting {meeting_id} cancelled by the client.")
+                        return
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+            finally:
+                await stream.aclose()
+            yield sse_event("done", {"response": "".join(parts).strip()})
+        except Exception as e:
+            print(f"❌ Chat stream for meeting {meeting_id} failed: {e}")
+            yield sse_event("error", {"detail": "Failed to generate a response."})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # No proxy buffering, so every token reaches the client as it is produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 
@@ -541,7 +989,7 @@ async def delete_meeting(
     try:
         # --- 1. Fetch the meeting to get the recording_url ---
         # We must also check that the meeting belongs to the current user.
-        select_response = supabase.table("meetings").select("recording_url").eq("id", str_meeting_id).eq("user_id", user_id).single().execute()
+        select_response = await db.execute(supabase.table("meetings").select("recording_url").eq("id", str_meeting_id).eq("user_id", user_id).single())
 
         if not select_response.data:
             # This handles cases where the meeting doesn't exist or the user doesn't own it.
@@ -560,7 +1008,7 @@ async def delete_meeting(
                 file_path = path_part.split('?')[0]
                 
                 print(f"Deleting file from storage at path: {file_path}")
-                supabase.storage.from_("recordings").remove([file_path])
+                await db.run(supabase.storage.from_("recordings").remove, [file_path])
             except IndexError:
                 print(f"Could not parse file path from URL: {recording_url}")
 
@@ -569,7 +1017,10 @@ async def delete_meeting(
         # The ON DELETE CASCADE constraint will automatically delete all related rows
         # in `meeting_details`, `meeting_embeddings`, and `chats`.
         print(f"Deleting meeting record {str_meeting_id} from database...")
-        delete_response = supabase.table("meetings").delete().eq("id", str_meeting_id).eq("user_id", user_id).execute()
+        delete_response = await db.execute(supabase.table("meetings").delete().eq("id", str_meeting_id).eq("user_id", user_id))
+        vector_index.invalidate(str_meeting_id)
+        answer_cache.invalidate(str_meeting_id)
+        invalidate_count(user_id)
 
         if not delete_response.data:
             # This is an extra safety check in case the delete failed after the file was removed.
@@ -600,6 +1051,25 @@ async def send_notification(notification: Notification, request: Request):
     return {"message": "Notification sent"}
 
 
+@app.get("/internal/metrics")
+async def get_metrics(request: Request):
+    """
+    Counters and timings (e.g. Gemini rate-limiter waits and 429s) of the API and every
+    Celery worker, read from Redis; only this process's own numbers without Redis.
+    """
+    auth_header = request.headers.get('Authorization')
+    if auth_header != f"Bearer {INTERNAL_API_KEY}":
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    return {
+        **metrics.snapshot(),
+        "profile_cache_hit_ratio": profile_cache_hit_ratio(),
+        "participant_cache_hit_ratio": metrics.ratio("participant_cache_hits_total", "participant_cache_misses_total"),
+        "query_embedding_cache_hit_ratio": query_embedding_cache_hit_ratio(),
+        "answer_cache_hit_ratio": answer_cache.answer_cache_hit_ratio(),
+    }
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=7888)
@@ -25,4 +25,30 @@ apart from the transcript, also provide:
 - A list of key discussion points or highlights from the meeting.
 - A list of actionable tasks discussed in the meeting, with assignee, deadline, and status if available.
 
-"""
\ No newline at end of file
+"""
+
+
+segment_transcript_prompt = """You are given one segment of a longer meeting recording.
+Transcribe this segment into a structured array of objects, where each object contains:
+
+- `speaker`: The name of the speaker (if available, otherwise use "Unknown").
+- `timestamp`: The time in "HH:MM:SS" format, measured from the START OF THIS SEGMENT, when the speaker started talking.
+- `text`: The spoken text for that segment.
+
+**Instructions:**
+- Split the transcript into segments by speaker and timestamp.
+- Transcribe everything you hear, including speech cut off at the start or end of the segment.
+- Do not summarize; only return the transcript.
+"""
+
+
+summary_prompt = """You are given the full diarized transcript of a meeting, one line per segment in the form
+`[HH:MM:SS] Speaker: text`.
+
+Based ONLY on this transcript, provide:
+- A concise summary of the main topics discussed in the meeting.
+- A list of key discussion points or highlights from the meeting.
+- A list of actionable tasks discussed in the meeting, with assignee, deadline, and status if available.
+
+**Transcript:**
+"""
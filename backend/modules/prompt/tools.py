@@ -69,4 +69,33 @@ dirization_tool = {
                 "required": ["transcript", "keyHighlights", "actionItems", "summary"],
             },
         }
-# ...existing code...
\ No newline at end of file
+
+
+# Transcript-only variant of `dirization_tool`, used per segment when a long recording is split.
+segment_transcript_tool = {
+            "name": "store_segment_transcript",
+            "description": "Store the diarized transcript of one segment of a meeting recording.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "transcript": dirization_tool["parameters"]["properties"]["transcript"],
+                },
+                "required": ["transcript"],
+            },
+        }
+
+
+# Text-only pass over a stitched transcript, producing the meeting-level fields of `dirization_tool`.
+summary_tool = {
+            "name": "store_meeting_summary",
+            "description": "Store the summary, key highlights and action items of a meeting transcript.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "summary": dirization_tool["parameters"]["properties"]["summary"],
+                    "keyHighlights": dirization_tool["parameters"]["properties"]["keyHighlights"],
+                    "actionItems": dirization_tool["parameters"]["properties"]["actionItems"],
+                },
+                "required": ["keyHighlights", "actionItems", "summary"],
+            },
+        }
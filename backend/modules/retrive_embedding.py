@@ -5,6 +5,7 @@ import uuid
 from supabase import Client
 import google.generativeai as genai
 from dotenv import load_dotenv
+from modules.utility.embedding_cache import get_cached_embedding, cache_embedding
 
 # --- Configuration ---
 load_dotenv()
@@ -33,13 +34,16 @@ def retrieve_relevant_embeddings(
         print(f"Creating embedding for query: '{query}'")
         embedding_model = 'text-embedding-004'
         
-        # Use "RETRIEVAL_QUERY" for search queries
-        query_embedding_result = genai.embed_content(
-            model=embedding_model,
-            content=query,
-            task_type="RETRIEVAL_QUERY"
-        )
-        query_embedding = query_embedding_result['embedding']
+        # Use "RETRIEVAL_QUERY" for search queries; repeated queries come from the cache
+        query_embedding = get_cached_embedding(embedding_model, "RETRIEVAL_QUERY", query)
+        if query_embedding is None:
+            query_embedding_result = genai.embed_content(
+                model=embedding_model,
+                content=query,
+                task_type="RETRIEVAL_QUERY"
+            )
+            query_embedding = query_embedding_result['embedding']
+            cache_embedding(embedding_model, "RETRIEVAL_QUERY", query, query_embedding)
 
         # --- 2. Retrieve Similar Embeddings from Supabase via RPC ---
         # This calls the 'match_meeting_chunks' SQL function.
@@ -1,98 +1,226 @@
-import json
 import os
+from dataclasses import dataclass
+from typing import AsyncIterator
 import google.generativeai as genai
-import numpy as np
 import google.api_core.exceptions
 from supabase import Client
+from modules.utility.key_pool import key_pool, key_fingerprint
+from modules.utility import db
+from modules.utility.metrics import metrics
+from modules.utility.vector_index import vector_index
+from modules.utility.embedding_cache import get_cached_embedding, cache_embedding
+from modules.utility import answer_cache
+from modules.utility.rate_limiter import rate_limiter, estimate_tokens
 from dotenv import load_dotenv
 
 load_dotenv()
 
+NO_CONTEXT_ANSWER = "I could not find any information for this meeting."
+RETRYABLE_KEY_ERRORS = (
+    google.api_core.exceptions.PermissionDenied,
+    google.api_core.exceptions.ResourceExhausted,
+    google.api_core.exceptions.InvalidArgument,
+)
+
+
+@dataclass
+class PreparedChat:
+    """Everything gathered before generation: either a ready `answer` or the `prompt` to generate from."""
+    query_embedding: list[float]
+    answer: str | None = None
+    prompt: str | None = None
+
+
 async def get_rag_response(
     supabase: Client,
     meeting_id: str,
     user_query: str,
     embedding_model: str = 'text-embedding-004',
-    generative_model: str = 'gemini-1.5-flash'
+    generative_model: str = 'gemini-1.5-flash',
+    use_cache: bool = True
 ) -> str:
     """
     Performs a full RAG pipeline with retry logic for Gemini API calls,
-    and stores the conversation in the database.
+    and stores the conversation in the database. With `use_cache`, a question
+    close enough to one already answered for this meeting reuses that answer.
     """
+    prepared = await prepare_rag(supabase, meeting_id, user_query, embedding_model, use_cache)
+    if prepared.answer is not None:
+        return prepared.answer
 
-    # --- 1. Create query embedding with RETRY LOGIC ---
-    query_embedding_result = None
-    last_error_embedding = None
+    # --- 7. Generate the final answer with RETRY LOGIC ---
+    ai_response = None
+    last_error_generation = None
+
+    prompt_tokens = estimate_tokens(prepared.prompt)
+    for key in key_pool.candidates(model=generative_model, tokens=prompt_tokens):
+        try:
+            print(f"Attempting to generate response with a new API key...")
+            await rate_limiter.wait_for_capacity_async(key_fingerprint(key), generative_model, prompt_tokens)
+            with key_pool.lease(key):
+                genai.configure(api_key=key)
+                model = genai.GenerativeModel(generative_model)
+                ai_response = await model.generate_content_async(prepared.prompt)
+            print(f"Response generated successfully with key ending in '...{key[-4:]}'.")
+            break
+        
+        except RETRYABLE_KEY_ERRORS as e:
+            print(f"API key ending in '...{key[-4:]}' failed for generation. Reason: {type(e).__name__}. Trying next key...")
+            last_error_generation = e
+            continue
+
+    if ai_response is None:
+        raise Exception(f"All API keys failed for generation. Last error: {last_error_generation}") from last_error_generation
+    
+    ai_message = ai_response.text.strip()
+    await finish_rag(supabase, meeting_id, user_query, prepared, ai_message)
+    return ai_message
+
+
+async def stream_rag_response(
+    supabase: Client,
+    meeting_id: str,
+    user_query: str,
+    embedding_model: str = 'text-embedding-004',
+    generative_model: str = 'gemini-1.5-flash',
+    use_cache: bool = True
+) -> AsyncIterator[str]:
+    """
+    Same pipeline as get_rag_response, but yields the answer's text as the model
+    produces it. The answer is stored (chat history, answer cache) only once the
+    stream completes; closing the generator early stops generation and stores nothing.
+    """
+    prepared = await prepare_rag(supabase, meeting_id, user_query, embedding_model, use_cache)
+    if prepared.answer is not None:
+        yield prepared.answer
+        return
+
+    last_error_generation = None
+    parts = []
+    prompt_tokens = estimate_tokens(prepared.prompt)
+    for key in key_pool.candidates(model=generative_model, tokens=prompt_tokens):
+        try:
+            print(f"Attempting to stream response with a new API key...")
+            await rate_limiter.wait_for_capacity_async(key_fingerprint(key), generative_model, prompt_tokens)
+            with key_pool.lease(key):
+                genai.configure(api_key=key)
+                model = genai.GenerativeModel(generative_model)
+                response = await model.generate_content_async(prepared.prompt, stream=True)
+                async for chunk in response:
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+            print(f"Response streamed successfully with key ending in '...{key[-4:]}'.")
+            break
 
-    # --- PREPARATION: Load API Keys ---
-    api_keys_str = os.getenv("GEMINI_API_KEYS", "")
-    if not api_keys_str:
+        except RETRYABLE_KEY_ERRORS as e:
+            if parts:
+                # Part of the answer was already sent; another key can't continue it
+                raise
+            print(f"API key ending in '...{key[-4:]}' failed for generation. Reason: {type(e).__name__}. Trying next key...")
+            last_error_generation = e
+            continue
+    else:
+        raise Exception(f"All API keys failed for generation. Last error: {last_error_generation}") from last_error_generation
+
+    await finish_rag(supabase, meeting_id, user_query, prepared, "".join(parts).strip())
+
+
+async def prepare_rag(
+    supabase: Client,
+    meeting_id: str,
+    user_query: str,
+    embedding_model: str = 'text-embedding-004',
+    use_cache: bool = True
+) -> PreparedChat:
+    """
+    Saves the user's message, embeds the query and either finds a ready answer
+    (answer cache, or no transcript to answer from) or builds the prompt.
+    """
+    # --- PREPARATION: Make sure API Keys are configured ---
+    if not len(key_pool):
         raise ValueError("GEMINI_API_KEYS environment variable not set or is empty.")
-    api_keys = [key.strip() for key in api_keys_str.split(',')]
 
     # --- NEW: Save the user's message to the chat history table
     try:
-        supabase.table("chats").insert({
+        await db.execute(supabase.table("chats").insert({
             "meeting_id": meeting_id,
             "sender": "user",
             "message": user_query
-        }).execute()
+        }))
         print(f"User message saved for meeting {meeting_id}.")
     except Exception as e:
         # Don't fail the entire process if saving fails, but log the error
         print(f"Failed to save user message to chat history: {e}")
 
+    query_embedding = await embed_query(user_query, embedding_model)
+
+    if use_cache:
+        cached_answer = answer_cache.lookup(meeting_id, query_embedding)
+        if cached_answer is not None:
+            await _save_ai_message(supabase, meeting_id, cached_answer)
+            return PreparedChat(query_embedding=query_embedding, answer=cached_answer)
+    else:
+        metrics.incr("answer_cache_bypass_total")
+
+    # --- Steps 2, 3, 4, 5 (Finding relevant context and retrieving chat history) ---
+    match_threshold = 0.44
+    match_count = 5
+    # The meeting's embeddings are scored in memory; only a cold meeting hits the database
+    index = await vector_index.get(supabase, meeting_id)
+    if not index.contents:
+        return PreparedChat(query_embedding=query_embedding, answer=NO_CONTEXT_ANSWER)
+
+    relevant_context = [content for content, _ in index.search(query_embedding, match_count, match_threshold)]
+    
+    history_response = await db.execute(supabase.table("chats").select("*").eq("meeting_id", meeting_id).order("created_at", desc=True).limit(10))
+    chat_history = list(reversed(history_response.data))
+
+    prompt = build_prompt(chat_history, relevant_context, user_query)
+    return PreparedChat(query_embedding=query_embedding, prompt=prompt)
+
 
+async def embed_query(user_query: str, embedding_model: str = 'text-embedding-004') -> list[float]:
+    """Creates the RETRIEVAL_QUERY embedding with key rotation, served from the cache when possible."""
+    # Repeated questions reuse their embedding and skip the API call
+    query_embedding = get_cached_embedding(embedding_model, "RETRIEVAL_QUERY", user_query)
+    if query_embedding is not None:
+        return query_embedding
 
-    for key in api_keys:
+    query_embedding_result = None
+    last_error_embedding = None
+    query_tokens = estimate_tokens(user_query)
+    for key in key_pool.candidates(model=embedding_model, tokens=query_tokens):
         try:
             print(f"Attempting to create embedding with a new API key...")
-            genai.configure(api_key=key)
-            query_embedding_result = genai.embed_content(
-                model=embedding_model,
-                content=user_query,
-                task_type="RETRIEVAL_QUERY",
-            )
+            await rate_limiter.wait_for_capacity_async(key_fingerprint(key), embedding_model, query_tokens)
+            with key_pool.lease(key):
+                genai.configure(api_key=key)
+                query_embedding_result = genai.embed_content(
+                    model=embedding_model,
+                    content=user_query,
+                    task_type="RETRIEVAL_QUERY",
+                )
             print(f"Embedding created successfully with key ending in '...{key[-4:]}'.")
             break
-        except (google.api_core.exceptions.PermissionDenied,
-                google.api_core.exceptions.ResourceExhausted,
-                google.api_core.exceptions.InvalidArgument) as e:
-            
+        except RETRYABLE_KEY_ERRORS as e:
             print(f"API key ending in '...{key[-4:]}' failed for embedding. Reason: {type(e).__name__}. Trying next key...")
             last_error_embedding = e
             continue
-    
+
     if query_embedding_result is None:
         raise Exception(f"All API keys failed for embedding. Last error: {last_error_embedding}") from last_error_embedding
 
-
     query_embedding = query_embedding_result['embedding']
+    cache_embedding(embedding_model, "RETRIEVAL_QUERY", user_query, query_embedding)
+    return query_embedding
 
-    # --- Steps 2, 3, 4, 5 (Finding relevant context and retrieving chat history) ---
-    match_threshold = 0.44
-    match_count = 5
-    all_chunks_response = supabase.table("meeting_embeddings").select("content, embedding").eq("meeting_id", meeting_id).execute()
-    if not all_chunks_response.data:
-        return "I could not find any information for this meeting."
-    
-    all_chunks = all_chunks_response.data
-    scored_chunks = []
-    for chunk in all_chunks:
-        chunk_vector = np.array(json.loads(chunk['embedding']), dtype=np.float32)
-        similarity = np.dot(query_embedding, chunk_vector)
-        scored_chunks.append({"content": chunk['content'], "similarity": similarity})
-    
-    relevant_chunks = sorted([c for c in scored_chunks if c['similarity'] >= match_threshold], key=lambda x: x['similarity'], reverse=True)[:match_count]
-    relevant_context = [item['content'] for item in relevant_chunks]
-    
-    history_response = supabase.table("chats").select("*").eq("meeting_id", meeting_id).order("created_at", desc=True).limit(10).execute()
-    chat_history = list(reversed(history_response.data))
 
-    # --- 6. Construct the prompt ---
+def build_prompt(chat_history: list[dict], relevant_context: list[str], user_query: str) -> str:
+    """Builds the answer prompt from recent chat history and the retrieved transcript sections."""
     chat_history_text = "\n".join([f"{c['sender'].upper()}: {c['message']}" for c in chat_history])
     relevant_context_text = "\n---\n".join(relevant_context)
-    prompt = f"""You are a helpful meeting assistant. Answer the user's question based ONLY on the provided context below.
+    return f"""You are a helpful meeting assistant. Answer the user's question based ONLY on the provided context below.
     The context includes recent chat history and relevant sections of the meeting transcript. If the answer is not in the context, say so.
 
     **Chat History:**
@@ -106,42 +234,22 @@ async def get_rag_response(
 
     **Your Answer:**
     """
-    
-    # --- 7. Generate the final answer with RETRY LOGIC ---
-    ai_response = None
-    last_error_generation = None
 
-    for key in api_keys:
-        try:
-            print(f"Attempting to generate response with a new API key...")
-            genai.configure(api_key=key)
-            model = genai.GenerativeModel(generative_model)
-            ai_response = await model.generate_content_async(prompt)
-            print(f"Response generated successfully with key ending in '...{key[-4:]}'.")
-            break
-        
-        except (google.api_core.exceptions.PermissionDenied,
-                google.api_core.exceptions.ResourceExhausted,
-                google.api_core.exceptions.InvalidArgument) as e:
-            
-            print(f"API key ending in '...{key[-4:]}' failed for generation. Reason: {type(e).__name__}. Trying next key...")
-            last_error_generation = e
-            continue
 
-    if ai_response is None:
-        raise Exception(f"All API keys failed for generation. Last error: {last_error_generation}") from last_error_generation
-    
-    ai_message = ai_response.text.strip()
+async def finish_rag(supabase: Client, meeting_id: str, user_query: str, prepared: PreparedChat, ai_message: str):
+    """Remembers a generated answer for similar questions and saves it to the chat history."""
+    answer_cache.store(meeting_id, user_query, prepared.query_embedding, ai_message)
+    await _save_ai_message(supabase, meeting_id, ai_message)
 
-    # --- NEW: Save the AI's response to the chat history table
+
+async def _save_ai_message(supabase: Client, meeting_id: str, ai_message: str):
+    """Saves the AI's response to the chat history table."""
     try:
-        supabase.table("chats").insert({
+        await db.execute(supabase.table("chats").insert({
             "meeting_id": meeting_id,
             "sender": "ai",
             "message": ai_message
-        }).execute()
+        }))
         print(f"AI response saved for meeting {meeting_id}.")
     except Exception as e:
         print(f"Failed to save AI response to chat history: {e}")
-
-    return ai_message
\ No newline at end of file
@@ -0,0 +1,107 @@
+# Semantic answer cache for meeting chat.
+# Every answered question is remembered per meeting together with its query embedding.
+# A new question whose embedding is at least ANSWER_CACHE_THRESHOLD cosine-similar to
+# a remembered one gets the stored answer instead of a generate_content call. Entries
+# live in a capped Redis list per meeting (shared by all API replicas), or in process
+# memory without Redis. A meeting's entries are dropped whenever its transcript or
+# embeddings change. Recent chat history is not part of the match; callers that need
+# a fresh answer bypass the cache.
+
+import os
+import base64
+import threading
+import numpy as np
+import orjson
+import redis
+from collections import deque
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+from modules.utility.metrics import metrics
+load_dotenv()
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", 0.95))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", 200))
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv("ANSWER_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+
+# meeting id -> newest-first entries; only used when Redis is not configured
+_local = TTLCache(maxsize=1_000, ttl=ANSWER_CACHE_TTL_SECONDS)
+_local_lock = threading.Lock()
+
+
+def _key(meeting_id: str) -> str:
+    return f"answer_cache:{meeting_id}"
+
+
+def _unit(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _entries(meeting_id: str) -> list[dict]:
+    r = get_redis()
+    if r is None:
+        with _local_lock:
+            return list(_local.get(meeting_id, ()))
+    try:
+        return [orjson.loads(value) for value in r.lrange(_key(meeting_id), 0, -1)]
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Answer cache read failed: {e}")
+        return []
+
+
+def lookup(meeting_id: str, query_embedding, threshold: float = ANSWER_CACHE_THRESHOLD) -> str | None:
+    """Returns the answer to the most similar earlier question, if it is similar enough."""
+    entries = _entries(meeting_id)
+    if entries:
+        matrix = np.frombuffer(b"".join(base64.b64decode(entry["embedding"]) for entry in entries), dtype=np.float32)
+        similarities = matrix.reshape(len(entries), -1) @ _unit(query_embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= threshold:
+            metrics.incr("answer_cache_hits_total")
+            print(f"💬 Answer cache hit for meeting {meeting_id} (similarity {similarities[best]:.3f}).")
+            return entries[best]["answer"]
+
+    metrics.incr("answer_cache_misses_total")
+    return None
+
+
+def store(meeting_id: str, query: str, query_embedding, answer: str):
+    entry = {
+        "query": query,
+        "embedding": base64.b64encode(_unit(query_embedding).tobytes()).decode(),
+        "answer": answer,
+    }
+    r = get_redis()
+    if r is None:
+        with _local_lock:
+            entries = _local.get(meeting_id) or deque(maxlen=ANSWER_CACHE_MAX_ENTRIES)
+            entries.appendleft(entry)
+            _local[meeting_id] = entries
+        return
+    try:
+        pipe = r.pipeline()
+        pipe.lpush(_key(meeting_id), orjson.dumps(entry))
+        pipe.ltrim(_key(meeting_id), 0, ANSWER_CACHE_MAX_ENTRIES - 1)
+        pipe.expire(_key(meeting_id), ANSWER_CACHE_TTL_SECONDS)
+        pipe.execute()
+    except redis.exceptions.RedisError as e:
+        print(f"⚠️ Answer cache write failed: {e}")
+
+
+def invalidate(meeting_id: str):
+    """Forgets every cached answer of the meeting (its transcript or embeddings changed)."""
+    with _local_lock:
+        _local.pop(meeting_id, None)
+    r = get_redis()
+    if r is not None:
+        try:
+            r.delete(_key(meeting_id))
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Answer cache invalidation failed for meeting {meeting_id}: {e}")
+
+
+def answer_cache_hit_ratio() -> float | None:
+    """Share of chat questions answered from the cache (across processes when Redis is configured)."""
+    return metrics.ratio("answer_cache_hits_total", "answer_cache_misses_total")
@@ -0,0 +1,75 @@
+# Splits long recordings into overlapping audio windows with ffmpeg.
+# ffmpeg reads http(s) inputs with range requests, so a window can be cut straight from
+# the recording URL without downloading the whole file first.
+
+import os
+import shutil
+import subprocess
+from dataclasses import dataclass
+from dotenv import load_dotenv
+load_dotenv()
+
+# Recordings at least this long are analyzed in segments (0 disables segmenting).
+SEGMENT_MODE_MIN_SECONDS = int(os.getenv("SEGMENT_MODE_MIN_SECONDS", 45 * 60))
+SEGMENT_LENGTH_SECONDS = int(os.getenv("SEGMENT_LENGTH_SECONDS", 10 * 60))
+SEGMENT_OVERLAP_SECONDS = int(os.getenv("SEGMENT_OVERLAP_SECONDS", 15))
+SEGMENT_MAX_PARALLEL = int(os.getenv("SEGMENT_MAX_PARALLEL", 4))
+
+
+@dataclass
+class Segment:
+    index: int
+    start: float  # seconds from the start of the recording
+    end: float    # includes the overlap into the next segment
+
+
+def is_available() -> bool:
+    """Segmenting needs both ffmpeg and ffprobe on the PATH."""
+    return shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+
+
+def probe_duration(source: str) -> float | None:
+    """Returns the duration of a local file or URL in seconds, or None if it can't be determined."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", source],
+            capture_output=True, text=True, timeout=120, check=True,
+        )
+        return float(result.stdout.strip())
+    except (subprocess.SubprocessError, ValueError) as e:
+        print(f"⚠️ Could not probe duration of {source}: {e}")
+        return None
+
+
+def should_segment(duration: float | None) -> bool:
+    """True when segment mode is enabled and the recording is long enough to benefit from it."""
+    return bool(SEGMENT_MODE_MIN_SECONDS) and duration is not None and duration >= SEGMENT_MODE_MIN_SECONDS and is_available()
+
+
+def plan_segments(duration: float, length: int = SEGMENT_LENGTH_SECONDS, overlap: int = SEGMENT_OVERLAP_SECONDS) -> list[Segment]:
+    """
+    Cuts [0, duration) into windows of `length` seconds, each extended by `overlap`
+    seconds into the next one. A trailing window shorter than the overlap is dropped,
+    since the previous window already covers it.
+    """
+    segments = []
+    start = 0.0
+    while start == 0.0 or start + overlap < duration:
+        segments.append(Segment(index=len(segments), start=start, end=min(duration, start + length + overlap)))
+        start += length
+    return segments
+
+
+def extract_segment(source: str, segment: Segment, output_path: str) -> str:
+    """
+    Writes one window of the recording to `output_path` as a small mono MP3.
+    Re-encoding keeps segment uploads compact whatever the source container.
+    """
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y",
+         "-ss", f"{segment.start:.3f}", "-t", f"{segment.end - segment.start:.3f}",
+         "-i", source, "-vn", "-ac", "1", "-ar", "16000", "-b:a", "32k", output_path],
+        capture_output=True, timeout=600, check=True,
+    )
+    return output_path
@@ -0,0 +1,144 @@
+# Request authentication without a round trip to Supabase.
+# Access tokens are verified locally: HS256 tokens with the project's JWT secret
+# (SUPABASE_JWT_SECRET), asymmetric ones against the project's JWKS, which is cached.
+# Only when neither is available does verification fall back to supabase.auth.get_user.
+# User profiles come from a bounded TTL cache keyed by user id. The API never writes
+# profiles (a database trigger creates them at sign-up), so entries are refreshed at
+# login and otherwise expire after PROFILE_CACHE_TTL_SECONDS.
+
+import os
+import time
+import threading
+import requests
+from cachetools import TTLCache
+from jose import jwt, JWTError
+from supabase import Client
+from dotenv import load_dotenv
+from modules.utility.metrics import metrics
+from modules.utility import db
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_URL = os.getenv("SUPABASE_JWKS_URL", f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json")
+JWKS_CACHE_TTL_SECONDS = int(os.getenv("JWKS_CACHE_TTL_SECONDS", 10 * 60))
+# An unknown key id triggers a refetch (key rotation), but not more often than this
+JWKS_MIN_REFRESH_SECONDS = 60
+
+PROFILE_CACHE_TTL_SECONDS = int(os.getenv("PROFILE_CACHE_TTL_SECONDS", 5 * 60))
+PROFILE_CACHE_MAX_SIZE = int(os.getenv("PROFILE_CACHE_MAX_SIZE", 10_000))
+
+
+class LocalVerificationUnavailable(Exception):
+    """The token can't be checked locally (no secret configured, JWKS unreachable)."""
+    pass
+
+
+# --- Token verification ---
+
+# Pinned per key type, never taken from the (unverified) token header
+SECRET_ALGORITHMS = ["HS256"]
+JWKS_ALGORITHMS = ["RS256", "ES256"]
+
+_jwks = {"keys": {}, "fetched_at": 0.0}
+_jwks_lock = threading.Lock()
+
+
+def _jwks_needs_refresh(kid: str | None) -> bool:
+    age = time.time() - _jwks["fetched_at"]
+    return age > JWKS_CACHE_TTL_SECONDS or (kid not in _jwks["keys"] and age > JWKS_MIN_REFRESH_SECONDS)
+
+
+def _refresh_jwks(kid: str | None):
+    """Refetches the key set when it is stale or doesn't know `kid`. Blocking; run it off the event loop."""
+    with _jwks_lock:
+        if not _jwks_needs_refresh(kid):
+            return
+        try:
+            response = requests.get(JWKS_URL, timeout=5)
+            response.raise_for_status()
+            _jwks["keys"] = {key.get("kid"): key for key in response.json().get("keys", [])}
+            _jwks["fetched_at"] = time.time()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"⚠️ Could not fetch JWKS from {JWKS_URL}: {e}")
+
+
+def _jwks_key(kid: str | None) -> dict:
+    """Returns the cached JWK for `kid`."""
+    key = _jwks["keys"].get(kid)
+    if key is None:
+        raise LocalVerificationUnavailable(f"No JWKS key for kid '{kid}'.")
+    return key
+
+
+def verify_token(token: str) -> dict:
+    """
+    Verifies a Supabase access token locally and returns its claims.
+    Raises JWTError for an invalid or expired token, LocalVerificationUnavailable
+    when there is nothing to verify it against. Expects the JWKS to be refreshed
+    already when needed (see resolve_user).
+    """
+    header = jwt.get_unverified_header(token)
+
+    if header.get("alg") in SECRET_ALGORITHMS:
+        if not SUPABASE_JWT_SECRET:
+            raise LocalVerificationUnavailable("SUPABASE_JWT_SECRET is not set.")
+        return jwt.decode(token, SUPABASE_JWT_SECRET, algorithms=SECRET_ALGORITHMS, audience=SUPABASE_JWT_AUDIENCE)
+
+    return jwt.decode(token, _jwks_key(header.get("kid")), algorithms=JWKS_ALGORITHMS, audience=SUPABASE_JWT_AUDIENCE)
+
+
+async def resolve_user(supabase: Client, token: str) -> tuple[str, str | None]:
+    """
+    Returns (user id, email) for an access token. Raises JWTError (or an auth error
+    from Supabase on the fallback path) when the token is not valid.
+    """
+    try:
+        header = jwt.get_unverified_header(token)
+        if header.get("alg") not in SECRET_ALGORITHMS and _jwks_needs_refresh(header.get("kid")):
+            await db.run(_refresh_jwks, header.get("kid"))
+        claims = verify_token(token)
+        metrics.incr("auth_local_verifications_total")
+        return claims["sub"], claims.get("email")
+    except LocalVerificationUnavailable as e:
+        print(f"⚠️ Verifying token with Supabase: {e}")
+
+    metrics.incr("auth_remote_verifications_total")
+    user_response = await db.run(supabase.auth.get_user, token)
+    user = user_response.user
+    if not user:
+        raise JWTError("Invalid token")
+    return str(user.id), user.email
+
+
+# --- Profile cache ---
+
+_profiles = TTLCache(maxsize=PROFILE_CACHE_MAX_SIZE, ttl=PROFILE_CACHE_TTL_SECONDS)
+_profiles_lock = threading.Lock()
+
+
+def cache_profile(user_id: str, profile: dict | None):
+    """Stores a freshly read profile (None for 'no profile row')."""
+    with _profiles_lock:
+        _profiles[user_id] = dict(profile) if profile else {}
+
+
+async def get_profile(supabase: Client, user_id: str) -> dict | None:
+    """Returns the user's row from 'profiles', from the cache when possible."""
+    with _profiles_lock:
+        cached = _profiles.get(user_id)
+    if cached is not None:
+        metrics.incr("auth_profile_cache_hits_total")
+        return dict(cached) or None
+
+    metrics.incr("auth_profile_cache_misses_total")
+    profile_response = await db.execute(supabase.table("profiles").select("*").eq("id", user_id))
+    profile = profile_response.data[0] if profile_response.data else None
+    cache_profile(user_id, profile)
+    return dict(profile) if profile else None
+
+
+def profile_cache_hit_ratio() -> float | None:
+    """Share of profile lookups served from the cache (across processes when Redis is configured)."""
+    return metrics.ratio("auth_profile_cache_hits_total", "auth_profile_cache_misses_total")
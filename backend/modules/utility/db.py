@@ -0,0 +1,28 @@
+# Non-blocking access to the synchronous Supabase client.
+# supabase-py's query builders block on `.execute()`, which would stall the single
+# uvicorn event loop (and every socket on it) for the length of each round trip.
+# Queries are run on a bounded thread pool instead; the client's HTTP connection pool
+# is shared by all threads, so concurrency per process is capped by DB_MAX_WORKERS
+# rather than by one query at a time.
+
+import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+load_dotenv()
+
+DB_MAX_WORKERS = int(os.getenv("DB_MAX_WORKERS", 16))
+
+_executor = ThreadPoolExecutor(max_workers=DB_MAX_WORKERS, thread_name_prefix="supabase")
+
+
+async def run(fn, *args, **kwargs):
+    """Runs a blocking call (auth, storage, a helper doing several queries) on the pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+async def execute(query):
+    """Awaits a supabase/postgrest query builder, e.g. `await db.execute(supabase.table("x").select("*"))`."""
+    return await run(query.execute)
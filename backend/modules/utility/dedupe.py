@@ -0,0 +1,155 @@
+# Content-hash deduplication of recordings.
+# A recording whose SHA-256 matches a meeting the same user already analyzed gets that
+# meeting's details cloned instead of going through Gemini again. Uploads of the same
+# hash by the same user that arrive while the first copy is still being analyzed are
+# parked in Redis and served once the leader finishes. Everything is scoped per user:
+# one user's upload never receives another user's analysis, nor learns that it exists. The leader holds its claim as a lease that every pipeline
+# stage renews; a parked upload whose leader's lease ran out (worker crash, lost
+# message) takes over the claim and runs its own analysis.
+
+import os
+import json
+from supabase import Client
+from modules.utility.redis_client import get_redis
+
+INFLIGHT_TTL_SECONDS = 6 * 60 * 60
+# Must outlast the longest gap between two stages of the leader (overload backoff, a long segmented analysis)
+LEADER_LEASE_SECONDS = int(os.getenv("DEDUPE_LEADER_LEASE_SECONDS", 2 * 60 * 60))
+
+# Atomically either claims leadership for a hash or registers the caller as a waiter.
+# Returns the meeting id of the current leader (the caller's own id when it claimed).
+_CLAIM_OR_WAIT = """
+local leader = redis.call('GET', KEYS[1])
+if not leader then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[4])
+    return ARGV[1]
+end
+redis.call('RPUSH', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return leader
+"""
+
+# Extends the lease, but only for the meeting that holds it.
+_RENEW = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Takes over an orphaned hash: when nobody holds the lease any more, removes the
+# waiter from the queue and claims the lease for it. Returns {leader, claimed}.
+_TAKE_OVER = """
+local leader = redis.call('GET', KEYS[1])
+if leader then
+    return {leader, 0}
+end
+for _, raw in ipairs(redis.call('LRANGE', KEYS[2], 0, -1)) do
+    if cjson.decode(raw)['meeting_id'] == ARGV[1] then
+        redis.call('LREM', KEYS[2], 0, raw)
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return {ARGV[1], 1}
+"""
+
+# Atomically drains the waiters and drops the leadership lock.
+_RELEASE = """
+local waiters = redis.call('LRANGE', KEYS[2], 0, -1)
+redis.call('DEL', KEYS[1], KEYS[2])
+return waiters
+"""
+
+
+def _inflight_key(user_id: str, content_hash: str) -> str:
+    return f"dedupe:inflight:{user_id}:{content_hash}"
+
+
+def _waiters_key(user_id: str, content_hash: str) -> str:
+    return f"dedupe:waiters:{user_id}:{content_hash}"
+
+
+def find_completed_meeting(supabase: Client, user_id: str, content_hash: str, exclude_meeting_id: str | None = None) -> str | None:
+    """Returns the id of a completed meeting of the same user with the same recording hash, if any."""
+    query = (supabase.table("meetings").select("id")
+             .eq("user_id", user_id).eq("content_hash", content_hash).eq("status", "completed"))
+    if exclude_meeting_id:
+        query = query.neq("id", exclude_meeting_id)
+    response = query.limit(1).execute()
+    if not response.data:
+        return None
+    return response.data[0]["id"]
+
+
+def clone_meeting_details(supabase: Client, source_meeting_id: str, target_meeting_id: str) -> bool:
+    """
+    Copies the transcript, summary, highlights and action items of one meeting to
+    another and marks the target as completed. Returns False if the source has no details.
+    """
+    response = supabase.table("meeting_details").select(
+        "transcript, transcript_index, transcript_count, summary, key_highlights, actionable_items"
+    ).eq("id", source_meeting_id).execute()
+    if not response.data:
+        return False
+
+    details = response.data[0]
+    supabase.table("meeting_details").upsert({"id": target_meeting_id, **details}).execute()
+    supabase.table("meetings").update({"status": "completed"}).eq("id", target_meeting_id).execute()
+    print(f"♻️ Cloned analysis of meeting {source_meeting_id} into duplicate {target_meeting_id}")
+    return True
+
+
+def claim_or_wait(content_hash: str, job: dict) -> bool:
+    """
+    Tries to become the leader for analyzing this hash. If another meeting of the same
+    user with the same hash is already in flight, `job` is queued behind it and False is returned.
+    Without Redis every upload is its own leader.
+    """
+    r = get_redis()
+    if r is None:
+        return True
+
+    leader = r.eval(
+        _CLAIM_OR_WAIT, 2,
+        _inflight_key(job["user_id"], content_hash), _waiters_key(job["user_id"], content_hash),
+        job["meeting_id"], json.dumps(job), INFLIGHT_TTL_SECONDS, LEADER_LEASE_SECONDS,
+    )
+    if isinstance(leader, bytes):
+        leader = leader.decode()
+    if leader != job["meeting_id"]:
+        print(f"⏳ Meeting {job['meeting_id']} has the same recording as in-flight meeting {leader}; waiting on it.")
+        return False
+    return True
+
+
+def release(user_id: str, content_hash: str) -> list[dict]:
+    """Ends leadership for a hash and returns the jobs that were waiting on it."""
+    r = get_redis()
+    if r is None:
+        return []
+
+    waiters = r.eval(_RELEASE, 2, _inflight_key(user_id, content_hash), _waiters_key(user_id, content_hash))
+    return [json.loads(w) for w in waiters or []]
+
+
+def renew(user_id: str, content_hash: str, meeting_id: str):
+    """Keeps the leader's claim alive; called by every pipeline stage of the leader."""
+    r = get_redis()
+    if r is not None and content_hash:
+        r.eval(_RENEW, 1, _inflight_key(user_id, content_hash), meeting_id, LEADER_LEASE_SECONDS)
+
+
+def take_over_if_orphaned(user_id: str, content_hash: str, meeting_id: str) -> tuple[str | None, bool]:
+    """
+    For a parked upload: returns (current leader, whether this call made `meeting_id`
+    the leader). It becomes the leader only when the previous leader's lease expired.
+    """
+    r = get_redis()
+    if r is None:
+        return None, False
+
+    leader, claimed = r.eval(_TAKE_OVER, 2, _inflight_key(user_id, content_hash), _waiters_key(user_id, content_hash),
+                             meeting_id, LEADER_LEASE_SECONDS)
+    if isinstance(leader, bytes):
+        leader = leader.decode()
+    return leader, bool(claimed)
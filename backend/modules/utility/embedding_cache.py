@@ -0,0 +1,82 @@
+# Cache of query embeddings (RETRIEVAL_QUERY) for meeting chat.
+# Users repeat the same questions ("what are the action items?"), so embeddings are
+# cached by (model, task type, normalized text): first in a process-local LRU, then in
+# Redis (float32 bytes with a TTL) so every API replica shares them. A cached question
+# skips the embedding API call and its rate-limit quota entirely.
+
+import os
+import re
+import hashlib
+import threading
+import unicodedata
+import numpy as np
+import redis
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+from modules.utility.metrics import metrics
+load_dotenv()
+
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL_SECONDS", 24 * 60 * 60))
+QUERY_EMBEDDING_CACHE_MAX_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_MAX_SIZE", 5_000))
+
+_local = TTLCache(maxsize=QUERY_EMBEDDING_CACHE_MAX_SIZE, ttl=QUERY_EMBEDDING_CACHE_TTL_SECONDS)
+_local_lock = threading.Lock()
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change what a question asks."""
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return _WHITESPACE.sub(" ", text).strip().rstrip("?!. ")
+
+
+def _cache_key(model: str, task_type: str, text: str) -> str:
+    digest = hashlib.sha256(normalize_query(text).encode()).hexdigest()
+    return f"query_embedding:{model}:{task_type}:{digest}"
+
+
+def get_cached_embedding(model: str, task_type: str, text: str) -> list[float] | None:
+    """Returns the cached embedding for `text`, or None on a miss."""
+    key = _cache_key(model, task_type, text)
+    with _local_lock:
+        embedding = _local.get(key)
+    if embedding is not None:
+        metrics.incr("query_embedding_cache_hits_total")
+        return embedding
+
+    r = get_redis()
+    if r is not None:
+        try:
+            value = r.get(key)
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Query embedding cache read failed: {e}")
+            value = None
+        if value is not None:
+            embedding = np.frombuffer(value, dtype=np.float32).tolist()
+            with _local_lock:
+                _local[key] = embedding
+            metrics.incr("query_embedding_cache_hits_total")
+            metrics.incr("query_embedding_cache_redis_hits_total")
+            return embedding
+
+    metrics.incr("query_embedding_cache_misses_total")
+    return None
+
+
+def cache_embedding(model: str, task_type: str, text: str, embedding: list[float]):
+    key = _cache_key(model, task_type, text)
+    with _local_lock:
+        _local[key] = list(embedding)
+    r = get_redis()
+    if r is not None:
+        try:
+            r.set(key, np.asarray(embedding, dtype=np.float32).tobytes(), ex=QUERY_EMBEDDING_CACHE_TTL_SECONDS)
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Query embedding cache write failed: {e}")
+
+
+def query_embedding_cache_hit_ratio() -> float | None:
+    """Share of query embeddings served from either cache tier (across processes when Redis is configured)."""
+    return metrics.ratio("query_embedding_cache_hits_total", "query_embedding_cache_misses_total")
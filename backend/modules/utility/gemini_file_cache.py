@@ -0,0 +1,93 @@
+# Cache of files already uploaded to the Gemini File API.
+# Keyed by recording hash (or meeting id when no hash is known), so API-key retries and
+# Celery retries can reuse a still-valid upload instead of streaming the recording again.
+# Entries live in Redis next to the Celery broker and expire together with the Gemini file.
+
+import json
+import time
+from datetime import datetime, timezone
+from modules.utility.redis_client import get_redis
+from modules.utility.key_pool import key_fingerprint
+
+# Gemini keeps uploaded files for 48 hours; used when the upload response has no expirationTime.
+DEFAULT_FILE_TTL_SECONDS = 47 * 60 * 60
+# Don't hand out a file that is about to expire mid-analysis.
+EXPIRY_SAFETY_MARGIN_SECONDS = 15 * 60
+
+
+def parse_expiration(expiration_time: str | None) -> float:
+    """Converts Gemini's RFC 3339 `expirationTime` into an epoch timestamp."""
+    if expiration_time:
+        try:
+            # Gemini may return nanosecond precision, which fromisoformat can't parse
+            trimmed = expiration_time.rstrip("Z").split(".")[0]
+            return datetime.fromisoformat(trimmed).replace(tzinfo=timezone.utc).timestamp()
+        except ValueError:
+            pass
+    return time.time() + DEFAULT_FILE_TTL_SECONDS
+
+
+def _cache_key(cache_id: str) -> str:
+    return f"gemini_file:{cache_id}"
+
+
+def lookup(cache_id: str | None) -> dict | None:
+    """Returns the cached entry for `cache_id` if it exists and isn't about to expire."""
+    r = get_redis()
+    if r is None or not cache_id:
+        return None
+
+    raw = r.get(_cache_key(cache_id))
+    if not raw:
+        return None
+
+    entry = json.loads(raw)
+    if entry.get("expires_at", 0) - EXPIRY_SAFETY_MARGIN_SECONDS <= time.time():
+        return None
+    return entry
+
+
+def get_for_key(cache_id: str | None, api_key: str) -> dict | None:
+    """Returns the cached entry only if it was uploaded with `api_key` (files are owned by the key's project)."""
+    entry = lookup(cache_id)
+    if entry and entry.get("key_fingerprint") == key_fingerprint(api_key):
+        return entry
+    return None
+
+
+def store(cache_id: str | None, file_uri: str, mime_type: str, api_key: str, state: str, expires_at: float):
+    """Remembers an uploaded file until its expiry."""
+    r = get_redis()
+    if r is None or not cache_id:
+        return
+
+    ttl = int(expires_at - time.time())
+    if ttl <= 0:
+        return
+
+    entry = {
+        "file_uri": file_uri,
+        "mime_type": mime_type,
+        "key_fingerprint": key_fingerprint(api_key),
+        "state": state,
+        "expires_at": expires_at,
+    }
+    r.set(_cache_key(cache_id), json.dumps(entry), ex=ttl)
+
+
+def mark_active(cache_id: str | None):
+    """Records that the cached file reached the ACTIVE state, so retries can skip the status poll."""
+    entry = lookup(cache_id)
+    if entry is None:
+        return
+    r = get_redis()
+    entry["state"] = "ACTIVE"
+    r.set(_cache_key(cache_id), json.dumps(entry), ex=max(1, int(entry["expires_at"] - time.time())))
+
+
+def invalidate(cache_id: str | None):
+    """Drops a cached file, e.g. after Gemini reports it missing or failed."""
+    r = get_redis()
+    if r is None or not cache_id:
+        return
+    r.delete(_cache_key(cache_id))
@@ -4,6 +4,12 @@ from dotenv import load_dotenv
 import google.generativeai as genai
 from supabase import Client
 import google.api_core.exceptions
+from modules.utility.key_pool import key_pool, key_fingerprint
+from modules.utility import db
+from modules.utility.vector_index import vector_index
+from modules.utility import quantization
+from modules.utility import answer_cache
+from modules.utility.rate_limiter import rate_limiter, estimate_tokens
 
 load_dotenv()
 
@@ -22,14 +28,11 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]
 async def create_and_store_embeddings_manually(supabase: Client, meeting_id: str, transcript_text: str):
     """
     Chunks a transcript, creates embeddings with API key rotation,
-    stores them, and updates the meeting status.
+    stores them, and updates the meeting status. Raises if anything fails.
     """
     
-    # Load all API keys from the .env file
-    api_keys_str = os.getenv("GEMINI_API_KEYS", "")
-    if not api_keys_str:
+    if not len(key_pool):
         raise ValueError("GEMINI_API_KEYS environment variable not set or is empty.")
-    api_keys = [key.strip() for key in api_keys_str.split(',')]
 
     try:
         print(f"Starting manual embedding creation for meeting {meeting_id}...")
@@ -43,17 +46,20 @@ async def create_and_store_embeddings_manually(supabase: Client, meeting_id: str
         embeddings_result = None
         last_error = None
 
-        # Loop through each key and try to perform the analysis
-        for key in api_keys:
+        # Loop through the healthy keys (with rate-limit headroom, least loaded first) and try to perform the analysis
+        chunk_tokens = estimate_tokens(chunks)
+        for key in key_pool.candidates(model=embedding_model, tokens=chunk_tokens):
             try:
                 print(f"Attempting embedding creation for meeting {meeting_id} with a new API key...")
-                # Configure the generative AI client with the current key
-                genai.configure(api_key=key)
-                embeddings_result = genai.embed_content(
-                    model=embedding_model,
-                    content=chunks,
-                    task_type="RETRIEVAL_DOCUMENT",
-                )
+                await rate_limiter.wait_for_capacity_async(key_fingerprint(key), embedding_model, chunk_tokens)
+                with key_pool.lease(key):
+                    # Configure the generative AI client with the current key
+                    genai.configure(api_key=key)
+                    embeddings_result = genai.embed_content(
+                        model=embedding_model,
+                        content=chunks,
+                        task_type="RETRIEVAL_DOCUMENT",
+                    )
                 print(f"Embedding creation successful with key ending in '...{key[-4:]}'.")
                 break  # Exit the loop on success
             
@@ -75,16 +81,26 @@ async def create_and_store_embeddings_manually(supabase: Client, meeting_id: str
         records_to_insert = [{
             "meeting_id": meeting_id,
             "content": chunk,
-            "embedding": embeddings[i]
+            # Unique per meeting, so a duplicate build can't insert its chunks twice
+            "chunk_index": i,
+            "embedding": embeddings[i],
+            # int8 copy read by the in-process vector index
+            "embedding_q8": quantization.encode(embeddings[i]),
         } for i, chunk in enumerate(chunks)]
 
-        supabase.table("meeting_embeddings").insert(records_to_insert).execute()
+        # Idempotent: a build that repeats (e.g. the flag update below failed last time)
+        # overwrites its chunks instead of violating the unique (meeting_id, chunk_index)
+        await db.execute(supabase.table("meeting_embeddings").upsert(records_to_insert, on_conflict="meeting_id,chunk_index"))
+        vector_index.invalidate(meeting_id)
+        # Answers given against the previous embeddings may no longer hold
+        answer_cache.invalidate(meeting_id)
         
         print(f"Successfully created and stored {len(records_to_insert)} embeddings for meeting {meeting_id}")
 
-        supabase.table("meetings").update({"embedding_created": True}).eq("id", meeting_id).execute()
+        await db.execute(supabase.table("meetings").update({"embedding_created": True}).eq("id", meeting_id))
         print(f"Updated 'embedding_created' flag to True for meeting {meeting_id}")
 
     except Exception as e:
         print(f"Error creating embeddings manually for meeting {meeting_id}: {e}")
-        # The main.py caller handles the error, so we don't need to re-raise here.
\ No newline at end of file
+        # Callers must not treat the meeting as embedded (or release its build lock as done)
+        raise
\ No newline at end of file
@@ -0,0 +1,38 @@
+# Conditional GET helpers.
+# Responses carry a weak ETag built from the row versions (updated_at) they were
+# rendered from; a request whose If-None-Match still matches gets a bodiless 304.
+
+import hashlib
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def weak_etag(*parts) -> str:
+    """Builds a weak ETag from anything that identifies the representation's version."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against `etag` (RFC 9110, section 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def json_response(content: dict, etag: str | None = None) -> ORJSONResponse:
+    """
+    Serializes an already-built dict with orjson, skipping FastAPI's jsonable_encoder
+    and response_model validation, and attaches the ETag.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL} if etag else None
+    return ORJSONResponse(content, headers=headers)
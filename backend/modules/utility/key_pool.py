@@ -0,0 +1,204 @@
+# Shared, health-aware pool of Gemini API keys.
+# Every Gemini call site asks the pool for candidate keys instead of walking
+# GEMINI_API_KEYS in a fixed order. Per-key state (cooldown, recent error rate and
+# in-flight count) lives in Redis so the API and every worker see the same picture;
+# without Redis the pool falls back to per-process state.
+
+import os
+import time
+import random
+import hashlib
+import threading
+import requests
+import google.api_core.exceptions
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+from modules.utility.upload_file_to_gemini import ApiKeyException
+from modules.utility.rate_limiter import rate_limiter, RateLimitExceeded
+from modules.utility.metrics import metrics
+load_dotenv()
+
+# How long a key is skipped after each kind of failure
+RATE_LIMIT_COOLDOWN_SECONDS = int(os.getenv("KEY_RATE_LIMIT_COOLDOWN_SECONDS", 60))
+INVALID_KEY_COOLDOWN_SECONDS = int(os.getenv("KEY_INVALID_COOLDOWN_SECONDS", 60 * 60))
+# Weight of the latest outcome in the exponentially weighted error rate
+ERROR_RATE_ALPHA = 0.2
+# In-flight counters are dropped if a process dies mid-call and never releases them
+KEY_STATE_TTL_SECONDS = 10 * 60
+
+# Applies one call's outcome to a key's state hash in a single atomic step, so
+# concurrent workers don't overwrite each other's error-rate samples.
+# ARGV: inflight delta, outcome (1 error, 0 success, -1 none), alpha, cooldown until (0 = none), ttl
+_UPDATE_STATE = """
+local delta = tonumber(ARGV[1])
+if delta ~= 0 then
+    redis.call('HINCRBY', KEYS[1], 'inflight', delta)
+end
+local outcome = tonumber(ARGV[2])
+if outcome >= 0 then
+    local alpha = tonumber(ARGV[3])
+    local current = tonumber(redis.call('HGET', KEYS[1], 'error_rate') or '0')
+    redis.call('HSET', KEYS[1], 'error_rate', tostring(current * (1 - alpha) + alpha * outcome))
+end
+local cooldown_until = tonumber(ARGV[4])
+if cooldown_until > 0 then
+    local previous = tonumber(redis.call('HGET', KEYS[1], 'cooldown_until') or '0')
+    redis.call('HSET', KEYS[1], 'cooldown_until', tostring(math.max(previous, cooldown_until)))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Stable, non-secret identifier for an API key (the key itself is never stored)."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+
+def is_quota_error(error: Exception) -> bool:
+    """True when Gemini itself rejected the call for quota (ResourceExhausted or HTTP 429)."""
+    if isinstance(error, RateLimitExceeded):
+        # Our own limiter said no; that is what it is there for
+        return False
+    if isinstance(error, google.api_core.exceptions.ResourceExhausted):
+        return True
+    return (isinstance(error, requests.exceptions.HTTPError) and error.response is not None
+            and error.response.status_code == 429)
+
+
+def cooldown_for(error: Exception) -> int:
+    """How long a key should rest after `error`. Errors that aren't the key's fault return 0."""
+    if isinstance(error, RateLimitExceeded):
+        # Our own limiter said no; its buckets already know when the key has room again
+        return 0
+    if isinstance(error, (ApiKeyException, google.api_core.exceptions.PermissionDenied)):
+        return INVALID_KEY_COOLDOWN_SECONDS
+    if is_quota_error(error):
+        return RATE_LIMIT_COOLDOWN_SECONDS
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        if error.response.status_code == 401:
+            return INVALID_KEY_COOLDOWN_SECONDS
+    return 0
+
+
+class GeminiKeyPool:
+    def __init__(self, api_keys: list[str] | None = None):
+        """
+        Initializes the pool from `api_keys`, or from the GEMINI_API_KEYS environment variable.
+        """
+        if api_keys is None:
+            api_keys = os.getenv("GEMINI_API_KEYS", "").split(",")
+        self.keys = [key.strip() for key in api_keys if key.strip()]
+        self._local_state = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    # --- State storage ---
+
+    @staticmethod
+    def _state_key(api_key: str) -> str:
+        return f"gemini_key:{key_fingerprint(api_key)}"
+
+    def _load_states(self) -> dict[str, dict]:
+        r = get_redis()
+        if r is None:
+            with self._lock:
+                return {key: dict(self._local_state.get(key, {})) for key in self.keys}
+
+        pipe = r.pipeline()
+        for key in self.keys:
+            pipe.hgetall(self._state_key(key))
+        states = {}
+        for key, raw in zip(self.keys, pipe.execute()):
+            states[key] = {k.decode(): float(v) for k, v in raw.items()}
+        return states
+
+    def _update(self, api_key: str, inflight_delta: int = 0, error: bool | None = None, cooldown: int = 0):
+        r = get_redis()
+        if r is None:
+            with self._lock:
+                state = self._local_state.setdefault(api_key, {})
+                state["inflight"] = max(0, state.get("inflight", 0) + inflight_delta)
+                if error is not None:
+                    state["error_rate"] = state.get("error_rate", 0) * (1 - ERROR_RATE_ALPHA) + (ERROR_RATE_ALPHA if error else 0)
+                if cooldown:
+                    state["cooldown_until"] = max(state.get("cooldown_until", 0), time.time() + cooldown)
+            return
+
+        r.eval(
+            _UPDATE_STATE, 1, self._state_key(api_key),
+            inflight_delta,
+            -1 if error is None else int(error),
+            ERROR_RATE_ALPHA,
+            time.time() + cooldown if cooldown else 0,
+            KEY_STATE_TTL_SECONDS + cooldown,
+        )
+
+    # --- Selection ---
+
+    def candidates(self, exclude: set[str] | None = None, model: str | None = None, tokens: int = 1) -> list[str]:
+        """
+        Returns keys to try, least loaded first: keys in cooldown are skipped, the rest
+        are ordered by in-flight count and then recent error rate. If every key is
+        cooling down, only the one that recovers soonest is returned. When `model` is
+        given, keys whose rate limit has room for `tokens` right now come first.
+        """
+        exclude = exclude or set()
+        now = time.time()
+        states = self._load_states()
+
+        usable = [key for key in self.keys if key_fingerprint(key) not in exclude]
+        healthy = [key for key in usable if states[key].get("cooldown_until", 0) <= now]
+        if not healthy:
+            return sorted(usable, key=lambda key: states[key].get("cooldown_until", 0))[:1]
+
+        headroom_wait = {
+            key: rate_limiter.peek(key_fingerprint(key), model, tokens) if model else 0
+            for key in healthy
+        }
+        return sorted(healthy, key=lambda key: (
+            headroom_wait[key],
+            max(0, states[key].get("inflight", 0)),
+            round(states[key].get("error_rate", 0), 2),
+            random.random(),
+        ))
+
+    def resolve(self, fingerprint: str | None) -> str | None:
+        """Maps a key fingerprint back to the configured API key."""
+        for key in self.keys:
+            if key_fingerprint(key) == fingerprint:
+                return key
+        return None
+
+    # --- Usage reporting ---
+
+    @contextmanager
+    def lease(self, api_key: str):
+        """
+        Wraps one call made with `api_key`: counts it as in flight, then records the
+        outcome. A failure that is the key's fault puts the key into cooldown.
+        """
+        self._update(api_key, inflight_delta=1)
+        try:
+            yield api_key
+        except Exception as e:
+            cooldown = cooldown_for(e)
+            if is_quota_error(e):
+                metrics.incr("gemini_quota_errors_total")
+            self._update(api_key, inflight_delta=-1, error=True, cooldown=cooldown)
+            if cooldown:
+                print(f"🧊 Key ending in '...{api_key[-4:]}' cooling down for {cooldown}s after {type(e).__name__}.")
+            raise
+        except BaseException:
+            # Cancelled (e.g. a streamed answer whose client went away): not the key's fault
+            self._update(api_key, inflight_delta=-1, error=False)
+            raise
+        else:
+            self._update(api_key, inflight_delta=-1, error=False)
+
+
+# Process-wide pool shared by every call site
+key_pool = GeminiKeyPool()
@@ -0,0 +1,163 @@
+# Minimal metrics registry shared by the API and the Celery workers.
+# Counters and timing observations are recorded in process and, when Redis is configured,
+# flushed every METRICS_FLUSH_SECONDS into hashes under METRICS_REDIS_PREFIX by a
+# background thread, so the API (GET /internal/metrics) reports the totals of every
+# process, including worker-side limiter waits and Gemini 429s. Without Redis each
+# process only sees its own numbers.
+
+import os
+import time
+import threading
+import redis
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+load_dotenv()
+
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 10))
+METRICS_REDIS_PREFIX = os.getenv("METRICS_REDIS_PREFIX", "metrics")
+
+# Raises hash field ARGV[1] to ARGV[2] if that is larger than the stored value.
+_MAX = """
+local current = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+if tonumber(ARGV[2]) > current then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+return 1
+"""
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._observations = {}
+        # Not yet flushed to Redis
+        self._pending_counters = {}
+        self._pending_observations = {}
+        self._flusher_pid = None
+
+    @staticmethod
+    def _name(name: str, labels: dict) -> str:
+        if not labels:
+            return name
+        label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+        return f"{name}{{{label_text}}}"
+
+    @staticmethod
+    def _add_observation(observations: dict, key: str, count: int, total: float, maximum: float):
+        stats = observations.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})
+        stats["count"] += count
+        stats["sum"] += total
+        stats["max"] = max(stats["max"], maximum)
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Adds `value` to a counter."""
+        key = self._name(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._pending_counters[key] = self._pending_counters.get(key, 0) + value
+        self._ensure_flusher()
+
+    def observe(self, name: str, value: float, **labels):
+        """Records one observation (e.g. a wait time); count, sum and max are kept."""
+        key = self._name(name, labels)
+        with self._lock:
+            self._add_observation(self._observations, key, 1, value, value)
+            self._add_observation(self._pending_observations, key, 1, value, value)
+        self._ensure_flusher()
+
+    # --- Sharing through Redis ---
+
+    def _ensure_flusher(self):
+        # One flusher per process; a forked Celery child doesn't inherit the parent's thread
+        if self._flusher_pid == os.getpid() or get_redis() is None:
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_forever, name="metrics-flusher", daemon=True).start()
+
+    def _flush_forever(self):
+        while True:
+            time.sleep(METRICS_FLUSH_SECONDS)
+            self.flush()
+
+    def flush(self):
+        """Adds everything recorded since the last flush to the shared totals in Redis."""
+        r = get_redis()
+        if r is None:
+            return
+        with self._lock:
+            counters, self._pending_counters = self._pending_counters, {}
+            observations, self._pending_observations = self._pending_observations, {}
+        if not counters and not observations:
+            return
+
+        counters_key, observations_key = f"{METRICS_REDIS_PREFIX}:counters", f"{METRICS_REDIS_PREFIX}:observations"
+        try:
+            pipe = r.pipeline(transaction=False)
+            for key, value in counters.items():
+                pipe.hincrbyfloat(counters_key, key, value)
+            for key, stats in observations.items():
+                pipe.hincrby(observations_key, f"{key}|count", stats["count"])
+                pipe.hincrbyfloat(observations_key, f"{key}|sum", stats["sum"])
+                pipe.eval(_MAX, 1, observations_key, f"{key}|max", stats["max"])
+            pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Could not flush metrics to Redis: {e}")
+            # Keep the deltas for the next flush
+            with self._lock:
+                for key, value in counters.items():
+                    self._pending_counters[key] = self._pending_counters.get(key, 0) + value
+                for key, stats in observations.items():
+                    self._add_observation(self._pending_observations, key, stats["count"], stats["sum"], stats["max"])
+
+    def _shared(self) -> dict | None:
+        """Totals of every process from Redis (including this one's latest numbers), or None without Redis."""
+        r = get_redis()
+        if r is None:
+            return None
+        self.flush()
+        try:
+            pipe = r.pipeline(transaction=False)
+            pipe.hgetall(f"{METRICS_REDIS_PREFIX}:counters")
+            pipe.hgetall(f"{METRICS_REDIS_PREFIX}:observations")
+            raw_counters, raw_observations = pipe.execute()
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Could not read shared metrics from Redis: {e}")
+            return None
+
+        observations = {}
+        for field, value in raw_observations.items():
+            key, _, stat = field.decode().rpartition("|")
+            observations.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0})[stat] = int(value) if stat == "count" else float(value)
+        return {
+            "counters": {key.decode(): float(value) for key, value in raw_counters.items()},
+            "observations": observations,
+        }
+
+    # --- Reading ---
+
+    def ratio(self, hits_name: str, misses_name: str, **labels) -> float | None:
+        """Hit ratio of a pair of counters across all processes, or None before the first lookup."""
+        counters = self.snapshot()["counters"]
+        hits = counters.get(self._name(hits_name, labels), 0)
+        misses = counters.get(self._name(misses_name, labels), 0)
+        total = hits + misses
+        return hits / total if total else None
+
+    def snapshot(self) -> dict:
+        """Returns every counter and observation: shared totals with Redis, this process's otherwise."""
+        shared = self._shared()
+        if shared is not None:
+            return shared
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "observations": {k: dict(v) for k, v in self._observations.items()},
+            }
+
+
+# Process-wide registry
+metrics = Metrics()
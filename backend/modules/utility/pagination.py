@@ -0,0 +1,92 @@
+# Keyset (cursor) pagination helpers for meeting lists.
+# Pages are addressed by the (created_at, id) of the last row seen instead of an
+# offset, so every page is an index range scan of `limit` rows no matter how deep the
+# user scrolls. The cursor is opaque to clients. Exact totals are expensive for long
+# histories, so they are cached per user for a short while.
+
+import os
+import re
+import json
+import uuid
+import base64
+import threading
+from cachetools import TTLCache
+from modules.utility.redis_client import get_redis
+
+MEETING_COUNT_CACHE_TTL_SECONDS = int(os.getenv("MEETING_COUNT_CACHE_TTL_SECONDS", 60))
+
+
+# What PostgREST returns for a timestamptz, e.g. 2025-01-31T09:15:00.123456+00:00
+_TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}(:?\d{2})?)?")
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Packs the sort key of the last row on a page into an opaque, URL-safe cursor."""
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """
+    Reverses `encode_cursor`. Raises InvalidCursorError for anything it didn't produce.
+    The values end up inside a PostgREST filter, so both are validated strictly: an
+    ISO timestamp and a UUID (returned in canonical form).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        if not isinstance(created_at, str) or not _TIMESTAMP_PATTERN.fullmatch(created_at):
+            raise ValueError("cursor timestamp")
+        return created_at, str(uuid.UUID(row_id))
+    except (ValueError, TypeError, AttributeError) as e:
+        raise InvalidCursorError("Invalid cursor.") from e
+
+
+def after_cursor(query, cursor: str):
+    """
+    Restricts a query ordered by (created_at desc, id desc) to the rows after `cursor`.
+    Values are quoted because timestamps contain characters PostgREST treats specially.
+    """
+    created_at, row_id = decode_cursor(cursor)
+    return query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")')
+
+
+# --- Cached totals ---
+
+_local_counts = TTLCache(maxsize=10_000, ttl=MEETING_COUNT_CACHE_TTL_SECONDS)
+_local_counts_lock = threading.Lock()
+
+
+def _count_key(user_id: str) -> str:
+    return f"meeting_count:{user_id}"
+
+
+def get_cached_count(user_id: str) -> int | None:
+    r = get_redis()
+    if r is not None:
+        value = r.get(_count_key(user_id))
+        return int(value) if value is not None else None
+    with _local_counts_lock:
+        return _local_counts.get(user_id)
+
+
+def set_cached_count(user_id: str, count: int):
+    r = get_redis()
+    if r is not None:
+        r.set(_count_key(user_id), count, ex=MEETING_COUNT_CACHE_TTL_SECONDS)
+        return
+    with _local_counts_lock:
+        _local_counts[user_id] = count
+
+
+def invalidate_count(user_id: str):
+    """Drops a user's cached total after a meeting was created or deleted."""
+    r = get_redis()
+    if r is not None:
+        r.delete(_count_key(user_id))
+    with _local_counts_lock:
+        _local_counts.pop(user_id, None)
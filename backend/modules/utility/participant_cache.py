@@ -0,0 +1,105 @@
+# Process-wide email -> display name cache for meeting participants.
+# Participant sets repeat across a team's meetings, so names are cached for a while,
+# and emails without a profile are cached (for a shorter while) as misses. Lookups
+# that miss are coalesced: every detail view that misses within a short window waits
+# on the same `in_("email", ...)` query for the union of their emails.
+
+import os
+import asyncio
+from cachetools import TTLCache
+from supabase import Client
+from modules.utility import db
+from modules.utility.metrics import metrics
+
+PARTICIPANT_CACHE_TTL_SECONDS = int(os.getenv("PARTICIPANT_CACHE_TTL_SECONDS", 10 * 60))
+PARTICIPANT_NEGATIVE_TTL_SECONDS = int(os.getenv("PARTICIPANT_NEGATIVE_TTL_SECONDS", 60))
+PARTICIPANT_CACHE_MAX_SIZE = int(os.getenv("PARTICIPANT_CACHE_MAX_SIZE", 50_000))
+# How long a miss waits for other misses to join its query
+PARTICIPANT_BATCH_WINDOW_SECONDS = float(os.getenv("PARTICIPANT_BATCH_WINDOW_SECONDS", 0.005))
+# Keeps the query string of one `in_` filter at a sane length
+PARTICIPANT_BATCH_MAX_EMAILS = 200
+
+# Both caches and the batch state are only touched from the event loop, so no locks
+_names = TTLCache(maxsize=PARTICIPANT_CACHE_MAX_SIZE, ttl=PARTICIPANT_CACHE_TTL_SECONDS)
+_unknown = TTLCache(maxsize=PARTICIPANT_CACHE_MAX_SIZE, ttl=PARTICIPANT_NEGATIVE_TTL_SECONDS)
+_inflight: dict[str, asyncio.Future] = {}
+_queued: set[str] = set()
+_flush_scheduled = False
+
+
+def _display_name(profile: dict) -> str:
+    return f"{profile.get('firstName') or ''} {profile.get('lastName') or ''}".strip()
+
+
+async def _flush(supabase: Client):
+    """Runs the coalesced query for every queued email and resolves the waiting lookups."""
+    global _flush_scheduled
+    _flush_scheduled = False
+    emails = list(_queued)
+    _queued.clear()
+
+    for start in range(0, len(emails), PARTICIPANT_BATCH_MAX_EMAILS):
+        batch = emails[start:start + PARTICIPANT_BATCH_MAX_EMAILS]
+        try:
+            metrics.incr("participant_cache_queries_total")
+            response = await db.execute(supabase.table("profiles").select("email, firstName, lastName").in_("email", batch))
+            found = {profile["email"]: _display_name(profile) for profile in response.data or []}
+        except Exception as e:
+            for email in batch:
+                future = _inflight.pop(email, None)
+                if future and not future.done():
+                    future.set_exception(e)
+            continue
+
+        for email in batch:
+            name = found.get(email)
+            if name:
+                _names[email] = name
+            else:
+                _unknown[email] = True
+            future = _inflight.pop(email, None)
+            if future and not future.done():
+                future.set_result(name or None)
+
+
+def _lookup(supabase: Client, email: str) -> asyncio.Future:
+    """Joins (or opens) the pending batch for `email`."""
+    global _flush_scheduled
+    future = _inflight.get(email)
+    if future is not None:
+        return future
+
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    _inflight[email] = future
+    _queued.add(email)
+    if not _flush_scheduled:
+        _flush_scheduled = True
+        loop.call_later(PARTICIPANT_BATCH_WINDOW_SECONDS, lambda: asyncio.ensure_future(_flush(supabase)))
+    return future
+
+
+async def get_display_names(supabase: Client, emails: list[str]) -> dict[str, str | None]:
+    """Maps each email to its profile's display name, or None when there is no profile."""
+    names, pending = {}, {}
+    for email in dict.fromkeys(email for email in emails if email):
+        if email in _names:
+            names[email] = _names[email]
+        elif email in _unknown:
+            names[email] = None
+        else:
+            pending[email] = _lookup(supabase, email)
+
+    metrics.incr("participant_cache_hits_total", len(names))
+    metrics.incr("participant_cache_misses_total", len(pending))
+
+    if pending:
+        results = await asyncio.gather(*pending.values())
+        names.update(zip(pending.keys(), results))
+    return names
+
+
+def invalidate(email: str):
+    """Forgets a cached name, e.g. after the profile was renamed or created."""
+    _names.pop(email, None)
+    _unknown.pop(email, None)
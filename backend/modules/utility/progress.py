@@ -0,0 +1,102 @@
+# Push-based processing progress for meetings.
+# Pipeline stages report what they are doing (downloading, uploading to Gemini, waiting
+# for the file, analyzing, persisting) and the reporter emits throttled
+# 'meeting_progress' events to the user's Socket.IO room through the Redis message
+# queue. Every event carries a per-meeting sequence number so clients can drop stale
+# events, and the latest event is kept in Redis for sockets that join late.
+
+import os
+import json
+import time
+import socketio
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis, REDIS_URL
+load_dotenv()
+
+SOCKETIO_CHANNEL = os.getenv("SOCKETIO_CHANNEL", "socketio")
+# At most one event per interval for the same stage; stage changes are always sent
+PROGRESS_MIN_INTERVAL_SECONDS = float(os.getenv("PROGRESS_MIN_INTERVAL_SECONDS", 1.0))
+PROGRESS_TTL_SECONDS = 48 * 60 * 60
+
+_socket_emitter: socketio.RedisManager | None = None
+
+
+def get_socket_emitter() -> socketio.RedisManager | None:
+    """
+    Write-only Socket.IO manager on the shared Redis. Events published here are picked
+    up by whichever API replica holds the user's connection.
+    """
+    global _socket_emitter
+    if _socket_emitter is None and REDIS_URL:
+        _socket_emitter = socketio.RedisManager(REDIS_URL, channel=SOCKETIO_CHANNEL, write_only=True)
+    return _socket_emitter
+
+
+def _progress_key(meeting_id: str) -> str:
+    return f"meeting_progress:{meeting_id}"
+
+
+def latest_progress(meeting_id: str) -> dict | None:
+    """Returns the last progress event of a meeting, or None if nothing was reported."""
+    r = get_redis()
+    if r is None:
+        return None
+    raw = r.get(_progress_key(meeting_id))
+    return json.loads(raw) if raw else None
+
+
+class ProgressReporter:
+    def __init__(self, meeting_id: str, user_id: str | None):
+        """Initializes a reporter for one pipeline stage of a meeting."""
+        self.meeting_id = meeting_id
+        self.user_id = user_id
+        self._last_stage = None
+        self._last_sent = 0.0
+        self._local_seq = 0
+
+    def _next_seq(self) -> int:
+        r = get_redis()
+        if r is None:
+            self._local_seq += 1
+            return self._local_seq
+        seq_key = f"meeting_progress_seq:{self.meeting_id}"
+        seq = r.incr(seq_key)
+        r.expire(seq_key, PROGRESS_TTL_SECONDS)
+        return seq
+
+    def update(self, stage: str, percent: float | None = None, force: bool = False, **details):
+        """
+        Reports the current stage, with an optional percent and extra fields. Updates
+        within the same stage are throttled to one per PROGRESS_MIN_INTERVAL_SECONDS.
+        Progress is best effort: failures are logged and never break the pipeline.
+        """
+        now = time.time()
+        if not force and stage == self._last_stage and now - self._last_sent < PROGRESS_MIN_INTERVAL_SECONDS:
+            return
+        self._last_stage = stage
+        self._last_sent = now
+
+        try:
+            event = {
+                "meetingId": self.meeting_id,
+                "seq": self._next_seq(),
+                "stage": stage,
+                "percent": round(percent, 1) if percent is not None else None,
+                "updatedAt": now,
+                **details,
+            }
+
+            r = get_redis()
+            if r is not None:
+                r.set(_progress_key(self.meeting_id), json.dumps({**event, "userId": self.user_id}), ex=PROGRESS_TTL_SECONDS)
+
+            emitter = get_socket_emitter()
+            if emitter is not None and self.user_id:
+                emitter.emit('meeting_progress', event, room=self.user_id)
+        except Exception as e:
+            print(f"⚠️ Could not report progress for meeting {self.meeting_id}: {e}")
+
+    def transfer(self, stage: str, done: int, total: int | None):
+        """Progress callback for byte transfers (see RecordingSource)."""
+        percent = done * 100 / total if total else None
+        self.update(stage, percent, force=bool(total) and done >= total, bytes=done, totalBytes=total)
@@ -37,9 +37,10 @@ class MeetingInList(BaseModel):
 
 class PaginatedMeetingsResponse(BaseModel):
     meetings: List[MeetingInList]
-    total: int
-    page: int
+    total: Optional[int] = None # Cached per user; omitted in cursor mode unless requested
+    page: Optional[int] = None
     limit: int
+    next_cursor: Optional[str] = None # Opaque; pass back as `cursor` for the next page
 
 class AllMeetingsResponse(BaseModel):
     meetings: List[MeetingInList]
@@ -74,8 +75,29 @@ class MeetingDetail(BaseModel):
     recordingUrl: Optional[str] = None
     status: str
     createdAt: str
+    transcriptCount: Optional[int] = None # `transcript` holds only the first page; see /meetings/{id}/transcript
+
+class TranscriptPage(BaseModel):
+    meetingId: str
+    segments: List[TranscriptSegment]
+    offset: int
+    limit: int
+    total: int # Segments in the requested window
+    nextOffset: Optional[int] = None
 
 class Notification(BaseModel):
     meetingId: str
     userId: str
     status: str
+
+
+class UploadSessionStatus(BaseModel):
+    uploadId: str
+    meetingId: str
+    chunkSize: int
+    totalSize: int
+    totalChunks: int
+    receivedChunks: List[int] = []
+    missingChunks: List[int] = []
+    receivedOffset: int
+    complete: bool
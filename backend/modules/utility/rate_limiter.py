@@ -0,0 +1,166 @@
+# Client-side RPM/TPM rate limiting per Gemini key and model.
+# Each (key, model) pair has two token buckets, one for requests per minute and one for
+# tokens per minute. Buckets live in Redis and are updated atomically by a Lua script, so
+# every API and worker process draws from the same budget; without Redis each process
+# keeps its own buckets. Callers wait briefly for capacity instead of finding out about
+# exhausted quota from a ResourceExhausted/429 round trip.
+
+import os
+import json
+import time
+import asyncio
+import threading
+import google.api_core.exceptions
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+from modules.utility.metrics import metrics
+load_dotenv()
+
+# Per-model quotas, overridable with GEMINI_RATE_LIMITS='{"gemini-1.5-flash": {"rpm": 15, "tpm": 1000000}}'
+DEFAULT_RATE_LIMITS = {
+    "gemini-1.5-flash": {"rpm": 15, "tpm": 1_000_000},
+    "text-embedding-004": {"rpm": 1500, "tpm": 1_000_000},
+}
+RATE_LIMITS = {**DEFAULT_RATE_LIMITS, **json.loads(os.getenv("GEMINI_RATE_LIMITS", "{}"))}
+
+# Gemini bills audio at a fixed rate per second; used when the recording length is known
+AUDIO_TOKENS_PER_SECOND = 32
+# Assumed size of a recording whose length couldn't be probed (about 30 minutes)
+DEFAULT_AUDIO_TOKEN_ESTIMATE = int(os.getenv("DEFAULT_AUDIO_TOKEN_ESTIMATE", 60_000))
+
+# Longest a caller will wait for capacity on one key before trying another
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", 10))
+
+# Refills both buckets, then consumes 1 request and ARGV[4] tokens if both have room.
+# Returns the seconds to wait until they would (as a string; Lua numbers are truncated).
+_TOKEN_BUCKET = """
+local now = tonumber(ARGV[1])
+local rpm = tonumber(ARGV[2])
+local tpm = tonumber(ARGV[3])
+local need = math.min(tonumber(ARGV[4]), tpm)
+
+local function level(key, capacity)
+    local v = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(v[1]) or capacity
+    local ts = tonumber(v[2]) or now
+    return math.min(capacity, tokens + math.max(0, now - ts) * capacity / 60)
+end
+
+local requests = level(KEYS[1], rpm)
+local tokens = level(KEYS[2], tpm)
+
+local wait = 0
+if requests < 1 then wait = math.max(wait, (1 - requests) * 60 / rpm) end
+if tokens < need then wait = math.max(wait, (need - tokens) * 60 / tpm) end
+
+if wait == 0 and ARGV[5] == '1' then
+    redis.call('HSET', KEYS[1], 'tokens', requests - 1, 'ts', now)
+    redis.call('HSET', KEYS[2], 'tokens', tokens - need, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], 120)
+    redis.call('EXPIRE', KEYS[2], 120)
+end
+return tostring(wait)
+"""
+
+
+class RateLimitExceeded(google.api_core.exceptions.ResourceExhausted):
+    """
+    Raised when a key has no capacity within RATE_LIMIT_MAX_WAIT_SECONDS. Subclasses
+    ResourceExhausted so the existing key-rotation loops move on to the next key.
+    """
+    pass
+
+
+def estimate_tokens(text: str | list[str]) -> int:
+    """Rough token count for text (about 4 characters per token)."""
+    if isinstance(text, list):
+        return sum(estimate_tokens(t) for t in text)
+    return max(1, len(text or "") // 4)
+
+
+def estimate_audio_tokens(seconds: float | None) -> int:
+    """Token cost of an audio file of `seconds` length."""
+    if not seconds:
+        return DEFAULT_AUDIO_TOKEN_ESTIMATE
+    return int(seconds * AUDIO_TOKENS_PER_SECOND)
+
+
+class RateLimiter:
+    def __init__(self, limits: dict = RATE_LIMITS):
+        self.limits = limits
+        self._local_buckets = {}
+        self._lock = threading.Lock()
+
+    def _check(self, key_id: str, model: str, tokens: int, consume: bool) -> float:
+        limit = self.limits.get(model)
+        if not limit:
+            return 0.0
+
+        now = time.time()
+        r = get_redis()
+        if r is not None:
+            wait = r.eval(
+                _TOKEN_BUCKET, 2,
+                f"ratelimit:{key_id}:{model}:rpm", f"ratelimit:{key_id}:{model}:tpm",
+                now, limit["rpm"], limit["tpm"], tokens, "1" if consume else "0",
+            )
+            return float(wait)
+
+        # In-process fallback with the same bucket math as the Lua script
+        with self._lock:
+            need = min(tokens, limit["tpm"])
+            levels = []
+            for kind in ("rpm", "tpm"):
+                capacity = limit[kind]
+                level, ts = self._local_buckets.get((key_id, model, kind), (capacity, now))
+                levels.append(min(capacity, level + max(0, now - ts) * capacity / 60))
+
+            wait = 0.0
+            if levels[0] < 1:
+                wait = max(wait, (1 - levels[0]) * 60 / limit["rpm"])
+            if levels[1] < need:
+                wait = max(wait, (need - levels[1]) * 60 / limit["tpm"])
+
+            if wait == 0 and consume:
+                self._local_buckets[(key_id, model, "rpm")] = (levels[0] - 1, now)
+                self._local_buckets[(key_id, model, "tpm")] = (levels[1] - need, now)
+            return wait
+
+    def peek(self, key_id: str, model: str, tokens: int = 1) -> float:
+        """Seconds until (key, model) has room for one request of `tokens`, without consuming."""
+        return self._check(key_id, model, tokens, consume=False)
+
+    def wait_for_capacity(self, key_id: str, model: str, tokens: int = 1, max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS) -> float:
+        """
+        Blocks until the request fits in the buckets and consumes it. Returns the time
+        waited; raises RateLimitExceeded if that would take longer than `max_wait`.
+        """
+        waited = 0.0
+        while True:
+            wait = self._check(key_id, model, tokens, consume=True)
+            if wait == 0:
+                metrics.observe("gemini_rate_limiter_wait_seconds", waited, model=model)
+                return waited
+            if waited + wait > max_wait:
+                metrics.incr("gemini_rate_limiter_rejections_total", model=model)
+                raise RateLimitExceeded(f"No capacity for {model} within {max_wait}s on this key.")
+            time.sleep(wait)
+            waited += wait
+
+    async def wait_for_capacity_async(self, key_id: str, model: str, tokens: int = 1, max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS) -> float:
+        """Async variant of `wait_for_capacity` that sleeps without blocking the event loop."""
+        waited = 0.0
+        while True:
+            wait = self._check(key_id, model, tokens, consume=True)
+            if wait == 0:
+                metrics.observe("gemini_rate_limiter_wait_seconds", waited, model=model)
+                return waited
+            if waited + wait > max_wait:
+                metrics.incr("gemini_rate_limiter_rejections_total", model=model)
+                raise RateLimitExceeded(f"No capacity for {model} within {max_wait}s on this key.")
+            await asyncio.sleep(wait)
+            waited += wait
+
+
+# Process-wide limiter shared by every call site
+rate_limiter = RateLimiter()
@@ -0,0 +1,122 @@
+# Re-openable byte sources for recordings.
+# The Gemini upload reads straight from these sources, so the worker never has to hold
+# a recording in memory. A URL source pipes the Supabase download response directly
+# into the upload request; when the download has no Content-Length (which the Gemini
+# upload requires) the recording is spooled to a temp file and streamed from disk.
+
+import os
+import tempfile
+import requests
+from typing import Callable
+from contextlib import contextmanager
+
+DOWNLOAD_CHUNK_SIZE_BYTES = int(os.getenv("DOWNLOAD_CHUNK_SIZE_BYTES", 1024 * 1024))
+
+
+class ResponseBodyReader:
+    """
+    File-like wrapper around a streamed `requests` response. Exposes `read(n)` and
+    `__len__` so `requests` sends it as a fixed-length body, block by block.
+    """
+    def __init__(self, response: requests.Response, size: int):
+        self.response = response
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def read(self, n: int = -1) -> bytes:
+        return self.response.raw.read(None if n is None or n < 0 else n)
+
+
+class ProgressReader:
+    """
+    Counts the bytes read through a file-like stream and reports them to a
+    `progress(stage, done, total)` callback. Keeps `__len__` so the body is still sent
+    with a fixed length.
+    """
+    def __init__(self, stream, size: int, progress: Callable[[str, int, int | None], None], stage: str):
+        self.stream = stream
+        self.size = size
+        self.progress = progress
+        self.stage = stage
+        self.done = 0
+
+    def __len__(self):
+        return self.size
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.stream.read(n)
+        self.done += len(data)
+        self.progress(self.stage, self.done, self.size)
+        return data
+
+
+class RecordingSource:
+    def __init__(self, url: str | None = None, path: str | None = None, progress: Callable[[str, int, int | None], None] | None = None):
+        """
+        Initializes the source from a download URL or a local file path.
+        Nothing is fetched until the source is first opened, so a source that
+        turns out not to be needed (e.g. a cached Gemini upload) costs nothing.
+        `progress(stage, done, total)` is called as bytes are downloaded or read.
+        """
+        self.url = url
+        self.path = path
+        self.size = os.path.getsize(path) if path else None
+        self.spooled = False
+        self.progress = progress
+
+    @classmethod
+    def from_url(cls, url: str, progress: Callable[[str, int, int | None], None] | None = None) -> "RecordingSource":
+        return cls(url=url, progress=progress)
+
+    def _prepare(self):
+        """
+        Probes the URL for its size. Sizeable URLs are streamed on demand; anything
+        else is spooled to a temp file once (call `cleanup()` when done).
+        """
+        if self.size is not None:
+            return
+
+        head = requests.head(self.url, allow_redirects=True, timeout=30, headers={"Accept-Encoding": "identity"})
+        head.raise_for_status()
+        content_length = head.headers.get("Content-Length")
+        if content_length and int(content_length) > 0:
+            self.size = int(content_length)
+            return
+
+        print(f"⚠️ No Content-Length for {self.url}; spooling recording to disk.")
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".tmp") as temp_f:
+            temp_file_path = temp_f.name
+            with requests.get(self.url, stream=True, timeout=300) as r:
+                r.raise_for_status()
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE_BYTES):
+                    temp_f.write(chunk)
+                    if self.progress:
+                        self.progress("downloading", temp_f.tell(), None)
+        self.path = temp_file_path
+        self.size = os.path.getsize(temp_file_path)
+        self.spooled = True
+
+    @contextmanager
+    def open(self, stage: str = "uploading"):
+        """
+        Yields a fresh file-like stream over the whole recording. With a progress
+        callback, reads are reported under `stage`.
+        """
+        self._prepare()
+        if self.path:
+            with open(self.path, "rb") as f:
+                yield ProgressReader(f, self.size, self.progress, stage) if self.progress else f
+            return
+
+        with requests.get(self.url, stream=True, timeout=300, headers={"Accept-Encoding": "identity"}) as r:
+            r.raise_for_status()
+            reader = ResponseBodyReader(r, self.size)
+            yield ProgressReader(reader, self.size, self.progress, stage) if self.progress else reader
+
+    def cleanup(self):
+        """Deletes the spooled temp file, if one was created."""
+        if self.spooled and os.path.exists(self.path):
+            os.remove(self.path)
+            print(f"🧹 Cleaned up temporary file: {self.path}")
@@ -0,0 +1,24 @@
+# Shared Redis connection for caches, locks and cross-process state.
+# The Celery broker already requires Redis, so the API and the workers reuse it.
+
+import os
+import redis
+from dotenv import load_dotenv
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+_client = None
+
+
+def get_redis() -> redis.Redis | None:
+    """
+    Returns a process-wide Redis client, or None when REDIS_URL is not set.
+    Callers are expected to fall back to in-process behaviour when this is None.
+    """
+    global _client
+    if not REDIS_URL:
+        return None
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL, socket_timeout=5, health_check_interval=30)
+    return _client
@@ -0,0 +1,75 @@
+# Single-flight execution of expensive, idempotent builds (e.g. a meeting's embeddings).
+# Within a process, concurrent callers for the same key share one asyncio task. Across
+# processes and replicas, the task additionally holds a Redis lock (SET NX PX with a
+# random token, released only by its owner), and the build itself is expected to
+# re-check whether its work is already done once it holds the lock, and to be
+# idempotent: a build whose lock expired may overlap with the next holder's.
+
+import os
+import time
+import uuid
+import asyncio
+from typing import Awaitable, Callable, TypeVar
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+from modules.utility.metrics import metrics
+load_dotenv()
+
+T = TypeVar("T")
+
+# Must outlast the slowest build; a crashed holder's lock expires after this
+SINGLE_FLIGHT_LOCK_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_SECONDS", 120))
+SINGLE_FLIGHT_POLL_SECONDS = 0.2
+
+# Deletes the lock only if it still holds our token
+_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _lock_key(key: str) -> str:
+    return f"single_flight:{key}"
+
+
+async def _run_locked(key: str, build: Callable[[], Awaitable[T]], lock_ttl_seconds: int) -> T:
+    r = get_redis()
+    if r is None:
+        return await build()
+
+    token = uuid.uuid4().hex
+    # A holder's lock expires after the TTL, so waiting longer than that only happens
+    # when other holders keep taking over. Then build anyway; builds re-check their work.
+    deadline = time.monotonic() + 2 * lock_ttl_seconds
+    while not r.set(_lock_key(key), token, nx=True, px=lock_ttl_seconds * 1000):
+        if time.monotonic() > deadline:
+            print(f"⚠️ Lock for '{key}' not acquired after {2 * lock_ttl_seconds}s. Building without it.")
+            metrics.incr("single_flight_lock_timeouts_total")
+            return await build()
+        metrics.incr("single_flight_lock_waits_total")
+        await asyncio.sleep(SINGLE_FLIGHT_POLL_SECONDS)
+
+    try:
+        return await build()
+    finally:
+        r.eval(_RELEASE, 1, _lock_key(key), token)
+
+
+async def run(key: str, build: Callable[[], Awaitable[T]], lock_ttl_seconds: int = SINGLE_FLIGHT_LOCK_TTL_SECONDS) -> T:
+    """
+    Runs `build` once for all concurrent callers with the same `key` and returns its
+    result to each of them. A caller that is cancelled doesn't cancel the build for the others.
+    """
+    task = _inflight.get(key)
+    if task is not None:
+        metrics.incr("single_flight_joined_total")
+        return await asyncio.shield(task)
+
+    task = asyncio.ensure_future(_run_locked(key, build, lock_ttl_seconds))
+    _inflight[key] = task
+    task.add_done_callback(lambda done: _inflight.pop(key, None) if _inflight.get(key) is done else None)
+    return await asyncio.shield(task)
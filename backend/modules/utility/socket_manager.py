@@ -3,6 +3,8 @@
 import socketio
 from supabase import create_client, Client
 import os
+from modules.utility.progress import latest_progress
+from modules.utility.auth import resolve_user
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -11,15 +13,19 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+# Room membership and emits go through Redis pub/sub, so an event emitted by any API
+# replica or Celery worker reaches the replica that holds the user's connection.
+# Without REDIS_URL the server stays single-process.
+REDIS_URL = os.getenv("REDIS_URL")
+SOCKETIO_CHANNEL = os.getenv("SOCKETIO_CHANNEL", "socketio")
+client_manager = socketio.AsyncRedisManager(REDIS_URL, channel=SOCKETIO_CHANNEL) if REDIS_URL else None
+
 # Create an async Socket.IO server instance
-sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', client_manager=client_manager)
 
 # Wrap it in an ASGI application
 socket_app = socketio.ASGIApp(sio)
 
-# Dictionary to map session IDs (sid) to user IDs
-sid_to_user = {}
-
 @sio.event
 async def connect(sid, environ, auth):
     """
@@ -31,18 +37,14 @@ async def connect(sid, environ, auth):
 
     token = auth['token']
     try:
-        # Validate the JWT using Supabase
-        user_response = supabase.auth.get_user(token)
-        user = user_response.user
-        if not user:
-            raise Exception("Invalid token")
+        # Validate the JWT locally (falls back to Supabase when it can't)
+        user_id, _ = await resolve_user(supabase, token)
 
         # Authentication successful
-        user_id = str(user.id)
         print(f"Socket connection successful for user {user_id} with sid {sid}")
         
-        # Store the user's ID and join them to a private room
-        sid_to_user[sid] = user_id
+        # Store the user's ID in the connection's session and join them to a private room
+        await sio.save_session(sid, {'user_id': user_id})
         await sio.enter_room(sid, user_id)
         
         # You can emit a confirmation event back to the client
@@ -57,8 +59,21 @@ async def disconnect(sid):
     """
     Handles a client disconnection.
     """
-    if sid in sid_to_user:
-        user_id = sid_to_user[sid]
-        print(f"User {user_id} disconnected with sid {sid}")
-        # Clean up the mapping
-        del sid_to_user[sid]
\ No newline at end of file
+    # The session (and room membership) is dropped by the server with the connection
+    session = await sio.get_session(sid)
+    if session.get('user_id'):
+        print(f"User {session['user_id']} disconnected with sid {sid}")
+
+
+@sio.event
+async def get_progress(sid, data):
+    """
+    Returns (as the acknowledgement) the latest 'meeting_progress' event for
+    data['meetingId'], so a socket that joins mid-job can catch up.
+    """
+    session = await sio.get_session(sid)
+    meeting_id = (data or {}).get('meetingId')
+    progress = latest_progress(meeting_id) if meeting_id else None
+    if not progress or progress.get('userId') != session.get('user_id'):
+        return None
+    return {k: v for k, v in progress.items() if k != 'userId'}
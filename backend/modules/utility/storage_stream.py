@@ -0,0 +1,97 @@
+# Streaming ingest helpers for recordings.
+# Reads an UploadFile in bounded chunks and forwards them to Supabase Storage as they
+# arrive, so an upload never has to sit fully in the API process' memory.
+
+import os
+import hashlib
+import httpx
+from fastapi import UploadFile
+from dotenv import load_dotenv
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# Peak memory per upload is bounded by this value, whatever the file size.
+UPLOAD_CHUNK_SIZE_BYTES = int(os.getenv("UPLOAD_CHUNK_SIZE_BYTES", 1024 * 1024))
+STORAGE_UPLOAD_TIMEOUT_SECONDS = float(os.getenv("STORAGE_UPLOAD_TIMEOUT_SECONDS", 600))
+
+
+class UploadRejectedException(Exception):
+    """Raised while streaming when the upload violates a size or type constraint."""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def sniff_media_type(head: bytes) -> str | None:
+    """
+    Looks at the first bytes of a file and returns a coarse media family
+    ('audio' or 'video') if the container is one we accept, otherwise None.
+    """
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0):
+        return "audio"  # MP3 (with or without an ID3 tag)
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio"
+    if head[4:8] == b"ftyp":
+        return "video"  # MP4 / M4A / QuickTime all use the ISO BMFF 'ftyp' box
+    if head[4:8] in (b"moov", b"mdat", b"wide", b"free"):
+        return "video"  # Older QuickTime files without an 'ftyp' box
+    return None
+
+
+class UploadStream:
+    """
+    Async iterator over an UploadFile that yields fixed-size chunks and enforces
+    the size limit and container type while the bytes flow through.
+    A SHA-256 of the content is computed on the fly and exposed as `content_hash`.
+    """
+    def __init__(self, recording: UploadFile, max_bytes: int, chunk_size: int = UPLOAD_CHUNK_SIZE_BYTES):
+        self.recording = recording
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.bytes_received = 0
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def content_hash(self) -> str:
+        return self._sha256.hexdigest()
+
+    async def __aiter__(self):
+        while True:
+            chunk = await self.recording.read(self.chunk_size)
+            if not chunk:
+                break
+
+            if self.bytes_received == 0 and sniff_media_type(chunk[:16]) is None:
+                raise UploadRejectedException(415, "File content is not a supported audio or video format.")
+
+            self.bytes_received += len(chunk)
+            if self.bytes_received > self.max_bytes:
+                raise UploadRejectedException(413, f"File exceeds the maximum allowed size of {self.max_bytes // (1024 * 1024)} MB.")
+
+            self._sha256.update(chunk)
+            yield chunk
+
+        if self.bytes_received == 0:
+            raise UploadRejectedException(400, "Uploaded file is empty.")
+
+
+async def stream_to_storage(bucket: str, path: str, chunks, content_type: str):
+    """
+    Uploads an async iterable of byte chunks to Supabase Storage using a chunked
+    request body, so only one chunk is held in memory at a time.
+    Any exception raised by the iterator (e.g. UploadRejectedException) aborts the request.
+    """
+    url = f"{SUPABASE_URL}/storage/v1/object/{bucket}/{path}"
+    headers = {
+        "Authorization": f"Bearer {SUPABASE_KEY}",
+        "apikey": SUPABASE_KEY,
+        "Content-Type": content_type,
+        "x-upsert": "false",
+    }
+
+    async with httpx.AsyncClient(timeout=STORAGE_UPLOAD_TIMEOUT_SECONDS) as client:
+        response = await client.post(url, content=chunks, headers=headers)
+        response.raise_for_status()
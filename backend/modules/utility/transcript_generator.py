@@ -4,12 +4,24 @@ from supabase import Client
 # Import your updated FileUploader class
 from modules.utility.utility import check_file_status
 import os
-from modules.prompt.tool_prompt import dirization_prompt
-from modules.prompt.tools import dirization_tool
+from modules.prompt.tool_prompt import dirization_prompt, segment_transcript_prompt, summary_prompt
+from modules.prompt.tools import dirization_tool, segment_transcript_tool, summary_tool
+from modules.utility.utility import timestamp_to_seconds, seconds_to_timestamp
+from modules.utility import audio_segmenter
+from modules.utility.redis_client import get_redis
+from modules.utility.key_pool import key_pool, key_fingerprint
+from modules.utility.rate_limiter import rate_limiter, estimate_tokens, estimate_audio_tokens
+import google.api_core.exceptions
 import requests
 from dotenv import load_dotenv  
-from modules.utility.upload_file_to_gemini import FileUploader
+from modules.utility.upload_file_to_gemini import FileUploader, ApiKeyException, ModelOverloadedException
+from modules.utility.recording_source import RecordingSource
+from modules.utility import gemini_file_cache
+from modules.utility.progress import ProgressReporter
+from modules.utility.transcript_index import build_index
 import json
+import asyncio
+import tempfile
 from pathlib import Path
 import time
 load_dotenv()
@@ -22,86 +34,127 @@ load_dotenv()
 GEMINI_FILE_UPLOAD_API_URL = "https://generativelanguage.googleapis.com/upload/v1beta/files" # Note: No /upload/ prefix
 MODEL_NAME = os.getenv("MODEL_NAME", "gemini-1.5-flash")
 api_endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_NAME}:generateContent"
+# Finished segment transcripts are kept this long so a retried job only redoes failed segments
+SEGMENT_RESULT_TTL_SECONDS = 48 * 60 * 60
 
 
-async def analyze_audio_with_gemini_tools(
-    supabase: Client,
-    meeting_id: str,
-    audio_content: bytes,
-    content_type: str,
-    api_key: str
-):
+def start_upload(meeting_id: str, audio_source: RecordingSource, content_type: str, api_key: str, cache_id: str | None = None) -> tuple[str, str]:
     """
-    Analyzes audio content using your FileUploader class.
+    Streams the recording to the Gemini File API and caches the new file.
+    Does not wait for the file to become ACTIVE.
     """
-
-    # try:
-
-    # --- Step 1: Upload the file using your class ---
     uploader = FileUploader(GEMINI_FILE_UPLOAD_API_URL, api_key)
     
-    file_uri, mime_type = uploader.upload_raw_bytes(
-        file_content=audio_content,
-        mime_type=content_type,
-        display_name=f"meeting_recording_{meeting_id}"
-    )
+    # The recording is streamed straight from its source into the upload request
+    with audio_source.open() as audio_stream:
+        file_uri, mime_type = uploader.upload_stream(
+            stream=audio_stream,
+            mime_type=content_type,
+            display_name=f"meeting_recording_{meeting_id}"
+        )
     
     print(f"File uploaded: {file_uri} (MIME type: {mime_type})")
     
     if not file_uri:
         raise Exception("File upload failed using FileUploader.")
 
+    gemini_file_cache.store(
+        cache_id, file_uri, mime_type, api_key,
+        state=uploader.last_file.get("state", "PROCESSING"),
+        expires_at=gemini_file_cache.parse_expiration(uploader.last_file.get("expirationTime")),
+    )
+    return file_uri, mime_type
+
+
+def upload_recording(meeting_id: str, audio_source: RecordingSource, content_type: str, api_key: str, cache_id: str | None = None) -> tuple[str, str]:
+    """
+    Returns an ACTIVE Gemini file for the recording. Reuses a cached upload made with
+    the same key when one is still valid; otherwise streams the recording up, caches
+    the new file and waits for it to become active.
+    """
+    cached = gemini_file_cache.get_for_key(cache_id, api_key)
+    if cached:
+        print(f"♻️ Reusing Gemini file {cached['file_uri']} for meeting {meeting_id}")
+        if cached.get("state") == "ACTIVE" or check_file_status(cached["file_uri"], api_key):
+            gemini_file_cache.mark_active(cache_id)
+            return cached["file_uri"], cached["mime_type"]
+        gemini_file_cache.invalidate(cache_id)
+
+    # --- Step 1: Upload the file using your class ---
+    file_uri, mime_type = start_upload(meeting_id, audio_source, content_type, api_key, cache_id)
+
     # --- Step 2: Wait for the file to be active ---
     if not check_file_status(file_uri, api_key):
+        gemini_file_cache.invalidate(cache_id)
         raise Exception("File did not become active for processing.")
-        
-    # --- Step 3: Call Gemini's generateContent API ---
+    gemini_file_cache.mark_active(cache_id)
+
+    return file_uri, mime_type
+
+
+def estimate_payload_tokens(gemini_payload: dict, audio_seconds: float | None = None) -> int:
+    """Rough input size of a generateContent payload, for the rate limiter."""
+    tokens = 0
+    for content in gemini_payload.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                tokens += estimate_tokens(part["text"])
+            elif "fileData" in part:
+                tokens += estimate_audio_tokens(audio_seconds)
+    return tokens
+
+
+def post_generate_content(gemini_payload: dict, api_key: str, audio_seconds: float | None = None) -> requests.Response:
+    """
+    Posts a generateContent request. Waits for room in the key's RPM/TPM budget first
+    (RateLimitExceeded if that takes too long). A 503 raises ModelOverloadedException
+    right away, so the Celery task can reschedule itself instead of holding the worker slot.
+    """
+    rate_limiter.wait_for_capacity(key_fingerprint(api_key), MODEL_NAME, estimate_payload_tokens(gemini_payload, audio_seconds))
+
+    header = {
+        "x-goog-api-key": api_key,
+        "Content-Type": "application/json"
+    }
+    try:
+        response = requests.post(api_endpoint, headers=header, json=gemini_payload)
+        response.raise_for_status()  # Raise an error for HTTP errors
+
+        # If we get here, the request was successful (status 2xx)
+        print("✅ Gemini analysis request successful.")
+        return response
+
+    except requests.exceptions.HTTPError as e:
+        if e.response.status_code == 503:
+            print("🚦 Model is overloaded (503). Handing back to the task layer for a delayed retry.")
+            raise ModelOverloadedException(e.response.text) from e
+        # For any other HTTP error (like 400, 401), re-raise the exception
+        # so the Celery worker can handle it (e.g., by trying the next key).
+        print(f"🔴 A non-retriable HTTP error occurred: {e.response.status_code}")
+        raise e
+    except requests.exceptions.RequestException as e:
+         print(f"🔴 A network-related error occurred: {e}")
+         raise e
 
+
+def request_analysis(file_uri: str, mime_type: str, api_key: str, prompt: str = dirization_prompt, tool: dict = dirization_tool, audio_seconds: float | None = None) -> requests.Response:
+    """Calls Gemini's generateContent with a function-calling tool for an uploaded file."""
     gemini_payload = {
         "contents": [{
             "role": "user",
             "parts": [
                 {"fileData": {"fileUri": file_uri, "mimeType": mime_type}},
-                {"text": dirization_prompt}
+                {"text": prompt}
             ]
         }],
-        "tools": [{"function_declarations": [dirization_tool]}],
+        "tools": [{"function_declarations": [tool]}],
         "tool_config": {"function_calling_config": {"mode": "ANY"}}
     }
+    return post_generate_content(gemini_payload, api_key, audio_seconds)
 
 
-    header = {
-        "x-goog-api-key": api_key,
-        "Content-Type": "application/json"
-    }
-    while True:
-        try:
-            response = requests.post(api_endpoint, headers=header, json=gemini_payload)
-            response.raise_for_status()  # Raise an error for HTTP errors
-
-            # --- Step 4: Parse the response and save to database ---
-
-
-            # If we get here, the request was successful (status 2xx)
-            print("✅ Gemini analysis request successful.")
-            break # Exit the loop
-
-        except requests.exceptions.HTTPError as e:
-            # --- THIS IS THE NEW LOGIC ---
-            if e.response.status_code == 503:
-                print("🚦 Model is overloaded (503). Waiting for 60 seconds before retrying...")
-                time.sleep(60)
-                continue # Retry the request
-            else:
-                # For any other HTTP error (like 400, 401), re-raise the exception
-                # so the Celery worker can handle it (e.g., by trying the next key).
-                print(f"🔴 A non-retriable HTTP error occurred: {e.response.status_code}")
-                raise e
-        except requests.exceptions.RequestException as e:
-             print(f"🔴 A network-related error occurred: {e}")
-             raise e
-        
-
+def extract_function_args(response: requests.Response) -> dict:
+    """Pulls the function-call arguments out of a generateContent response."""
     response_dict = response.json()
 
     if "candidates" not in response_dict or not response_dict["candidates"]:
@@ -127,33 +180,196 @@ async def analyze_audio_with_gemini_tools(
         print("Full API Response:", json.dumps(response_dict, indent=2))
         raise ValueError("Gemini response did not contain a function call.")
 
-    function_args = function_call["args"]
+    return function_call["args"]
 
+
+def save_analysis(supabase: Client, meeting_id: str, function_args: dict):
+    """
+    Stores the analysis in `meeting_details` and marks the meeting as completed.
+    The transcript is saved in time order together with its index of offsets in seconds.
+    Safe to repeat: a retried persist stage overwrites the row it already wrote.
+    """
+    transcript, transcript_index = build_index(function_args.get("transcript"))
     meeting_details_data = {
         "id": meeting_id,
-        "transcript": function_args.get("transcript"),
+        "transcript": transcript,
+        "transcript_index": transcript_index,
+        "transcript_count": len(transcript),
         "summary": function_args.get("summary"),
         "key_highlights": function_args.get("keyHighlights"),
         "actionable_items": function_args.get("actionItems")
     }
 
-    # print(meeting_details_data)
-
-    supabase.table("meeting_details").insert(meeting_details_data).execute()
+    supabase.table("meeting_details").upsert(meeting_details_data, on_conflict="id").execute()
     
-    # # --- Step 5: Update the original meeting's status ---
+    # --- Update the original meeting's status ---
     supabase.table("meetings").update({"status": "completed"}).eq("id", meeting_id).execute()
     print(f"✅ Successfully analyzed and saved details for meeting {meeting_id}")
-    # except Exception as e:
-    # #     print(f"Error during background analysis for meeting {meeting_id}: {e}")
-    # #     supabase.table("meetings").update({"status": "failed"}).eq("id", meeting_id).execute()
-
-
-    # except requests.exceptions.HTTPError as http_err:
-    #     # This will catch HTTP errors (like 400, 500) and print the response body.
-    #     print(f"🔴 HTTP Error during Gemini analysis: {http_err}")
-    #     print("Error Response:", http_err.response.text)
-    #     raise # Re-raise the exception to be caught by the Celery worker
-    # except Exception as e:
-    #     print(f"🔴 An unexpected error occurred during analysis: {e}")
-    #     raise
\ No newline at end of file
+
+
+# ========================================================================
+# SEGMENTED ANALYSIS FOR LONG RECORDINGS
+# ========================================================================
+
+class SegmentAnalysisError(Exception):
+    """Raised when one or more segments could not be analyzed with any key."""
+    def __init__(self, failed_segments: list[int], last_error: Exception | None):
+        super().__init__(f"Segments {failed_segments} failed. Last error: {last_error}")
+        self.failed_segments = failed_segments
+        self.last_error = last_error
+
+
+def _segment_result_key(cache_id: str, segment: audio_segmenter.Segment) -> str:
+    return f"segment_result:{cache_id}:{segment.start:.0f}-{segment.end:.0f}"
+
+
+def analyze_segment(meeting_id: str, recording_url: str, segment: audio_segmenter.Segment, cache_id: str) -> list[dict]:
+    """
+    Transcribes one window of the recording, trying keys from the shared pool in turn.
+    The result is cached in Redis so a retry of the whole job only redoes the segments
+    that failed.
+    """
+    r = get_redis()
+    result_key = _segment_result_key(cache_id, segment)
+    if r is not None:
+        cached = r.get(result_key)
+        if cached:
+            print(f"♻️ Reusing transcript of segment {segment.index} for meeting {meeting_id}")
+            return json.loads(cached)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        segment_path = audio_segmenter.extract_segment(recording_url, segment, os.path.join(temp_dir, f"segment_{segment.index}.mp3"))
+        segment_source = RecordingSource(path=segment_path)
+
+        last_error = None
+        # The pool hands out the least loaded keys with rate-limit headroom first,
+        # so parallel segments spread across it
+        for key in key_pool.candidates(model=MODEL_NAME, tokens=estimate_audio_tokens(segment.end - segment.start)):
+            try:
+                print(f"🎬 Segment {segment.index} ({segment.start:.0f}s-{segment.end:.0f}s) of meeting {meeting_id} with Key:{key[-4:]}")
+                with key_pool.lease(key):
+                    file_uri, mime_type = upload_recording(
+                        f"{meeting_id}_segment_{segment.index}", segment_source, "audio/mpeg", key,
+                        cache_id=f"{cache_id}:segment:{segment.index}"
+                    )
+                    response = request_analysis(file_uri, mime_type, key, prompt=segment_transcript_prompt, tool=segment_transcript_tool,
+                                                audio_seconds=segment.end - segment.start)
+                transcript = extract_function_args(response).get("transcript") or []
+                break
+            except (google.api_core.exceptions.PermissionDenied,
+                    google.api_core.exceptions.ResourceExhausted,
+                    ApiKeyException,
+                    requests.exceptions.HTTPError,
+                    ValueError) as e:
+                print(f"Segment {segment.index} failed with Key:{key[-4:]}. Reason: {type(e).__name__}")
+                last_error = e
+        else:
+            raise last_error or Exception(f"No API keys available for segment {segment.index}.")
+
+    if r is not None:
+        r.set(result_key, json.dumps(transcript), ex=SEGMENT_RESULT_TTL_SECONDS)
+    return transcript
+
+
+def merge_segment_transcripts(segments: list[audio_segmenter.Segment], transcripts: list[list[dict]], overlap: float) -> list[dict]:
+    """
+    Stitches per-segment transcripts into one. Segment-relative timestamps are shifted
+    by the segment start, and each overlap is split at its midpoint: entries before
+    the midpoint come from the earlier segment, entries after it from the later one.
+    Identical consecutive lines straddling the cut are dropped.
+    """
+    merged = []
+    for position, (segment, transcript) in enumerate(zip(segments, transcripts)):
+        lower = segment.start + overlap / 2 if position > 0 else 0
+        upper = segment.end - overlap / 2 if position < len(segments) - 1 else float("inf")
+
+        for entry in transcript:
+            absolute = segment.start + timestamp_to_seconds(entry.get("timestamp"))
+            if not (lower <= absolute < upper):
+                continue
+
+            text = (entry.get("text") or "").strip()
+            speaker = entry.get("speaker") or "Unknown"
+            if merged and merged[-1]["speaker"] == speaker and " ".join(merged[-1]["text"].lower().split()) == " ".join(text.lower().split()):
+                continue
+
+            merged.append({"speaker": speaker, "timestamp": seconds_to_timestamp(absolute), "text": text})
+
+    merged.sort(key=lambda entry: timestamp_to_seconds(entry["timestamp"]))
+    return merged
+
+
+def summarize_transcript(transcript: list[dict]) -> dict:
+    """Runs the final text-only pass that produces the summary, highlights and action items."""
+    transcript_text = "\n".join(f"[{e['timestamp']}] {e['speaker']}: {e['text']}" for e in transcript)
+    gemini_payload = {
+        "contents": [{"role": "user", "parts": [{"text": summary_prompt + transcript_text}]}],
+        "tools": [{"function_declarations": [summary_tool]}],
+        "tool_config": {"function_calling_config": {"mode": "ANY"}}
+    }
+
+    last_error = None
+    for key in key_pool.candidates(model=MODEL_NAME, tokens=estimate_payload_tokens(gemini_payload)):
+        try:
+            with key_pool.lease(key):
+                response = post_generate_content(gemini_payload, key)
+            return extract_function_args(response)
+        except (requests.exceptions.HTTPError, google.api_core.exceptions.ResourceExhausted, ValueError) as e:
+            print(f"Summary pass failed with Key:{key[-4:]}. Reason: {type(e).__name__}")
+            last_error = e
+    raise Exception(f"All Gemini API keys failed for the summary pass. Last error: {last_error}")
+
+
+async def analyze_audio_in_segments(
+    meeting_id: str,
+    recording_url: str,
+    duration: float,
+    cache_id: str | None = None,
+    progress: ProgressReporter | None = None
+):
+    """
+    Analyzes a long recording as overlapping windows in parallel across the key pool,
+    stitches the transcripts and runs a text-only pass for the meeting-level fields.
+    Wall-clock time scales with the segment length rather than the meeting length.
+    Returns the same fields as the `dirization_tool` function call; saving is left to the caller.
+    """
+    cache_id = cache_id or meeting_id
+    segments = audio_segmenter.plan_segments(duration)
+    print(f"✂️ Analyzing meeting {meeting_id} ({duration:.0f}s) in {len(segments)} segments")
+
+    semaphore = asyncio.Semaphore(audio_segmenter.SEGMENT_MAX_PARALLEL)
+    finished = 0
+
+    async def run(segment):
+        nonlocal finished
+        async with semaphore:
+            try:
+                return await asyncio.to_thread(analyze_segment, meeting_id, recording_url, segment, cache_id)
+            finally:
+                finished += 1
+                if progress:
+                    progress.update("analyzing", finished * 100 / len(segments), force=True,
+                                    segmentsDone=finished, segmentCount=len(segments))
+
+    if progress:
+        progress.update("analyzing", 0, force=True, segmentsDone=0, segmentCount=len(segments))
+
+    results = await asyncio.gather(*(run(segment) for segment in segments), return_exceptions=True)
+
+    # An overload is model-wide, so surface it as such and let the task reschedule;
+    # the segments that did finish are already cached for the next attempt.
+    overloaded = [result for result in results if isinstance(result, ModelOverloadedException)]
+    if overloaded:
+        raise overloaded[0]
+
+    failed = [segment.index for segment, result in zip(segments, results) if isinstance(result, Exception)]
+    if failed:
+        last_error = next(result for result in results if isinstance(result, Exception))
+        raise SegmentAnalysisError(failed, last_error)
+
+    transcript = merge_segment_transcripts(segments, results, audio_segmenter.SEGMENT_OVERLAP_SECONDS)
+    if progress:
+        progress.update("summarizing", force=True)
+    summary_args = summarize_transcript(transcript)
+
+    return {**summary_args, "transcript": transcript}
@@ -0,0 +1,90 @@
+# Time index for meeting transcripts.
+# When an analysis is saved, the transcript is ordered by time and the offset of every
+# segment is stored in seconds next to it (meeting_details.transcript_index). Serving
+# a page or an HH:MM:SS window is then a binary search over that index instead of
+# parsing timestamps across the whole transcript. Loaded transcripts are kept in a
+# small in-process cache keyed by the meeting's row version, so paging through a
+# long meeting reads it from the database once. The detail view only needs the first
+# page, which is sliced in the database (meeting_transcript_slice) unless the whole
+# transcript is cached already.
+
+import os
+import re
+import bisect
+import threading
+from cachetools import LRUCache
+from supabase import Client
+from modules.utility.utility import timestamp_to_seconds
+from modules.utility import db
+
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", 64))
+
+_TIMESTAMP_PATTERN = re.compile(r"^\d{1,2}(:\d{1,2}){0,2}$")
+
+
+def build_index(transcript: list[dict] | None) -> tuple[list[dict], list[int]]:
+    """Returns the transcript sorted by time (stable) and the matching list of offsets in seconds."""
+    entries = sorted(
+        ((timestamp_to_seconds(entry.get("timestamp")), entry) for entry in transcript or []),
+        key=lambda pair: pair[0],
+    )
+    return [entry for _, entry in entries], [seconds for seconds, _ in entries]
+
+
+def parse_bound(value: str | None) -> int | None:
+    """Parses an HH:MM:SS (or MM:SS, SS) window bound. Raises ValueError for anything else."""
+    if value is None or value == "":
+        return None
+    if not _TIMESTAMP_PATTERN.match(value.strip()):
+        raise ValueError(f"Invalid timestamp '{value}', expected HH:MM:SS.")
+    return timestamp_to_seconds(value)
+
+
+def window(index: list[int], start: int | None, end: int | None) -> tuple[int, int]:
+    """Positions [lo, hi) of the segments starting within [start, end] seconds."""
+    lo = bisect.bisect_left(index, start) if start is not None else 0
+    hi = bisect.bisect_right(index, end) if end is not None else len(index)
+    return lo, max(lo, hi)
+
+
+# --- Loaded transcripts ---
+
+_cache = LRUCache(maxsize=TRANSCRIPT_CACHE_MAX_ENTRIES)
+_cache_lock = threading.Lock()
+
+
+async def load_transcript(supabase: Client, meeting_id: str, version: str | None) -> tuple[list[dict], list[int]]:
+    """
+    Returns (transcript, index) for a meeting. `version` is the meeting's updated_at,
+    so a cached copy is never served after the details changed. Rows saved before the
+    index existed are indexed on read.
+    """
+    cache_key = (meeting_id, version)
+    with _cache_lock:
+        cached = _cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    response = await db.execute(supabase.table("meeting_details").select("transcript, transcript_index").eq("id", meeting_id))
+    row = response.data[0] if response.data else {}
+    transcript = row.get("transcript") or []
+    index = row.get("transcript_index")
+    if index is None or len(index) != len(transcript):
+        transcript, index = build_index(transcript)
+
+    with _cache_lock:
+        _cache[cache_key] = (transcript, index)
+    return transcript, index
+
+
+async def load_transcript_head(supabase: Client, meeting_id: str, version: str | None, limit: int) -> list[dict]:
+    """Returns the first `limit` segments without loading the whole transcript."""
+    with _cache_lock:
+        cached = _cache.get((meeting_id, version))
+    if cached is not None:
+        return cached[0][:limit]
+
+    response = await db.execute(supabase.rpc("meeting_transcript_slice", {
+        "p_meeting_id": meeting_id, "p_offset": 0, "p_limit": limit,
+    }))
+    return response.data or []
@@ -10,6 +10,11 @@ class ApiKeyException(Exception):
     pass
 
 
+class ModelOverloadedException(Exception):
+    """Raised when Gemini answers 503; the task layer reschedules instead of sleeping."""
+    pass
+
+
 class FileUploader:
     def __init__(self, upload_url, api_key):
         """
@@ -17,12 +22,25 @@ class FileUploader:
         """
         self.upload_url = upload_url
         self.api_key = api_key
+        # Full file resource (state, expirationTime, ...) of the most recent successful upload
+        self.last_file = {}
 
     def upload_raw_bytes(self, file_content: bytes, mime_type: str, display_name: str) -> tuple[str | None, str | None]:
         """
         Uploads raw file content (bytes) directly to the Gemini File API.
         This is the correct method for this specific API endpoint.
         """
+        return self._upload(file_content, mime_type, display_name)
+
+    def upload_stream(self, stream, mime_type: str, display_name: str) -> tuple[str | None, str | None]:
+        """
+        Uploads from a file-like object (anything with `read()` and a known length,
+        e.g. an open file or a ResponseBodyReader). The body is sent block by block,
+        so memory use stays flat regardless of the file size.
+        """
+        return self._upload(stream, mime_type, display_name)
+
+    def _upload(self, data, mime_type: str, display_name: str) -> tuple[str | None, str | None]:
         # --- 1. Set up the required headers ---
         # The API uses headers to get metadata, not form fields.
         headers = {
@@ -38,23 +56,19 @@ class FileUploader:
         try:
             print(f"Uploading '{display_name}' to Gemini API using raw byte transfer...")
             
-            # --------------------- THE FIX IS HERE ---------------------
-            # REMOVED: The 'files' dictionary and 'files=' parameter.
-            # ADDED: The 'headers=' and 'data=' parameters.
-            
             response = requests.post(
                 full_url,
                 headers=headers,
-                data=file_content, # This sends the raw binary content.
+                data=data, # Raw bytes or a file-like object streamed by requests.
                 timeout=600
             )
-            # ---------------------------------------------------------
             
             response.raise_for_status()  # Raise an error for bad responses (4xx or 5xx)
 
             # --- 4. Parse the JSON response ---
             upload_data = response.json()
             
+            self.last_file = upload_data.get('file', {})
             file_uri = upload_data.get('file', {}).get('uri')
             response_mime_type = upload_data.get('file', {}).get('mimeType')
 
@@ -66,8 +80,6 @@ class FileUploader:
             return file_uri, response_mime_type
 
         except requests.exceptions.HTTPError as e:
-            # print(f"HTTP Error during file upload: {e.response.status_code} - {e.response.text}")
-            # return None, None
             try:
                 error_details = e.response.json()
                 reason = error_details.get("error", {}).get("details", [{}])[0].get("reason")
@@ -81,7 +93,6 @@ class FileUploader:
             # For all other HTTP errors, log and return None
             print(f"HTTP Error during file upload: {e.response.status_code} - {e.response.text}")
             return None, None
-            # --- END MODIFICATION ---
         except requests.exceptions.RequestException as e:
             print(f"An error occurred during file upload: {e}")
             return None, None
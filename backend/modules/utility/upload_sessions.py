@@ -0,0 +1,299 @@
+# Resumable upload sessions for large recordings.
+# Each session is a directory under TEMP_DIR holding a session.json with the metadata
+# and one file per received chunk. Chunk files are written to a unique temp name and
+# atomically renamed into place, so out-of-order and parallel PUTs never clash and a
+# retried PUT of the same chunk simply replaces the previous copy. Completing a session
+# first renames its directory to `<upload_id>.completing`; only one caller can win that
+# rename, so concurrent /complete calls can't store and process the recording twice.
+#
+# Sessions are staged on the local disk of the API replica that created them. With
+# several replicas, every request of a session must reach that replica (sticky routing
+# on the upload id) or TEMP_DIR must be a volume shared by all replicas. The owning
+# replica is recorded in Redis, and a request that lands elsewhere gets a 421 naming it.
+
+import os
+import json
+import uuid
+import time
+import shutil
+import asyncio
+import socket
+import pathlib
+import redis
+from dotenv import load_dotenv
+from modules.utility.redis_client import get_redis
+load_dotenv()
+
+UPLOAD_SESSION_CHUNK_SIZE_BYTES = int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE_BYTES", 8 * 1024 * 1024))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", 24))
+# Identifies this API replica in the session owner records
+UPLOAD_SESSION_REPLICA_ID = os.getenv("UPLOAD_SESSION_REPLICA_ID") or socket.gethostname()
+
+_COMPLETING_SUFFIX = ".completing"
+
+
+class UploadSessionError(Exception):
+    """Raised for invalid session operations; carries the HTTP status to return."""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class UploadSessionStore:
+    def __init__(self, base_dir: pathlib.Path):
+        """
+        Initializes the store. Sessions live in `<base_dir>/sessions/<upload_id>/`.
+        """
+        self.base_dir = pathlib.Path(base_dir) / "sessions"
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+
+    # --- Session lifecycle ---
+
+    def create(self, user_id: str, meeting_id: str, file_name: str, content_type: str,
+               total_size: int, chunk_size: int = UPLOAD_SESSION_CHUNK_SIZE_BYTES,
+               extra: dict | None = None) -> dict:
+        """Creates a new session directory and returns its metadata."""
+        self.cleanup_expired()
+
+        upload_id = uuid.uuid4().hex
+        session = {
+            "upload_id": upload_id,
+            "user_id": user_id,
+            "meeting_id": meeting_id,
+            "file_name": file_name,
+            "content_type": content_type,
+            "total_size": total_size,
+            "chunk_size": chunk_size,
+            "total_chunks": max(1, -(-total_size // chunk_size)),
+            "created_at": time.time(),
+            "replica": UPLOAD_SESSION_REPLICA_ID,
+            **(extra or {}),
+        }
+
+        session_dir = self.base_dir / upload_id
+        session_dir.mkdir()
+        with open(session_dir / "session.json", "w") as f:
+            json.dump(session, f)
+        self._record_owner(upload_id)
+        return session
+
+    def get(self, upload_id: str, user_id: str) -> dict:
+        """Loads a session, making sure it exists and belongs to the user."""
+        return self._load(self._session_dir(upload_id), upload_id, user_id)
+
+    def claim_for_completion(self, upload_id: str, user_id: str) -> dict:
+        """
+        Takes a session out of the uploadable state so exactly one caller finalizes it.
+        Raises 409 while another call is already completing it. Pair with
+        `release_completion` (to allow a retry) or `delete`.
+        """
+        session_dir = self._session_dir(upload_id)
+        claimed_dir = self._claimed_dir(upload_id)
+        try:
+            os.rename(session_dir, claimed_dir)
+        except FileNotFoundError:
+            if claimed_dir.exists():
+                raise UploadSessionError(409, "Upload is already being finalized.")
+            self._load(session_dir, upload_id, user_id)  # raises the right 404 or 421
+            raise UploadSessionError(404, "Upload session not found or expired.")
+        os.utime(claimed_dir)
+
+        try:
+            session = self._load(claimed_dir, upload_id, user_id)
+        except UploadSessionError:
+            self.release_completion(upload_id)
+            raise
+        return {**session, "completing": True}
+
+    def release_completion(self, upload_id: str):
+        """Makes a claimed session uploadable again, e.g. after a failed finalize."""
+        try:
+            os.rename(self._claimed_dir(upload_id), self._session_dir(upload_id))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, upload_id: str):
+        """Removes a session and all of its staged chunks."""
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+        shutil.rmtree(self._claimed_dir(upload_id), ignore_errors=True)
+        r = get_redis()
+        if r is not None:
+            try:
+                r.delete(self._owner_key(upload_id))
+            except redis.exceptions.RedisError as e:
+                print(f"⚠️ Could not remove owner record of upload session {upload_id}: {e}")
+
+    def cleanup_expired(self):
+        """Deletes sessions older than UPLOAD_SESSION_TTL_HOURS."""
+        cutoff = time.time() - UPLOAD_SESSION_TTL_HOURS * 3600
+        for session_dir in self.base_dir.iterdir():
+            try:
+                if session_dir.stat().st_mtime < cutoff:
+                    print(f"🧹 Removing expired upload session: {session_dir.name}")
+                    shutil.rmtree(session_dir, ignore_errors=True)
+            except FileNotFoundError:
+                continue
+
+    # --- Chunks ---
+
+    def expected_chunk_size(self, session: dict, index: int) -> int:
+        """Every chunk is `chunk_size` bytes except the last, which holds the remainder."""
+        if index < 0 or index >= session["total_chunks"]:
+            raise UploadSessionError(400, f"Chunk index {index} is out of range (0-{session['total_chunks'] - 1}).")
+        if index < session["total_chunks"] - 1:
+            return session["chunk_size"]
+        return session["total_size"] - session["chunk_size"] * (session["total_chunks"] - 1)
+
+    async def write_chunk(self, session: dict, index: int, body) -> int:
+        """
+        Streams a chunk body (an async iterator of bytes) to disk and atomically
+        moves it into place once its size has been verified.
+        """
+        expected = self.expected_chunk_size(session, index)
+        session_dir = self._session_dir(session["upload_id"])
+        temp_path = session_dir / f"{self._chunk_name(index)}.{uuid.uuid4().hex}.tmp"
+
+        written = 0
+        try:
+            with open(temp_path, "wb") as f:
+                async for part in body:
+                    written += len(part)
+                    if written > expected:
+                        raise UploadSessionError(400, f"Chunk {index} is larger than the expected {expected} bytes.")
+                    await asyncio.to_thread(f.write, part)
+
+            if written != expected:
+                raise UploadSessionError(400, f"Chunk {index} has {written} bytes, expected {expected}.")
+
+            os.replace(temp_path, session_dir / self._chunk_name(index))
+            # Touch the directory so active sessions don't get cleaned up as expired
+            os.utime(session_dir)
+            return written
+        except FileNotFoundError:
+            # The session directory was claimed by /complete (or removed) meanwhile
+            raise UploadSessionError(409, "Upload is being finalized; chunks can no longer be changed.")
+        finally:
+            if temp_path.exists():
+                temp_path.unlink()
+
+    def received_chunks(self, session: dict) -> list[int]:
+        """Returns the sorted indexes of all fully received chunks."""
+        session_dir = self._dir_of(session)
+        received = []
+        for path in session_dir.glob("chunk_*.part"):
+            received.append(int(path.stem.split("_")[1]))
+        return sorted(received)
+
+    def status(self, session: dict) -> dict:
+        """Summarizes progress, including the contiguous byte offset received so far."""
+        received = self.received_chunks(session)
+        received_set = set(received)
+        missing = [i for i in range(session["total_chunks"]) if i not in received_set]
+
+        first_missing = missing[0] if missing else session["total_chunks"]
+        received_offset = min(first_missing * session["chunk_size"], session["total_size"])
+
+        return {
+            "uploadId": session["upload_id"],
+            "meetingId": session["meeting_id"],
+            "chunkSize": session["chunk_size"],
+            "totalSize": session["total_size"],
+            "totalChunks": session["total_chunks"],
+            "receivedChunks": received,
+            "missingChunks": missing,
+            "receivedOffset": received_offset,
+            "complete": not missing,
+        }
+
+    def open_reader(self, session: dict) -> "SessionFileReader":
+        """Returns a reader that exposes the staged chunks as one sequential file."""
+        session_dir = self._dir_of(session)
+        paths = [session_dir / self._chunk_name(i) for i in range(session["total_chunks"])]
+        return SessionFileReader(paths)
+
+    # --- Internal helpers ---
+
+    def _load(self, session_dir: pathlib.Path, upload_id: str, user_id: str) -> dict:
+        session_file = session_dir / "session.json"
+        if not session_file.exists():
+            owner = self._owner(upload_id)
+            if owner and owner != UPLOAD_SESSION_REPLICA_ID:
+                raise UploadSessionError(421, f"Upload session is staged on replica '{owner}'; its requests must be routed there.")
+            raise UploadSessionError(404, "Upload session not found or expired.")
+
+        with open(session_file) as f:
+            session = json.load(f)
+        if session.get("user_id") != user_id:
+            raise UploadSessionError(404, "Upload session not found or expired.")
+        return session
+
+    def _session_dir(self, upload_id: str) -> pathlib.Path:
+        # upload_id is always a uuid hex; reject anything else to avoid path traversal
+        if not upload_id.isalnum():
+            raise UploadSessionError(404, "Upload session not found or expired.")
+        return self.base_dir / upload_id
+
+    def _claimed_dir(self, upload_id: str) -> pathlib.Path:
+        return self._session_dir(upload_id).with_name(upload_id + _COMPLETING_SUFFIX)
+
+    def _dir_of(self, session: dict) -> pathlib.Path:
+        if session.get("completing"):
+            return self._claimed_dir(session["upload_id"])
+        return self._session_dir(session["upload_id"])
+
+    @staticmethod
+    def _owner_key(upload_id: str) -> str:
+        return f"upload_session_owner:{upload_id}"
+
+    def _record_owner(self, upload_id: str):
+        r = get_redis()
+        if r is None:
+            return
+        try:
+            r.set(self._owner_key(upload_id), UPLOAD_SESSION_REPLICA_ID, ex=UPLOAD_SESSION_TTL_HOURS * 3600)
+        except redis.exceptions.RedisError as e:
+            print(f"⚠️ Could not record owner of upload session {upload_id}: {e}")
+
+    def _owner(self, upload_id: str) -> str | None:
+        r = get_redis()
+        if r is None:
+            return None
+        try:
+            owner = r.get(self._owner_key(upload_id))
+        except redis.exceptions.RedisError:
+            return None
+        return owner.decode() if owner else None
+
+    @staticmethod
+    def _chunk_name(index: int) -> str:
+        return f"chunk_{index:06d}.part"
+
+
+class SessionFileReader:
+    """
+    Async, file-like reader over the ordered chunk files of a session.
+    Exposes `read(n)` like UploadFile so it can be fed to UploadStream.
+    """
+    def __init__(self, paths: list[pathlib.Path]):
+        self.paths = list(paths)
+        self._current = None
+
+    async def read(self, size: int = -1) -> bytes:
+        while True:
+            if self._current is None:
+                if not self.paths:
+                    return b""
+                self._current = open(self.paths.pop(0), "rb")
+
+            data = await asyncio.to_thread(self._current.read, size)
+            if data:
+                return data
+
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+            self._current = None
@@ -3,6 +3,7 @@ import os
 import time
 import requests
 from typing import List, Optional
+from modules.utility import participant_cache
 
 # def convert_mp4_to_wav(mp4_file_path, output_dir):
 #     # Ensure the output directory exists
@@ -23,6 +24,26 @@ from typing import List, Optional
 
 
 
+def timestamp_to_seconds(timestamp: str | None) -> int:
+    """Converts an 'HH:MM:SS' (or 'MM:SS') timestamp into seconds. Unparseable values count as 0."""
+    if not timestamp:
+        return 0
+    try:
+        seconds = 0
+        for part in timestamp.strip().split(":"):
+            seconds = seconds * 60 + int(float(part))
+        return seconds
+    except ValueError:
+        return 0
+
+
+def seconds_to_timestamp(seconds: float) -> str:
+    """Formats seconds as an 'HH:MM:SS' timestamp."""
+    seconds = max(0, int(seconds))
+    return f"{seconds // 3600:02d}:{(seconds % 3600) // 60:02d}:{seconds % 60:02d}"
+
+
+
 def check_file_status(file_uri, api_key, max_retries=10, wait_time=5):
     status_url = file_uri  # The file URI can be used to check its status
     headers = {
@@ -62,6 +83,25 @@ def check_file_status(file_uri, api_key, max_retries=10, wait_time=5):
 
 
 
+def get_file_state(file_uri, api_key) -> str | None:
+    """
+    Single, non-blocking check of a Gemini file's state ('PROCESSING', 'ACTIVE', 'FAILED', ...).
+    Returns None if the state could not be determined.
+    """
+    try:
+        response = requests.get(file_uri, headers={"x-goog-api-key": api_key}, timeout=30)
+        if response.status_code in (403, 404):
+            return "MISSING"
+        response.raise_for_status()
+        return response.json().get('state')
+    except requests.exceptions.RequestException as e:
+        print(f"Request error occurred while checking file state: {e}")
+        return None
+
+
+
+
+
 def create_embeddings(supabase, text, meeting_id):
     try:
         response = supabase.rpc("create_embedding", {"input_text": text}).execute()
@@ -83,21 +123,16 @@ def create_embeddings(supabase, text, meeting_id):
 
 async def enrich_participants(supabase, host, participant_emails: List[str]) -> List[dict]:
     """
-    Takes a list of emails, fetches corresponding names from the 'profiles' table,
-    and returns a list of participant objects with names and emails.
+    Takes a list of emails, fetches corresponding names from the 'profiles' table
+    (through the participant name cache), and returns a list of participant objects
+    with names and emails.
     Provides a fallback name if a profile is not found.
     """
     if not participant_emails:
         return []
 
-    # 1. Fetch all matching profiles in a single, efficient query
-    profiles_response = supabase.table("profiles").select("email, firstName, lastName").in_("email", participant_emails).execute()
-
-    # 2. Create a lookup map for easy access (email -> full name)
-    profiles_map = {
-        profile['email']: f"{profile.get('firstName', '')} {profile.get('lastName', '')}".strip()
-        for profile in profiles_response.data
-    }
+    # 1. Look the names up in the shared cache; misses from concurrent views share one query
+    profiles_map = await participant_cache.get_display_names(supabase, participant_emails)
 
     # 3. Build the final list of participant objects
     enriched_list = []
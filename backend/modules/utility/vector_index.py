@@ -0,0 +1,207 @@
+# In-process vector index for meeting chat (RAG) retrieval.
+# Each meeting's chunk embeddings are loaded once into one contiguous int8 matrix (with
+# a float32 scale per row, see quantization.py) next to the chunk texts. A query is
+# scored with a single matrix-vector product on the quantized rows and the top-k picked
+# with argpartition, so a warm meeting needs no database round trip.
+# Indexes are kept in an LRU bounded by VECTOR_INDEX_MAX_BYTES. A per-meeting version
+# counter in Redis tells every process when a meeting's embeddings have changed.
+# Below the LRU sits an on-disk tier under VECTOR_CACHE_DIR: one directory per meeting
+# version holding .npy files that are memory-mapped on load, so API workers and Celery
+# workers on the same host (or volume) share one page-cached copy.
+
+import os
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass
+from collections import OrderedDict
+import numpy as np
+import orjson
+from supabase import Client
+from modules.utility import db
+from modules.utility.redis_client import get_redis
+from modules.utility.metrics import metrics
+from modules.utility import quantization
+
+VECTOR_INDEX_MAX_BYTES = int(os.getenv("VECTOR_INDEX_MAX_BYTES", 256 * 1024 * 1024))
+# Set to an empty string to disable the on-disk tier
+VECTOR_CACHE_DIR = os.getenv("VECTOR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "meeting_vector_cache"))
+
+
+@dataclass
+class MeetingIndex:
+    matrix: np.ndarray        # (chunks, dimensions) int8, row i embeds contents[i]
+    scales: np.ndarray        # (chunks,) float32, row i dequantizes as matrix[i] * scales[i]
+    contents: list[str]
+    version: int
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.scales.nbytes + sum(len(content) for content in self.contents)
+
+    def search(self, query_embedding, k: int, threshold: float) -> list[tuple[str, float]]:
+        """Returns up to `k` (content, similarity) pairs at or above `threshold`, best first."""
+        if not self.contents:
+            return []
+        scores = quantization.scores(self.matrix, self.scales, query_embedding)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top])]
+        return [(self.contents[i], float(scores[i])) for i in top if scores[i] >= threshold]
+
+
+def _version_key(meeting_id: str) -> str:
+    return f"vector_index_version:{meeting_id}"
+
+
+def _current_version(meeting_id: str) -> int:
+    r = get_redis()
+    if r is None:
+        return 0
+    return int(r.get(_version_key(meeting_id)) or 0)
+
+
+def parse_embedding(value) -> list[float]:
+    """Embeddings come back from PostgREST as a pgvector string ('[0.1,...]') or a list."""
+    return orjson.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+# --- On-disk tier ---
+
+def _disk_path(meeting_id: str, version: int) -> str:
+    return os.path.join(VECTOR_CACHE_DIR, meeting_id, f"v{version}")
+
+
+def _read_disk(meeting_id: str, version: int) -> MeetingIndex | None:
+    if not VECTOR_CACHE_DIR:
+        return None
+    path = _disk_path(meeting_id, version)
+    try:
+        matrix = np.load(os.path.join(path, "matrix.npy"), mmap_mode="r")
+        scales = np.load(os.path.join(path, "scales.npy"))
+        with open(os.path.join(path, "contents.json"), "rb") as f:
+            contents = orjson.loads(f.read())
+    except (OSError, ValueError):
+        return None
+    return MeetingIndex(matrix=matrix, scales=scales, contents=contents, version=version)
+
+
+def _write_disk(meeting_id: str, index: MeetingIndex):
+    """Writes the index into a temp directory and renames it into place, so readers never see a partial copy."""
+    if not VECTOR_CACHE_DIR:
+        return
+    meeting_dir = os.path.join(VECTOR_CACHE_DIR, meeting_id)
+    try:
+        os.makedirs(meeting_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=meeting_dir)
+        np.save(os.path.join(tmp_dir, "matrix.npy"), np.ascontiguousarray(index.matrix))
+        np.save(os.path.join(tmp_dir, "scales.npy"), index.scales)
+        with open(os.path.join(tmp_dir, "contents.json"), "wb") as f:
+            f.write(orjson.dumps(index.contents))
+        try:
+            os.replace(tmp_dir, _disk_path(meeting_id, index.version))
+        except OSError:
+            # Another process published this version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Older versions of this meeting are no longer reachable
+        for name in os.listdir(meeting_dir):
+            if name.startswith("v") and name != f"v{index.version}":
+                shutil.rmtree(os.path.join(meeting_dir, name), ignore_errors=True)
+    except OSError as e:
+        print(f"⚠️ Could not write vector cache for meeting {meeting_id}: {e}")
+
+
+def _remove_disk(meeting_id: str):
+    if VECTOR_CACHE_DIR:
+        shutil.rmtree(os.path.join(VECTOR_CACHE_DIR, meeting_id), ignore_errors=True)
+
+
+async def _load_rows(supabase: Client, meeting_id: str) -> tuple[np.ndarray, np.ndarray, list[str]]:
+    """Reads the meeting's chunks, quantized. Rows stored before embedding_q8 existed are quantized here."""
+    table = supabase.table("meeting_embeddings")
+    response = await db.execute(table.select("content, embedding_q8").eq("meeting_id", meeting_id))
+    rows = response.data or []
+    if all(row.get("embedding_q8") for row in rows):
+        matrix, scales = quantization.decode_many([row["embedding_q8"] for row in rows])
+        return matrix, scales, [row["content"] for row in rows]
+
+    response = await db.execute(table.select("content, embedding").eq("meeting_id", meeting_id))
+    rows = response.data or []
+    if not rows:
+        return quantization.decode_many([]) + ([],)
+    matrix, scales = quantization.quantize(np.array([parse_embedding(row["embedding"]) for row in rows], dtype=np.float32))
+    return matrix, scales, [row["content"] for row in rows]
+
+
+class VectorIndexCache:
+    def __init__(self, max_bytes: int = VECTOR_INDEX_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._indexes: "OrderedDict[str, MeetingIndex]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _get(self, meeting_id: str, version: int) -> MeetingIndex | None:
+        with self._lock:
+            index = self._indexes.get(meeting_id)
+            if index is None:
+                return None
+            if index.version != version:
+                self._drop(meeting_id)
+                return None
+            self._indexes.move_to_end(meeting_id)
+            return index
+
+    def _put(self, meeting_id: str, index: MeetingIndex):
+        with self._lock:
+            self._drop(meeting_id)
+            if index.nbytes > self.max_bytes:
+                return
+            self._indexes[meeting_id] = index
+            self._bytes += index.nbytes
+            while self._bytes > self.max_bytes:
+                evicted_id, _ = next(iter(self._indexes.items()))
+                self._drop(evicted_id)
+                metrics.incr("vector_index_evictions_total")
+
+    def _drop(self, meeting_id: str):
+        index = self._indexes.pop(meeting_id, None)
+        if index is not None:
+            self._bytes -= index.nbytes
+
+    async def get(self, supabase: Client, meeting_id: str) -> MeetingIndex:
+        """Returns the meeting's index from memory, then the disk tier, then meeting_embeddings."""
+        version = _current_version(meeting_id)
+        index = self._get(meeting_id, version)
+        if index is not None:
+            metrics.incr("vector_index_hits_total")
+            return index
+
+        metrics.incr("vector_index_misses_total")
+        index = await db.run(_read_disk, meeting_id, version)
+        if index is not None:
+            metrics.incr("vector_index_disk_hits_total")
+            self._put(meeting_id, index)
+            return index
+
+        matrix, scales, contents = await _load_rows(supabase, meeting_id)
+        index = MeetingIndex(matrix=matrix, scales=scales, contents=contents, version=version)
+        if contents:
+            # Don't cache "no embeddings yet"; they are being created right after
+            self._put(meeting_id, index)
+            await db.run(_write_disk, meeting_id, index)
+        return index
+
+    def invalidate(self, meeting_id: str):
+        """Drops the meeting's index here and in every other process."""
+        with self._lock:
+            self._drop(meeting_id)
+        _remove_disk(meeting_id)
+        r = get_redis()
+        if r is not None:
+            r.incr(_version_key(meeting_id))
+
+
+# Process-wide index cache
+vector_index = VectorIndexCache()
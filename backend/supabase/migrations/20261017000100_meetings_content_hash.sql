@@ -0,0 +1,7 @@
+-- SHA-256 of the uploaded recording, used to detect duplicate uploads.
+alter table public.meetings add column if not exists content_hash text;
+
+-- Lookup from hash to an already analyzed meeting.
+create index if not exists meetings_content_hash_completed_idx
+    on public.meetings (content_hash)
+    where status = 'completed';
@@ -0,0 +1,4 @@
+-- Keyset pagination of a user's meetings on (created_at, id), newest first.
+-- Lets GET /meetings?cursor=... read each page as a single index range scan.
+create index if not exists meetings_user_created_at_id_idx
+    on public.meetings (user_id, created_at desc, id desc);
@@ -0,0 +1,33 @@
+-- Row version for conditional GETs (weak ETags on the meeting list and detail).
+alter table public.meetings add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.touch_meeting_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$;
+
+drop trigger if exists meetings_touch_updated_at on public.meetings;
+create trigger meetings_touch_updated_at
+    before update on public.meetings
+    for each row execute function public.touch_meeting_updated_at();
+
+-- The detail view includes meeting_details, so changes there bump the parent meeting.
+create or replace function public.touch_parent_meeting()
+returns trigger
+language plpgsql
+as $$
+begin
+    update public.meetings set updated_at = now() where id = coalesce(new.id, old.id);
+    return null;
+end;
+$$;
+
+drop trigger if exists meeting_details_touch_meeting on public.meeting_details;
+create trigger meeting_details_touch_meeting
+    after insert or update or delete on public.meeting_details
+    for each row execute function public.touch_parent_meeting();
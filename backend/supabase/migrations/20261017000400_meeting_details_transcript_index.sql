@@ -0,0 +1,5 @@
+-- Start offset (in seconds) of every transcript segment, in transcript order, and the
+-- segment count. Written together with the transcript so time windows can be served
+-- with a binary search (GET /meetings/{id}/transcript?from=...&to=...).
+alter table public.meeting_details add column if not exists transcript_index jsonb;
+alter table public.meeting_details add column if not exists transcript_count integer;
@@ -0,0 +1,6 @@
+-- Compact copy of every chunk embedding: base64 of a float32 per-vector scale followed
+-- by the int8-quantized components (~1 KB per 768-d vector instead of ~9 KB of text).
+-- The API's in-process index loads only this column; `embedding` stays for the
+-- match_meeting_chunks RPC. Rows written before this column existed are quantized
+-- on read.
+alter table public.meeting_embeddings add column if not exists embedding_q8 text;
@@ -0,0 +1,8 @@
+-- Position of the chunk within its meeting's transcript. The unique index makes a
+-- second, concurrent embedding build for the same meeting fail on insert instead of
+-- adding duplicate chunks (the API also serializes builds, see single_flight.py).
+-- Rows written before this column existed keep a NULL index and are not constrained.
+alter table public.meeting_embeddings add column if not exists chunk_index integer;
+
+create unique index if not exists meeting_embeddings_meeting_chunk_idx
+    on public.meeting_embeddings (meeting_id, chunk_index);
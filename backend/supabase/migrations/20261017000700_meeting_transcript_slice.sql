@@ -0,0 +1,20 @@
+-- Returns segments [p_offset, p_offset + p_limit) of a meeting's transcript, so the
+-- detail view can load its first page without transferring the whole transcript.
+-- Out-of-range positions are ignored (lax jsonpath), so a short transcript just
+-- returns fewer segments.
+create or replace function public.meeting_transcript_slice(p_meeting_id uuid, p_offset integer, p_limit integer)
+returns jsonb
+language sql
+stable
+as $$
+    select coalesce(
+        jsonb_path_query_array(
+            transcript,
+            'lax $[$first to $last]',
+            jsonb_build_object('first', p_offset, 'last', p_offset + p_limit - 1)
+        ),
+        '[]'::jsonb
+    )
+    from public.meeting_details
+    where id = p_meeting_id;
+$$;
@@ -0,0 +1,6 @@
+-- Duplicate detection is scoped to the uploading user, so the hash lookup is per user.
+drop index if exists public.meetings_content_hash_completed_idx;
+
+create index if not exists meetings_user_content_hash_completed_idx
+    on public.meetings (user_id, content_hash)
+    where status = 'completed';
@@ -0,0 +1,15 @@
+# Shared test setup: make the backend package importable from any working directory,
+# and keep the modules under test on their in-process fallbacks instead of Redis.
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+@pytest.fixture(autouse=True)
+def no_redis(monkeypatch):
+    from modules.utility import redis_client
+    monkeypatch.setattr(redis_client, "REDIS_URL", None)
@@ -0,0 +1,58 @@
+import base64
+import json
+
+import pytest
+
+from modules.utility.pagination import InvalidCursorError, after_cursor, decode_cursor, encode_cursor
+
+ROW_ID = "3f2504e0-4f89-11d3-9a0c-0305e82c3301"
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("created_at", [
+    "2025-01-31T09:15:00.123456+00:00",
+    "2025-01-31T09:15:00+00:00",
+    "2025-01-31 09:15:00Z",
+    "2025-01-31T09:15:00.12345",
+])
+def test_round_trip(created_at):
+    cursor = encode_cursor(created_at, ROW_ID)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, ROW_ID)
+
+
+def test_row_id_is_returned_in_canonical_form():
+    cursor = encode_cursor("2025-01-31T09:15:00+00:00", ROW_ID.upper().replace("-", ""))
+    assert decode_cursor(cursor)[1] == ROW_ID
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64 at all!",
+    _raw_cursor({"created_at": "2025-01-31T09:15:00+00:00"}),
+    _raw_cursor(["2025-01-31T09:15:00+00:00"]),
+    _raw_cursor([1738314900, ROW_ID]),
+    _raw_cursor(['2025-01-31T09:15:00+00:00",id.gt.0', ROW_ID]),
+    _raw_cursor(["2025-01-31T09:15:00+00:00", "1),or(id.gt.0"]),
+    _raw_cursor(["2025-01-31T09:15:00+00:00", None]),
+])
+def test_rejects_anything_encode_cursor_did_not_produce(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_after_cursor_builds_a_keyset_filter():
+    class Query:
+        def or_(self, expression):
+            self.expression = expression
+            return self
+
+    query = after_cursor(Query(), encode_cursor("2025-01-31T09:15:00+00:00", ROW_ID))
+
+    assert query.expression == (
+        'created_at.lt."2025-01-31T09:15:00+00:00",'
+        f'and(created_at.eq."2025-01-31T09:15:00+00:00",id.lt."{ROW_ID}")'
+    )
@@ -0,0 +1,77 @@
+import base64
+
+import numpy as np
+
+from modules.utility import quantization
+
+
+def _unit_rows(n, d, seed=0):
+    rng = np.random.default_rng(seed)
+    matrix = rng.standard_normal((n, d)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_round_trip_error_is_within_half_a_step():
+    matrix = _unit_rows(50, 768)
+    quantized, scales = quantization.quantize(matrix)
+    assert quantized.dtype == np.int8
+    assert scales.shape == (50,)
+    error = np.abs(quantization.dequantize(quantized, scales) - matrix)
+    assert np.all(error <= scales[:, None] / 2 + 1e-6)
+
+
+def test_zero_vector_keeps_a_usable_scale():
+    quantized, scales = quantization.quantize(np.zeros((1, 8)))
+    assert scales[0] == 1.0
+    assert not quantized.any()
+
+
+def test_encode_decode_many_round_trip():
+    matrix = _unit_rows(3, 16)
+    quantized, scales = quantization.decode_many([quantization.encode(row) for row in matrix])
+    expected_quantized, expected_scales = quantization.quantize(matrix)
+    np.testing.assert_array_equal(quantized, expected_quantized)
+    np.testing.assert_array_equal(scales, expected_scales)
+    # 4-byte scale + one byte per dimension
+    assert len(base64.b64decode(quantization.encode(matrix[0]))) == 4 + 16
+
+
+def test_decode_many_of_nothing():
+    quantized, scales = quantization.decode_many([])
+    assert quantized.shape == (0, 0)
+    assert scales.shape == (0,)
+
+
+def test_scores_track_float_dot_products():
+    matrix = _unit_rows(200, 768, seed=1)
+    query = _unit_rows(1, 768, seed=2)[0]
+    quantized, scales = quantization.quantize(matrix)
+    approximate = quantization.scores(quantized, scales, query)
+    np.testing.assert_allclose(approximate, matrix @ query, atol=0.01)
+
+
+def test_top_k_recall():
+    matrix = _unit_rows(500, 768, seed=3)
+    queries = _unit_rows(20, 768, seed=4)
+    quantized, scales = quantization.quantize(matrix)
+    k = 5
+    hits = 0
+    for query in queries:
+        exact = set(np.argsort(-(matrix @ query))[:k])
+        approximate = set(np.argsort(-quantization.scores(quantized, scales, query))[:k])
+        hits += len(exact & approximate)
+    assert hits / (k * len(queries)) >= 0.9
+
+
+def test_scores_are_the_same_across_block_boundaries(monkeypatch):
+    matrix = _unit_rows(10, 32, seed=5)
+    query = _unit_rows(1, 32, seed=6)[0]
+    quantized, scales = quantization.quantize(matrix)
+    expected = quantization.dequantize(quantized, scales) @ query
+    monkeypatch.setattr(quantization, "SCORE_BLOCK_ROWS", 3)
+    np.testing.assert_allclose(quantization.scores(quantized, scales, query), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_scores_of_an_empty_matrix():
+    quantized, scales = quantization.decode_many([])
+    assert quantization.scores(quantized, scales, np.zeros(0)).shape == (0,)
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from modules.utility.audio_segmenter import Segment, plan_segments
+
+
+def test_short_recording_is_one_segment():
+    assert plan_segments(120, length=600, overlap=15) == [Segment(index=0, start=0.0, end=120)]
+
+
+def test_segments_overlap_into_the_next_one():
+    segments = plan_segments(1500, length=600, overlap=15)
+    assert [(s.index, s.start, s.end) for s in segments] == [
+        (0, 0.0, 615),
+        (1, 600.0, 1215),
+        (2, 1200.0, 1500),
+    ]
+
+
+def test_tail_shorter_than_the_overlap_is_dropped():
+    segments = plan_segments(1210, length=600, overlap=15)
+    assert [s.start for s in segments] == [0.0, 600.0]
+    assert segments[-1].end == 1210
+
+
+def test_merge_shifts_offsets_and_splits_overlaps_at_the_midpoint():
+    transcript_generator = pytest.importorskip("modules.utility.transcript_generator", exc_type=ImportError)
+    segments = plan_segments(1300, length=600, overlap=20)
+    transcripts = [
+        [
+            {"speaker": "A", "timestamp": "00:00:05", "text": "Welcome."},
+            {"speaker": "B", "timestamp": "00:10:05", "text": "Before the cut."},
+            {"speaker": "B", "timestamp": "00:10:15", "text": "After the cut, first copy."},
+        ],
+        [
+            {"speaker": "B", "timestamp": "00:00:05", "text": "Before the cut."},
+            {"speaker": "B", "timestamp": "00:00:15", "text": "After the cut, second copy."},
+            {"speaker": "A", "timestamp": "00:10:02", "text": "Late in segment two."},
+        ],
+        [
+            {"speaker": "A", "timestamp": "00:00:02", "text": "Late in segment two."},
+            {"speaker": "A", "timestamp": "00:01:00", "text": "Wrapping up."},
+        ],
+    ]
+
+    merged = transcript_generator.merge_segment_transcripts(segments, transcripts, overlap=20)
+
+    assert merged == [
+        {"speaker": "A", "timestamp": "00:00:05", "text": "Welcome."},
+        {"speaker": "B", "timestamp": "00:10:05", "text": "Before the cut."},
+        {"speaker": "B", "timestamp": "00:10:15", "text": "After the cut, second copy."},
+        {"speaker": "A", "timestamp": "00:20:02", "text": "Late in segment two."},
+        {"speaker": "A", "timestamp": "00:21:00", "text": "Wrapping up."},
+    ]
+
+
+def test_merge_drops_repeated_lines_at_the_cut():
+    transcript_generator = pytest.importorskip("modules.utility.transcript_generator", exc_type=ImportError)
+    segments = [Segment(index=0, start=0.0, end=620), Segment(index=1, start=600.0, end=900)]
+    transcripts = [
+        [{"speaker": "A", "timestamp": "00:10:09", "text": "Next item"}],
+        [{"speaker": "A", "timestamp": "00:00:11", "text": "next  item"}],
+    ]
+
+    merged = transcript_generator.merge_segment_transcripts(segments, transcripts, overlap=20)
+
+    assert merged == [{"speaker": "A", "timestamp": "00:10:09", "text": "Next item"}]
+
+
+def _run_segmented_analysis(monkeypatch, analyze_segment):
+    transcript_generator = pytest.importorskip("modules.utility.transcript_generator", exc_type=ImportError)
+    summarized = []
+    monkeypatch.setattr(transcript_generator, "analyze_segment", analyze_segment)
+    monkeypatch.setattr(transcript_generator, "summarize_transcript",
+                        lambda transcript: summarized.append(transcript) or {"summary": "ok"})
+    monkeypatch.setattr(transcript_generator.audio_segmenter, "SEGMENT_OVERLAP_SECONDS", 20)
+
+    def plan(duration):
+        return plan_segments(duration, length=600, overlap=20)
+    monkeypatch.setattr(transcript_generator.audio_segmenter, "plan_segments", plan)
+
+    analysis = asyncio.run(transcript_generator.analyze_audio_in_segments("meeting-1", "https://example.com/a.mp3", 1300))
+    return analysis, summarized
+
+
+def test_segmented_analysis_stitches_and_summarizes(monkeypatch):
+    def analyze_segment(meeting_id, recording_url, segment, cache_id):
+        assert cache_id == "meeting-1"
+        return [{"speaker": "A", "timestamp": "00:01:00", "text": f"Segment {segment.index}"}]
+
+    analysis, summarized = _run_segmented_analysis(monkeypatch, analyze_segment)
+
+    assert analysis["summary"] == "ok"
+    assert [entry["timestamp"] for entry in analysis["transcript"]] == ["00:01:00", "00:11:00", "00:21:00"]
+    assert summarized == [analysis["transcript"]]
+
+
+def test_segmented_analysis_reports_failed_segments(monkeypatch):
+    def analyze_segment(meeting_id, recording_url, segment, cache_id):
+        if segment.index == 1:
+            raise ValueError("no transcript")
+        return []
+
+    transcript_generator = pytest.importorskip("modules.utility.transcript_generator", exc_type=ImportError)
+    with pytest.raises(transcript_generator.SegmentAnalysisError) as raised:
+        _run_segmented_analysis(monkeypatch, analyze_segment)
+    assert raised.value.failed_segments == [1]
@@ -0,0 +1,31 @@
+import pytest
+
+transcript_index = pytest.importorskip("modules.utility.transcript_index", exc_type=ImportError)
+
+
+def test_build_index_sorts_by_timestamp():
+    transcript, index = transcript_index.build_index([
+        {"timestamp": "00:01:00", "text": "second"},
+        {"timestamp": "00:00:10", "text": "first"},
+        {"timestamp": None, "text": "unparseable counts as 0"},
+    ])
+    assert [entry["text"] for entry in transcript] == ["unparseable counts as 0", "first", "second"]
+    assert index == [0, 10, 60]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (None, None, (0, 4)),
+    (10, 60, (1, 4)),
+    (11, 59, (2, 3)),
+    (61, None, (4, 4)),
+    (60, 10, (3, 3)),
+])
+def test_window(start, end, expected):
+    assert transcript_index.window([0, 10, 30, 60], start, end) == expected
+
+
+def test_parse_bound():
+    assert transcript_index.parse_bound(None) is None
+    assert transcript_index.parse_bound("01:02:03") == 3723
+    with pytest.raises(ValueError):
+        transcript_index.parse_bound("noon")
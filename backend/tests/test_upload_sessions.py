@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from modules.utility import upload_sessions
+from modules.utility.upload_sessions import UploadSessionError, UploadSessionStore
+
+
+async def _body(data: bytes):
+    yield data
+
+
+@pytest.fixture
+def store(tmp_path):
+    return UploadSessionStore(tmp_path)
+
+
+def _complete_session(store, user_id="user-1"):
+    session = store.create(user_id, "meeting-1", "a.mp3", "audio/mpeg", total_size=10, chunk_size=4)
+    for index, data in enumerate([b"abcd", b"efgh", b"ij"]):
+        asyncio.run(store.write_chunk(session, index, _body(data)))
+    return session
+
+
+def test_only_one_caller_can_claim_a_session(store):
+    session = _complete_session(store)
+
+    claimed = store.claim_for_completion(session["upload_id"], "user-1")
+    assert store.status(claimed)["complete"]
+
+    with pytest.raises(UploadSessionError) as raised:
+        store.claim_for_completion(session["upload_id"], "user-1")
+    assert raised.value.status_code == 409
+
+
+def test_chunks_are_rejected_while_a_session_is_claimed(store):
+    session = _complete_session(store)
+    store.claim_for_completion(session["upload_id"], "user-1")
+
+    with pytest.raises(UploadSessionError) as raised:
+        asyncio.run(store.write_chunk(session, 0, _body(b"wxyz")))
+    assert raised.value.status_code in (404, 409)
+
+
+def test_released_session_can_be_completed_again(store):
+    session = _complete_session(store)
+    store.claim_for_completion(session["upload_id"], "user-1")
+    store.release_completion(session["upload_id"])
+
+    claimed = store.claim_for_completion(session["upload_id"], "user-1")
+
+    async def read_all():
+        reader = store.open_reader(claimed)
+        try:
+            return b"".join([chunk async for chunk in _drain(reader)])
+        finally:
+            reader.close()
+    assert asyncio.run(read_all()) == b"abcdefghij"
+
+
+async def _drain(reader):
+    while data := await reader.read(3):
+        yield data
+
+
+def test_claim_checks_the_owner_and_keeps_the_session(store):
+    session = _complete_session(store)
+
+    with pytest.raises(UploadSessionError) as raised:
+        store.claim_for_completion(session["upload_id"], "someone-else")
+    assert raised.value.status_code == 404
+    assert store.get(session["upload_id"], "user-1")["upload_id"] == session["upload_id"]
+
+
+def test_session_staged_on_another_replica(store, monkeypatch):
+    class Redis:
+        def get(self, key):
+            return b"api-2"
+    monkeypatch.setattr(upload_sessions, "get_redis", lambda: Redis())
+
+    with pytest.raises(UploadSessionError) as raised:
+        store.get("0123abcd", "user-1")
+    assert raised.value.status_code == 421
+    assert "api-2" in raised.value.detail
+
+
+def test_delete_removes_a_claimed_session(store):
+    session = _complete_session(store)
+    store.claim_for_completion(session["upload_id"], "user-1")
+    store.delete(session["upload_id"])
+
+    with pytest.raises(UploadSessionError) as raised:
+        store.claim_for_completion(session["upload_id"], "user-1")
+    assert raised.value.status_code == 404
@@ -31,6 +31,10 @@ export function ChatInterface({ meetingId }: ChatInterfaceProps) {
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
+  // Aborting stops the answer being generated (e.g. when the chat is closed)
+  const abortRef = useRef<AbortController | null>(null);
+
+  useEffect(() => () => abortRef.current?.abort(), []);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: "smooth" });
@@ -57,31 +61,30 @@ export function ChatInterface({ meetingId }: ChatInterfaceProps) {
 
     // highlight-start
     // ---- Replace the mock response with a real API call ----
+    const assistantId = (Date.now() + 1).toString();
+    const controller = new AbortController();
+    abortRef.current = controller;
     try {
-      // Call the new method from your apiService
-      const response = await apiService.askQuestion(meetingId, userMessage.content);
-
-      const assistantMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        type: "assistant",
-        content: response.response, // Use the actual content from the API
-        timestamp: new Date(),
-      };
-      setMessages((prev) => [...prev, assistantMessage]);
+      // Stream the answer into a message that grows as tokens arrive
+      setMessages((prev) => [...prev, { id: assistantId, type: "assistant", content: "", timestamp: new Date() }]);
+      await apiService.streamQuestion(
+        meetingId,
+        userMessage.content,
+        (text) => setMessages((prev) => prev.map((m) => (m.id === assistantId ? { ...m, content: m.content + text } : m))),
+        controller.signal,
+      );
 
     } catch (error) {
+      if (controller.signal.aborted) return;
       console.error("Failed to fetch AI response:", error);
-      // Create an error message to display in the chat UI
-      const errorMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        type: "assistant",
-        content: "Sorry, I encountered an error while trying to respond. Please try again.",
-        timestamp: new Date(),
-      };
-      setMessages((prev) => [...prev, errorMessage]);
+      // Show the error in place of the (partial) answer
+      setMessages((prev) => prev.map((m) => (m.id === assistantId
+        ? { ...m, content: "Sorry, I encountered an error while trying to respond. Please try again." }
+        : m)));
 
     } finally {
       // Ensure loading is set to false whether the call succeeds or fails
+      abortRef.current = null;
       setIsLoading(false);
       inputRef.current?.focus();
     }
@@ -109,7 +112,7 @@ export function ChatInterface({ meetingId }: ChatInterfaceProps) {
       <CardContent className="flex-1 flex flex-col p-6 space-y-4 overflow-hidden">
         {/* Messages */}
         <div className="flex-1 overflow-y-auto space-y-4 pr-2 no-scrollbar">
-          {messages.map((message) => (
+          {messages.filter((message) => message.content).map((message) => (
             <div
               key={message.id}
               className={cn(
@@ -160,7 +163,7 @@ export function ChatInterface({ meetingId }: ChatInterfaceProps) {
             </div>
           ))}
           
-          {isLoading && (
+          {isLoading && !messages[messages.length - 1]?.content && (
             <div className="flex space-x-3 justify-start">
               <Avatar className="w-8 h-8">
                 <AvatarFallback className="bg-accent text-accent-foreground">
@@ -40,6 +40,7 @@ export default function MeetingDetails() {
   const [meetingData, setMeetingData] = useState<Meeting | null>(null);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [isLoadingTranscript, setIsLoadingTranscript] = useState(false);
 
   // --- START AUDIO PLAYER STATE ---
   const audioRef = useRef<HTMLAudioElement | null>(null); // 2. Create a ref for the audio element
@@ -81,6 +82,31 @@ export default function MeetingDetails() {
     fetchMeetingData();
   }, [meetingId, toast]);
 
+  // The details carry only the start of the transcript; fetch the rest page by page
+  const loadMoreTranscript = async () => {
+    if (!meetingId || !meetingData) return;
+    try {
+      setIsLoadingTranscript(true);
+      const page = await apiService.getTranscriptPage(meetingId, {
+        offset: meetingData.transcript?.length ?? 0,
+      });
+      setMeetingData((current) =>
+        current
+          ? { ...current, transcript: [...(current.transcript ?? []), ...page.segments] }
+          : current
+      );
+    } catch (err) {
+      toast({
+        title: "Error",
+        description:
+          err instanceof Error ? err.message : "Failed to load the transcript.",
+        variant: "destructive",
+      });
+    } finally {
+      setIsLoadingTranscript(false);
+    }
+  };
+
   // --- START AUDIO PLAYER LOGIC ---
   const togglePlayPause = () => {
     if (audioRef.current) {
@@ -439,6 +465,20 @@ export default function MeetingDetails() {
                               )}
                             </div>
                           ))}
+                          {(meetingData.transcriptCount ?? 0) >
+                            meetingData.transcript.length && (
+                            <Button
+                              variant="outline"
+                              size="sm"
+                              className="w-full"
+                              onClick={loadMoreTranscript}
+                              disabled={isLoadingTranscript}
+                            >
+                              {isLoadingTranscript
+                                ? "Loading..."
+                                : `Load more (${meetingData.transcript.length} of ${meetingData.transcriptCount})`}
+                            </Button>
+                          )}
                         </div>
                       </CardContent>
                     </Card>
@@ -138,7 +138,8 @@ interface Meeting {
   participants: Participant[];
   keyHighlights?: string[];
   actionItems?: ActionItem[];
-  transcript?: TranscriptEntry[];
+  transcript?: TranscriptEntry[]; // First page only; see getTranscriptPage
+  transcriptCount?: number;
   summary?: string;
   createdAt: string;
   updatedAt: string;
@@ -151,6 +152,16 @@ interface ChatResponse {
   response: string;
 }
 
+// One page of a meeting transcript
+interface TranscriptPage {
+  meetingId: string;
+  segments: TranscriptEntry[];
+  offset: number;
+  limit: number;
+  total: number;
+  nextOffset: number | null;
+}
+
 
 // ============================================================================
 // CONSTANTS & CONFIGURATION
@@ -181,6 +192,7 @@ const API_CONFIG = {
     // Meeting endpoints
     MEETINGS: '/meetings',
     MEETING_DETAILS: '/meetings/:id',
+    MEETING_TRANSCRIPT: '/meetings/:id/transcript',
     PROCESS_MEETING: '/meetings/process',
     DELETE_MEETING: '/meetings/:id',
 
@@ -189,6 +201,7 @@ const API_CONFIG = {
     UPLOAD_AVATAR: '/upload/avatar',
 
     CHAT: '/meetings/chat',
+    CHAT_STREAM: '/meetings/chat/stream',
   }
 } as const;
 
@@ -798,6 +811,34 @@ class ApiService {
     return await this.makeRequest<Meeting>(endpoint, { method: 'GET' });
   }
 
+  /**
+   * Get a page of a meeting's transcript
+   *
+   * @param {string} meetingId - Unique meeting identifier
+   * @param {object} params - Paging and optional HH:MM:SS window
+   * @returns {Promise<TranscriptPage>} The segments and the offset of the next page
+   *
+   * @example
+   * ```typescript
+   * const page = await apiService.getTranscriptPage('meeting-123', { offset: 100, limit: 200 });
+   * ```
+   */
+  async getTranscriptPage(meetingId: string, params: {
+    offset?: number;
+    limit?: number;
+    from?: string;
+    to?: string;
+  } = {}): Promise<TranscriptPage> {
+    const queryParams = new URLSearchParams();
+    if (params.offset) queryParams.append('offset', params.offset.toString());
+    if (params.limit) queryParams.append('limit', params.limit.toString());
+    if (params.from) queryParams.append('from', params.from);
+    if (params.to) queryParams.append('to', params.to);
+
+    const endpoint = `${API_CONFIG.ENDPOINTS.MEETING_TRANSCRIPT.replace(':id', meetingId)}?${queryParams.toString()}`;
+    return await this.makeRequest<TranscriptPage>(endpoint, { method: 'GET' });
+  }
+
   /**
    * Process a new meeting recording
    * 
@@ -883,17 +924,19 @@ class ApiService {
      * Send a question about a specific meeting to the AI assistant
      * * @param {string} meetingId - The ID of the meeting being discussed
      * @param {string} query - The user's question
+     * @param {boolean} useCache - Set to false to skip cached answers and get a fresh one
      * @returns {Promise<ChatResponse>} The AI's response
      * @throws {Error} On request failure
      */
   // highlight-start
 
 
-  async askQuestion(meetingId: string, query: string): Promise<ChatResponse> {
+  async askQuestion(meetingId: string, query: string, useCache: boolean = true): Promise<ChatResponse> {
     // The backend expects multipart/form-data, so we use FormData
     const formData = new FormData();
     formData.append('meeting_id', meetingId);
     formData.append('message', query);
+    formData.append('use_cache', String(useCache));
 
     // Make the authenticated POST request
     return await this.makeRequest<ChatResponse>(
@@ -906,6 +949,76 @@ class ApiService {
     );
   }
 
+  /**
+   * Ask a question and receive the answer as it is generated (Server-Sent Events)
+   * * @param {string} meetingId - The ID of the meeting being discussed
+   * @param {string} query - The user's question
+   * @param {(text: string) => void} onToken - Called with every piece of the answer
+   * @param {AbortSignal} signal - Abort to stop the generation early
+   * @param {boolean} useCache - Set to false to skip cached answers and get a fresh one
+   * @returns {Promise<string>} The complete answer
+   * @throws {Error} On request failure or when the server reports an error
+   */
+  async streamQuestion(
+    meetingId: string,
+    query: string,
+    onToken: (text: string) => void,
+    signal?: AbortSignal,
+    useCache: boolean = true
+  ): Promise<string> {
+    const { data: { session } } = await supabase.auth.getSession();
+    if (!session?.access_token) {
+      throw new Error("Authentication session not found. Please log in again.");
+    }
+
+    const formData = new FormData();
+    formData.append('meeting_id', meetingId);
+    formData.append('message', query);
+    formData.append('use_cache', String(useCache));
+
+    const response = await fetch(`${API_CONFIG.BASE_URL}${API_CONFIG.ENDPOINTS.CHAT_STREAM}`, {
+      method: 'POST',
+      headers: { 'Authorization': `Bearer ${session.access_token}` },
+      body: formData,
+      signal,
+    });
+
+    if (!response.ok || !response.body) {
+      await handleApiError(response, API_CONFIG.ENDPOINTS.CHAT_STREAM);
+    }
+
+    const reader = response.body!.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let answer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Events are separated by a blank line: "event: <name>\ndata: <json>"
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const raw = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        const event = raw.match(/^event: (.*)$/m)?.[1];
+        const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? '{}');
+        if (event === 'token') {
+          answer += data.text;
+          onToken(data.text);
+        } else if (event === 'done') {
+          return data.response ?? answer;
+        } else if (event === 'error') {
+          throw new Error(data.detail || 'Failed to generate a response.');
+        }
+      }
+    }
+
+    return answer;
+  }
+
   // highlight-end
   // ========================================================================
   // FILE UPLOAD API METHODS
@@ -1119,6 +1232,7 @@ export type {
   ActionItem,
   Participant,
   TranscriptEntry,
+  TranscriptPage,
 };
 
 // Export utility functions for advanced use cases